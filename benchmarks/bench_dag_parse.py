@@ -0,0 +1,158 @@
+"""
+Benchmark do parse das DAGs
+
+O DAG processor reimporta cada arquivo de DAG a cada ciclo de parse; tudo o
+que o arquivo importa no topo é pago a cada ciclo. Para cada arquivo de DAG,
+em um processo Python novo (importações a frio) e com o Airflow já importado
+(como no DAG processor), mede:
+- tempo de importação do módulo da DAG
+- módulos pesados carregados pelo parse (pandas, pyarrow, providers, tasks)
+- tempo de carga do arquivo pelo DagBag do Airflow (parse + validação)
+
+Cada medição é repetida --repeticoes vezes e é reportada a mediana. Requer o
+Airflow instalado (mesmo ambiente do scheduler).
+
+Com --baseline, os tempos são comparados com um resultado anterior e o script
+termina com erro se algum ficar mais lento que a tolerância; com --estrito,
+também termina com erro se o parse carregar algum módulo pesado.
+
+Uso:
+    python benchmarks/bench_dag_parse.py --repeticoes 5 --saida-json parse.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS = os.path.join(RAIZ, 'plugins')
+ARQUIVOS_DAG = {
+    'pipeline_produtos_vendas': os.path.join(RAIZ, '6324089', 'pipeline_produtos_vendas.py'),
+    'etl_vendas_pipeline': os.path.join(RAIZ, 'dags', 'etl_vendas_pipeline.py'),
+}
+
+# Módulos que não deveriam ser carregados durante o parse
+MODULOS_PESADOS = (
+    'pandas',
+    'numpy',
+    'pyarrow',
+    'sqlalchemy',
+    'psycopg2',
+    'airflow.providers.postgres',
+    'produtos_vendas_tasks',
+    'etl_vendas_tasks',
+)
+
+TOLERANCIA_PADRAO = 0.25
+
+# Executado em um processo novo: argv = (modo, arquivo da DAG, diretório de plugins)
+CODIGO_MEDICAO = """
+import importlib.util, json, sys, time
+modo, caminho, plugins = sys.argv[1:4]
+sys.path.insert(0, plugins)
+import airflow
+from airflow.operators.python import PythonOperator
+antes = set(sys.modules)
+inicio = time.perf_counter()
+if modo == 'importacao':
+    erros = {}
+    try:
+        spec = importlib.util.spec_from_file_location('dag_em_parse', caminho)
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    except Exception as erro:
+        erros[caminho] = repr(erro)
+else:
+    from airflow.models.dagbag import DagBag
+    erros = DagBag(dag_folder=caminho, include_examples=False).import_errors
+segundos = time.perf_counter() - inicio
+print(json.dumps({'segundos': segundos, 'modulos': sorted(set(sys.modules) - antes),
+                  'erros': {str(k): str(v) for k, v in erros.items()}}))
+"""
+
+
+def measure(modo, caminho):
+    """Uma medição em processo novo: segundos, módulos carregados e erros de importação"""
+    saida = subprocess.run(
+        [sys.executable, '-c', CODIGO_MEDICAO, modo, caminho, PLUGINS],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def heavy_modules(modulos):
+    """Módulos pesados (ou submódulos deles) entre os carregados"""
+    return sorted({pesado for pesado in MODULOS_PESADOS for modulo in modulos
+                   if modulo == pesado or modulo.startswith(f"{pesado}.")})
+
+
+def bench_dag(dag, caminho, repeticoes):
+    """Mediana dos tempos de importação e de DagBag de um arquivo de DAG"""
+    resultados = []
+    for modo in ('importacao', 'dagbag'):
+        medicoes = [measure(modo, caminho) for _ in range(repeticoes)]
+        erros = medicoes[-1]['erros']
+        for arquivo, erro in erros.items():
+            logging.warning(f"⚠ Erro de importação em {arquivo}: {erro}")
+        resultados.append({
+            'dag': dag,
+            'etapa': modo,
+            'segundos': round(statistics.median(m['segundos'] for m in medicoes), 4),
+            'modulos_carregados': len(medicoes[-1]['modulos']),
+            'modulos_pesados': heavy_modules(medicoes[-1]['modulos']),
+            'erros': len(erros),
+        })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do tempo de parse das DAGs')
+    parser.add_argument('--dag', choices=['todas', *ARQUIVOS_DAG], default='todas')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--saida-json', help='Grava os resultados neste arquivo')
+    parser.add_argument('--baseline', help='Resultado anterior (JSON) para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help='Aumento de tempo aceito em relação à baseline (0.25 = 25%%)')
+    parser.add_argument('--estrito', action='store_true', help='Falha se o parse carregar módulos pesados')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    resultados = []
+    for dag, caminho in ARQUIVOS_DAG.items():
+        if args.dag in ('todas', dag):
+            resultados.extend(bench_dag(dag, caminho, args.repeticoes))
+
+    for r in resultados:
+        pesados = ', '.join(r['modulos_pesados']) or '-'
+        print(f"{r['dag']:<28} {r['etapa']:<11} {r['segundos'] * 1000:>9.1f} ms  "
+              f"{r['modulos_carregados']:>5} módulos  pesados: {pesados}")
+
+    if args.saida_json:
+        with open(args.saida_json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+    falhou = False
+    if args.baseline:
+        with open(args.baseline) as arquivo:
+            anteriores = {(r['dag'], r['etapa']): r['segundos'] for r in json.load(arquivo)}
+        for r in resultados:
+            anterior = anteriores.get((r['dag'], r['etapa']))
+            if anterior and r['segundos'] > anterior * (1 + args.tolerancia):
+                logging.error(f"✗ {r['dag']}/{r['etapa']}: {r['segundos']:.4f}s (baseline {anterior:.4f}s)")
+                falhou = True
+    if args.estrito:
+        for r in resultados:
+            if r['modulos_pesados'] or r['erros']:
+                logging.error(f"✗ {r['dag']}/{r['etapa']}: módulos pesados {r['modulos_pesados']}, "
+                              f"{r['erros']} erro(s) de importação")
+                falhou = True
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Gerador de dados sintéticos para benchmark
+
+Gera arquivos CSV no mesmo formato dos dados do exercício, em escala
+configurável, reproduzindo os mesmos padrões de nulos:
+- produtos_loja.csv: Preco_Custo e Fornecedor nulos
+- vendas_produtos.csv: Preco_Venda nulo
+- dados_vendas.csv (DAG etl_vendas_pipeline): Valor nulo
+
+As vendas são geradas e gravadas em blocos, então 10M de linhas não precisam
+caber em memória. A semente fixa torna os arquivos reprodutíveis.
+
+Uso:
+    python benchmarks/synthetic_data.py --vendas 10000000 --produtos 10000 --saida /tmp/bench
+"""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+CATEGORIAS = ['Eletrônicos', 'Acessórios', 'Informática', 'Games', 'Escritório', 'Casa']
+FORNECEDORES = ['Dell Inc', 'Logitech', 'Samsung', 'Corsair', 'Multilaser', 'HP', 'Lenovo', 'LG']
+CANAIS = ['Online', 'Loja Física']
+REGIOES = ['Norte', 'Sul', 'Leste', 'Oeste']
+
+# Proporção de nulos, próxima à dos arquivos do exercício (1 em 5)
+TAXA_NULOS = 0.2
+BLOCO_PADRAO = 1_000_000
+
+
+def _ids(prefixo, inicio, fim):
+    return pd.Series(np.arange(inicio, fim) + 1).map(lambda n: f"{prefixo}{n:03d}")
+
+
+def _anular(serie, taxa, rng):
+    """Substitui uma fração aleatória dos valores por nulo"""
+    return serie.mask(rng.random(len(serie)) < taxa)
+
+
+def generate_produtos(num_produtos, taxa_nulos=TAXA_NULOS, seed=42):
+    """Gera o cadastro de produtos (formato de produtos_loja.csv)"""
+    rng = np.random.default_rng(seed)
+    categorias = rng.choice(CATEGORIAS, num_produtos)
+    return pd.DataFrame({
+        'ID_Produto': _ids('P', 0, num_produtos),
+        'Nome_Produto': [f"Produto {i + 1} {c}" for i, c in enumerate(categorias)],
+        'Categoria': categorias,
+        'Preco_Custo': _anular(pd.Series(rng.uniform(10, 3000, num_produtos).round(2)), taxa_nulos, rng),
+        'Fornecedor': _anular(pd.Series(rng.choice(FORNECEDORES, num_produtos)), taxa_nulos, rng),
+        'Status': np.where(rng.random(num_produtos) < 0.9, 'Ativo', 'Inativo'),
+    })
+
+
+def generate_vendas(inicio, fim, num_produtos, data_inicial='2024-01-01', dias=365,
+                    taxa_nulos=TAXA_NULOS, seed=42):
+    """Gera as vendas de índice [inicio, fim) (formato de vendas_produtos.csv)"""
+    rng = np.random.default_rng([seed, inicio])
+    n = fim - inicio
+    datas = pd.Timestamp(data_inicial) + pd.to_timedelta(rng.integers(0, dias, n), unit='D')
+    return pd.DataFrame({
+        'ID_Venda': _ids('V', inicio, fim),
+        'ID_Produto': _ids('P', 0, num_produtos).to_numpy()[rng.integers(0, num_produtos, n)],
+        'Quantidade_Vendida': rng.integers(1, 11, n),
+        'Preco_Venda': _anular(pd.Series(rng.uniform(15, 4000, n).round(2)), taxa_nulos, rng),
+        'Data_Venda': datas.strftime('%Y-%m-%d'),
+        'Canal_Venda': rng.choice(CANAIS, n),
+    })
+
+
+def generate_dados_vendas(inicio, fim, num_produtos, data_inicial='2023-01-01', dias=365,
+                          taxa_nulos=TAXA_NULOS, seed=42):
+    """Gera as vendas de índice [inicio, fim) (formato de dados_vendas.csv)"""
+    rng = np.random.default_rng([seed, inicio, 1])
+    n = fim - inicio
+    datas = pd.Timestamp(data_inicial) + pd.to_timedelta(rng.integers(0, dias, n), unit='D')
+    return pd.DataFrame({
+        'ID_Produto': _ids('P', 0, num_produtos).to_numpy()[rng.integers(0, num_produtos, n)],
+        'Valor': _anular(pd.Series(rng.uniform(5, 500, n).round(2)), taxa_nulos, rng),
+        'Quantidade': rng.integers(1, 6, n),
+        'Data': datas.strftime('%Y-%m-%d'),
+        'Regiao': rng.choice(REGIOES, n),
+    })
+
+
+def _gravar_em_blocos(caminho, gerador, num_linhas, bloco, **kwargs):
+    for inicio in range(0, max(num_linhas, 1), bloco):
+        fim = min(inicio + bloco, num_linhas)
+        df = gerador(inicio, fim, **kwargs)
+        df.to_csv(caminho, mode='w' if inicio == 0 else 'a', header=inicio == 0,
+                  index=False, float_format='%.2f')
+
+
+def write_dataset(diretorio, num_vendas, num_produtos=1_000, taxa_nulos=TAXA_NULOS,
+                  seed=42, bloco=BLOCO_PADRAO):
+    """
+    Grava os três CSVs sintéticos em diretorio
+    Retorna um dict com o caminho de cada arquivo.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    arquivos = {
+        'produtos': os.path.join(diretorio, 'produtos_loja.csv'),
+        'vendas': os.path.join(diretorio, 'vendas_produtos.csv'),
+        'dados_vendas': os.path.join(diretorio, 'dados_vendas.csv'),
+    }
+
+    generate_produtos(num_produtos, taxa_nulos, seed).to_csv(arquivos['produtos'], index=False,
+                                                             float_format='%.2f')
+    _gravar_em_blocos(arquivos['vendas'], generate_vendas, num_vendas, bloco,
+                      num_produtos=num_produtos, taxa_nulos=taxa_nulos, seed=seed)
+    _gravar_em_blocos(arquivos['dados_vendas'], generate_dados_vendas, num_vendas, bloco,
+                      num_produtos=num_produtos, taxa_nulos=taxa_nulos, seed=seed)
+
+    logging.info(f"✓ Dados sintéticos gravados em {diretorio}: "
+                 f"{num_produtos} produtos, {num_vendas} vendas")
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos de produtos e vendas')
+    parser.add_argument('--vendas', type=int, default=1_000_000, help='Número de vendas')
+    parser.add_argument('--produtos', type=int, default=1_000, help='Número de produtos')
+    parser.add_argument('--taxa-nulos', type=float, default=TAXA_NULOS, help='Fração de nulos')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', default='/tmp/pipeline_bench', help='Diretório de saída')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    write_dataset(args.saida, args.vendas, args.produtos, args.taxa_nulos, args.seed)
+
+
+if __name__ == '__main__':
+    main()
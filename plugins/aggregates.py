@@ -0,0 +1,99 @@
+"""
+Camada agregada de vendas
+
+Mantém a tabela vendas_agregadas, com uma linha por mês, produto e canal de
+venda (Mes_Venda, ID_Produto, Canal_Venda). Ela guarda contagens, somas e
+mínimos/máximos, que podem ser combinados em qualquer agrupamento superior.
+Os relatórios de generate_report e detect_low_performance leem esta tabela (algumas
+centenas de linhas) em vez de varrer relatorio_vendas e vendas_processadas.
+Num_Vendas conta linhas de vendas_processadas e só pode ser somado como
+número de linhas: contagens de vendas distintas (COUNT(DISTINCT ID_Venda))
+continuam consultando vendas_processadas.
+
+A atualização é incremental: apenas os meses afetados pela carga são
+recalculados, dentro da mesma transação do BulkLoader. Nome_Produto e
+Categoria dos demais meses são atualizados a partir de produtos_processados,
+para que um produto renomeado ou recategorizado não mantenha os valores antigos.
+"""
+
+import logging
+
+DDL_AGREGADOS = """
+CREATE TABLE IF NOT EXISTS vendas_agregadas (
+    Mes_Venda VARCHAR(7),
+    ID_Produto VARCHAR(10),
+    Canal_Venda VARCHAR(20),
+    Nome_Produto VARCHAR(100),
+    Categoria VARCHAR(50),
+    Num_Vendas INTEGER,
+    Total_Quantidade BIGINT,
+    Total_Receita DECIMAL(14,2),
+    Num_Receitas INTEGER,
+    Soma_Margem DECIMAL(14,2),
+    Num_Margens INTEGER,
+    Margem_Minima DECIMAL(10,2),
+    Margem_Maxima DECIMAL(10,2),
+    Data_Atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_vendas_agregadas_mes ON vendas_agregadas (Mes_Venda);
+"""
+
+SQL_AGREGAR = """
+INSERT INTO vendas_agregadas (
+    Mes_Venda, ID_Produto, Canal_Venda, Nome_Produto, Categoria,
+    Num_Vendas, Total_Quantidade, Total_Receita, Num_Receitas,
+    Soma_Margem, Num_Margens, Margem_Minima, Margem_Maxima
+)
+SELECT
+    v.Mes_Venda,
+    v.ID_Produto,
+    v.Canal_Venda,
+    MAX(p.Nome_Produto),
+    MAX(p.Categoria),
+    COUNT(*),
+    SUM(v.Quantidade_Vendida),
+    SUM(v.Receita_Total),
+    COUNT(v.Receita_Total),
+    SUM(v.Margem_Lucro),
+    COUNT(v.Margem_Lucro),
+    MIN(v.Margem_Lucro),
+    MAX(v.Margem_Lucro)
+FROM vendas_processadas v
+LEFT JOIN produtos_processados p ON p.ID_Produto = v.ID_Produto
+{where}
+GROUP BY v.Mes_Venda, v.ID_Produto, v.Canal_Venda
+"""
+
+# Atributos da dimensão alterados desde a agregação do mês
+SQL_ATUALIZAR_PRODUTOS = """
+UPDATE vendas_agregadas a
+SET Nome_Produto = p.Nome_Produto, Categoria = p.Categoria
+FROM produtos_processados p
+WHERE p.ID_Produto = a.ID_Produto
+  AND (a.Nome_Produto, a.Categoria) IS DISTINCT FROM (p.Nome_Produto, p.Categoria)
+"""
+
+
+def refresh_aggregates(loader, meses=None):
+    """
+    Recalcula vendas_agregadas dentro da transação do loader
+    - meses: lista de Mes_Venda afetados pela carga; None recalcula tudo
+    - Nos demais meses, atualiza nome e categoria dos produtos alterados
+    """
+    if meses is None:
+        loader.execute("DELETE FROM vendas_agregadas")
+        loader.execute(SQL_AGREGAR.format(where=''))
+        logging.info("✓ vendas_agregadas recalculada por completo")
+        return
+
+    meses = sorted({mes for mes in meses if mes})
+    if meses:
+        loader.execute("DELETE FROM vendas_agregadas WHERE Mes_Venda = ANY(%s)", (meses,))
+        loader.execute(SQL_AGREGAR.format(where='WHERE v.Mes_Venda = ANY(%s)'), (meses,))
+        logging.info(f"✓ vendas_agregadas atualizada para {len(meses)} mês(es): {', '.join(meses)}")
+    else:
+        logging.info("Nenhum mês afetado: vendas_agregadas mantida")
+
+    atualizadas = loader.execute(SQL_ATUALIZAR_PRODUTOS)
+    if atualizadas:
+        logging.info(f"✓ {atualizadas} linha(s) de vendas_agregadas com produto renomeado ou recategorizado")
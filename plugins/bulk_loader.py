@@ -0,0 +1,375 @@
+"""
+Carga em massa no PostgreSQL via COPY
+
+Substitui DataFrame.to_sql(method='multi') por COPY FROM STDIN (formato CSV)
+do psycopg2. Os dados são enviados em lotes de tamanho fixo, todas as tabelas
+carregadas por um mesmo BulkLoader compartilham uma única transação e a
+vazão de cada tabela é registrada nos logs. Para cargas incrementais, upsert()
+copia os dados para uma tabela de staging temporária e aplica
+INSERT ... ON CONFLICT na tabela final.
+
+Com run_id, os registros são marcados na coluna Run_Id (nas tabelas que a
+têm) e o loader registra em gravados, pelo RETURNING dos INSERTs, quantos
+registros gravou por tabela e as somas das colunas de checksum, para a
+validação da carga por execução (ver load_validation.py).
+
+O COPY lista as colunas sem aspas (o PostgreSQL as converte para
+minúsculas). Tabelas criadas por DataFrame.to_sql têm colunas entre aspas
+com maiúsculas ("ID_Produto"), que o COPY não encontra: ensure_table() as
+recria com o DDL do pipeline antes da primeira carga.
+
+Uso:
+    ensure_table(postgres_hook, 'vendas', DDL_VENDAS)
+    with BulkLoader(postgres_hook, run_id=run_id) as loader:
+        loader.load('produtos_processados', df_produtos)
+        loader.load('vendas_processadas', chunks_vendas)
+"""
+
+import csv
+import io
+import logging
+import time
+
+import pandas as pd
+
+from instrumentation import record_write
+from load_validation import COLUNA_RUN_ID
+
+BATCH_SIZE_PADRAO = 50_000
+
+TIPOS_INTEIROS = {'smallint', 'integer', 'bigint'}
+
+
+def _colunas(cursor, tabela):
+    """Colunas da tabela e seus tipos completos (ex.: numeric(10,2)), na ordem da tabela"""
+    cursor.execute(
+        "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+        (tabela,),
+    )
+    return cursor.fetchall()
+
+
+def ensure_table(postgres_hook, tabela, ddl):
+    """
+    Cria a tabela com o DDL, migrando uma versão criada por DataFrame.to_sql
+    - Colunas com maiúsculas (criadas entre aspas) indicam a tabela antiga:
+      ela é renomeada para <tabela>_legado, recriada pelo DDL e tem os dados
+      copiados, convertidos para os tipos novos (ex.: "Data" texto -> DATE)
+    - O DDL (com seus índices) só é executado depois da renomeação
+    """
+    conn = postgres_hook.get_conn()
+    try:
+        with conn.cursor() as cursor:
+            legado = [coluna for coluna, _ in _colunas(cursor, tabela) if coluna != coluna.lower()]
+            if legado:
+                logging.info(f"Migrando {tabela} criada pelo to_sql (colunas {', '.join(legado)})")
+                cursor.execute(f"ALTER TABLE {tabela} RENAME TO {tabela}_legado")
+
+            cursor.execute(ddl)
+
+            if legado:
+                origem = {coluna.lower(): coluna for coluna, _ in _colunas(cursor, f"{tabela}_legado")}
+                colunas = [(coluna, tipo) for coluna, tipo in _colunas(cursor, tabela) if coluna in origem]
+                selecao = ', '.join('"%s"::%s' % (origem[coluna], tipo) for coluna, tipo in colunas)
+                cursor.execute(
+                    f"INSERT INTO {tabela} ({', '.join(coluna for coluna, _ in colunas)}) "
+                    f"SELECT {selecao} FROM {tabela}_legado"
+                )
+                logging.info(f"✓ {cursor.rowcount} registros migrados para {tabela}")
+                cursor.execute(f"DROP TABLE {tabela}_legado")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+class BulkLoader:
+    """
+    Carrega DataFrames em tabelas PostgreSQL usando COPY em uma única transação
+    - Commit ao sair do bloco with sem erros
+    - Rollback de todas as tabelas se qualquer carga falhar
+    """
+
+    def __init__(self, postgres_hook, batch_size=BATCH_SIZE_PADRAO, run_id=None, checksums=None):
+        if batch_size <= 0:
+            raise ValueError(f"batch_size inválido: {batch_size}")
+        self.postgres_hook = postgres_hook
+        self.batch_size = batch_size
+        self.run_id = run_id
+        self.checksums = checksums or {}
+        self.estatisticas = {}
+        self.gravados = {}
+        self._conn = None
+        self._tipos_colunas = {}
+
+    def __enter__(self):
+        self._conn = self.postgres_hook.get_conn()
+        self._conn.autocommit = False
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._conn.commit()
+                self._log_estatisticas()
+            else:
+                self._conn.rollback()
+                logging.error(f"✗ Carga revertida (rollback): {exc}")
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def cursor(self):
+        """Cursor da transação da carga, para comandos que precisam de resultado"""
+        return self._conn.cursor()
+
+    def execute(self, sql, parameters=None):
+        """Executa um comando SQL dentro da transação da carga e retorna o número de registros afetados"""
+        with self._conn.cursor() as cursor:
+            cursor.execute(sql, parameters)
+            return cursor.rowcount
+
+    def truncate(self, tabela):
+        """Limpa a tabela dentro da mesma transação da carga"""
+        self.execute(f"TRUNCATE TABLE {tabela}")
+
+    def delete_range(self, tabela, coluna, inicio=None, fim=None):
+        """Remove da tabela os registros com coluna entre inicio e fim (inclusivos)"""
+        condicoes = []
+        parametros = []
+        if inicio is not None:
+            condicoes.append(f"{coluna} >= %s")
+            parametros.append(inicio)
+        if fim is not None:
+            condicoes.append(f"{coluna} <= %s")
+            parametros.append(fim)
+        where = ' AND '.join(condicoes) or 'TRUE'
+        self.execute(f"DELETE FROM {tabela} WHERE {where}", parametros)
+
+    def load(self, tabela, dados):
+        """
+        Carrega um DataFrame (ou um iterável de DataFrames) na tabela
+        Retorna o número de registros enviados nesta chamada.
+        """
+        if isinstance(dados, pd.DataFrame):
+            dados = [dados]
+
+        registros = 0
+        for df in dados:
+            df = self._marcar_execucao(tabela, df)
+            for inicio in range(0, len(df), self.batch_size):
+                registros += self._copy_lote(tabela, df.iloc[inicio:inicio + self.batch_size])
+
+        self.record_rows(tabela, registros)
+        return registros
+
+    def copy_file(self, tabela, caminho):
+        """
+        Envia um arquivo CSV com cabeçalho via COPY, sem passar pelo pandas
+        - As colunas da tabela são associadas pelos nomes do cabeçalho
+        - As linhas são lidas pelo módulo csv e reescritas em lotes: aspas
+          soltas no meio de um campo (ex.: Monitor 24") são mantidas como
+          texto, como na leitura do pandas, em vez de quebrar o COPY
+        Retorna o número de registros copiados.
+        """
+        registros = 0
+        with open(caminho, encoding='utf-8', newline='') as arquivo:
+            leitor = csv.reader(arquivo)
+            colunas = ', '.join(next(leitor))
+            lote = []
+            for linha in leitor:
+                lote.append(linha)
+                if len(lote) >= self.batch_size:
+                    registros += self._copy_linhas(tabela, colunas, lote)
+                    lote = []
+            if lote:
+                registros += self._copy_linhas(tabela, colunas, lote)
+
+        return registros
+
+    def _copy_linhas(self, tabela, colunas, linhas):
+        """Envia um lote de linhas já separadas em campos via COPY"""
+        inicio = time.perf_counter()
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(linhas)
+        num_bytes = buffer.tell()
+        buffer.seek(0)
+
+        with self._conn.cursor() as cursor:
+            cursor.copy_expert(f"COPY {tabela} ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+        estatistica = self.estatisticas.setdefault(
+            tabela, {'registros': 0, 'bytes': 0, 'segundos': 0.0, 'lotes': 0}
+        )
+        estatistica['registros'] += len(linhas)
+        estatistica['bytes'] += num_bytes
+        estatistica['segundos'] += time.perf_counter() - inicio
+        estatistica['lotes'] += 1
+        record_write(len(linhas), num_bytes)
+        return len(linhas)
+
+    def upsert(self, tabela, dados, chaves):
+        """
+        Carrega via staging e INSERT ... ON CONFLICT (chaves) DO UPDATE
+        - A tabela final precisa de uma restrição única nas chaves
+        - Registros repetidos no mesmo lote são reduzidos a um por chave
+        Retorna o número de registros inseridos/atualizados nesta chamada.
+        """
+        if isinstance(dados, pd.DataFrame):
+            dados = [dados]
+
+        staging = f"stg_{tabela}"
+        self.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {tabela} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+
+        registros = 0
+        for df in dados:
+            if df.empty:
+                continue
+            df = self._marcar_execucao(tabela, df)
+            self.execute(f"TRUNCATE TABLE {staging}")
+            for inicio in range(0, len(df), self.batch_size):
+                self._copy_lote(tabela, df.iloc[inicio:inicio + self.batch_size], destino=staging)
+
+            colunas = ', '.join(df.columns)
+            chaves_sql = ', '.join(chaves)
+            atualizacoes = ', '.join(
+                f"{col} = EXCLUDED.{col}" for col in df.columns if col.lower() not in {c.lower() for c in chaves}
+            )
+            acao = f"DO UPDATE SET {atualizacoes}" if atualizacoes else "DO NOTHING"
+            registros += self.insert_select(
+                tabela,
+                f"INSERT INTO {tabela} ({colunas}) "
+                f"SELECT DISTINCT ON ({chaves_sql}) {colunas} FROM {staging} ORDER BY {chaves_sql} "
+                f"ON CONFLICT ({chaves_sql}) {acao}",
+                chaves=chaves,
+                origem=staging,
+            )
+
+        return registros
+
+    def insert_select(self, tabela, sql, parametros=None, chaves=None, origem=None):
+        """
+        Executa um INSERT ... SELECT (sem RETURNING) e registra o que foi gravado
+        - Registros e checksums vêm do RETURNING do próprio INSERT
+        - chaves/origem: registros de origem com chaves já gravadas por este
+          loader (ex.: chunk anterior) são apenas atualizados e não contam de novo
+        Retorna o número de registros inseridos/atualizados.
+        """
+        colunas = self.checksums.get(tabela, [])
+        somas = ''.join(f", COALESCE(SUM({coluna}), 0)" for coluna in colunas)
+
+        repetidos = (0,) + (0,) * len(colunas)
+        if chaves and origem:
+            repetidos = self._ja_gravados(tabela, chaves, origem, colunas)
+
+        with self._conn.cursor() as cursor:
+            cursor.execute(
+                f"WITH gravados AS ({sql} RETURNING {', '.join(colunas) or '1'}) "
+                f"SELECT COUNT(*){somas} FROM gravados",
+                parametros,
+            )
+            resultado = cursor.fetchone()
+
+        registros = resultado[0]
+        self.record_rows(
+            tabela,
+            registros - repetidos[0],
+            {coluna: resultado[i + 1] - repetidos[i + 1] for i, coluna in enumerate(colunas)},
+        )
+        return registros
+
+    def _ja_gravados(self, tabela, chaves, origem, colunas):
+        """
+        (registros, somas atuais) das chaves de origem que este loader já gravou
+        na tabela: linhas com xmin da transação corrente
+        """
+        if tabela not in self.gravados:
+            return (0,) + (0,) * len(colunas)
+
+        juncao = ' AND '.join(f"t.{chave} = o.{chave}" for chave in chaves)
+        somas = ''.join(f", COALESCE(SUM(t.{coluna}), 0)" for coluna in colunas)
+        with self._conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*){somas} FROM {tabela} t "
+                f"JOIN (SELECT DISTINCT {', '.join(chaves)} FROM {origem}) o ON {juncao} "
+                f"WHERE t.xmin = pg_current_xact_id()::xid"
+            )
+            return cursor.fetchone()
+
+    def record_rows(self, tabela, registros, checksums=None):
+        """Registra em gravados os registros (e somas de checksum) gravados na tabela"""
+        gravado = self.gravados.setdefault(tabela, {'registros': 0, 'checksums': {}})
+        gravado['registros'] += int(registros)
+        for coluna, soma in (checksums or {}).items():
+            gravado['checksums'][coluna] = gravado['checksums'].get(coluna, 0.0) + float(soma)
+
+    def _marcar_execucao(self, tabela, df):
+        """Acrescenta a coluna Run_Id com a execução atual, se a tabela tiver a coluna"""
+        if self.run_id is None or COLUNA_RUN_ID.lower() not in self._tipos_destino(tabela):
+            return df
+        return df.assign(**{COLUNA_RUN_ID: self.run_id})
+
+    def _copy_lote(self, tabela, df, destino=None):
+        """
+        Envia um lote via COPY FROM STDIN e acumula as estatísticas da tabela
+        - destino: tabela que recebe o COPY (ex.: staging), se diferente de tabela
+        """
+        inicio = time.perf_counter()
+        df = self._ajustar_tipos(tabela, df)
+
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        num_bytes = buffer.tell()
+        buffer.seek(0)
+
+        colunas = ', '.join(df.columns)
+        with self._conn.cursor() as cursor:
+            cursor.copy_expert(f"COPY {destino or tabela} ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+        estatistica = self.estatisticas.setdefault(
+            tabela, {'registros': 0, 'bytes': 0, 'segundos': 0.0, 'lotes': 0}
+        )
+        estatistica['registros'] += len(df)
+        estatistica['bytes'] += num_bytes
+        estatistica['segundos'] += time.perf_counter() - inicio
+        estatistica['lotes'] += 1
+        record_write(len(df), num_bytes)
+        return len(df)
+
+    def _ajustar_tipos(self, tabela, df):
+        """
+        Converte colunas float com destino inteiro para Int64, evitando que
+        valores como '2.0' sejam rejeitados pelo COPY
+        """
+        tipos = self._tipos_destino(tabela)
+        colunas = [
+            col for col in df.columns
+            if tipos.get(col.lower()) in TIPOS_INTEIROS and pd.api.types.is_float_dtype(df[col])
+        ]
+        if not colunas:
+            return df
+        return df.astype({col: 'Int64' for col in colunas})
+
+    def _tipos_destino(self, tabela):
+        if tabela not in self._tipos_colunas:
+            with self._conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = %s",
+                    (tabela.lower(),),
+                )
+                self._tipos_colunas[tabela] = dict(cursor.fetchall())
+        return self._tipos_colunas[tabela]
+
+    def _log_estatisticas(self):
+        for tabela, estatistica in self.estatisticas.items():
+            segundos = estatistica['segundos'] or 1e-9
+            logging.info(
+                f"✓ COPY {tabela}: {estatistica['registros']} registros em {estatistica['lotes']} lote(s), "
+                f"{estatistica['segundos']:.2f}s ({estatistica['registros'] / segundos:,.0f} registros/s, "
+                f"{estatistica['bytes'] / segundos / 1024 / 1024:.1f} MB/s)"
+            )
@@ -0,0 +1,168 @@
+"""
+Pool de conexões PostgreSQL compartilhado entre as tasks
+
+Cada task criava um PostgresHook novo e abria (e fechava) uma conexão por
+consulta: generate_report, por exemplo, pagava o handshake e a autenticação
+cinco vezes. get_hook() retorna um hook cujas conexões vêm de um engine
+SQLAlchemy com pool, criado uma única vez por processo de worker e por
+conn_id:
+- get_conn() empresta uma conexão do pool; close() a devolve em vez de fechar
+- get_pandas_df() e get_sqlalchemy_engine() usam o mesmo engine
+- pool_pre_ping descarta conexões derrubadas pelo servidor antes do uso
+- pool_recycle renova conexões antigas (ex.: timeout de firewall/pgbouncer)
+
+O cache é por processo: após um fork (LocalExecutor, Celery), o processo
+filho descarta os engines herdados sem fechar os sockets do processo pai.
+
+Configuração via variáveis de ambiente:
+- PIPELINE_POOL_SIZE: conexões mantidas abertas por engine (padrão: 5)
+- PIPELINE_POOL_MAX_OVERFLOW: conexões extras em picos (padrão: 10)
+- PIPELINE_POOL_RECYCLE: idade máxima de uma conexão em segundos (padrão: 1800)
+
+Consultas independentes podem ser executadas em paralelo com run_queries():
+uma thread por consulta, limitadas a PIPELINE_POOL_SIZE para não abrir
+conexões além do pool.
+
+Uso:
+    postgres_hook = get_hook('northwind_postgres')
+    df = postgres_hook.get_pandas_df("SELECT ...")
+    resultados, latencias = run_queries(postgres_hook, {'categoria': "SELECT ...", 'canal': "SELECT ..."})
+    with BulkLoader(postgres_hook) as loader:
+        ...
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+
+import pandas as pd
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+POOL_SIZE = int(os.environ.get('PIPELINE_POOL_SIZE', 5))
+POOL_MAX_OVERFLOW = int(os.environ.get('PIPELINE_POOL_MAX_OVERFLOW', 10))
+POOL_RECYCLE = int(os.environ.get('PIPELINE_POOL_RECYCLE', 1800))
+
+# Engines do processo atual, por conn_id
+_engines = {}
+_lock = threading.Lock()
+
+
+def _descartar_engines_herdados():
+    """No processo filho, abandona os pools do pai sem fechar suas conexões"""
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_descartar_engines_herdados)
+
+
+def get_engine(conn_id):
+    """Engine SQLAlchemy com pool para o conn_id, criado uma vez por processo"""
+    with _lock:
+        engine = _engines.get(conn_id)
+        if engine is None:
+            engine = PostgresHook(postgres_conn_id=conn_id).get_sqlalchemy_engine(engine_kwargs={
+                'pool_size': POOL_SIZE,
+                'max_overflow': POOL_MAX_OVERFLOW,
+                'pool_recycle': POOL_RECYCLE,
+                'pool_pre_ping': True,
+            })
+            _engines[conn_id] = engine
+            logging.info(
+                f"✓ Pool de conexões criado para {conn_id} "
+                f"(pool_size={POOL_SIZE}, max_overflow={POOL_MAX_OVERFLOW})"
+            )
+        return engine
+
+
+class _ConexaoPool:
+    """
+    Conexão DB-API emprestada do pool
+    - Atributos e métodos são os da conexão psycopg2
+    - close() devolve a conexão ao pool (restaurando autocommit)
+    """
+
+    def __init__(self, conexao_pool):
+        object.__setattr__(self, '_conexao_pool', conexao_pool)
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao_pool.dbapi_connection, nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._conexao_pool.dbapi_connection, nome, valor)
+
+    def __enter__(self):
+        self._conexao_pool.dbapi_connection.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conexao_pool.dbapi_connection.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        conexao = self._conexao_pool.dbapi_connection
+        if conexao is not None and conexao.autocommit:
+            conexao.autocommit = False
+        self._conexao_pool.close()
+
+
+class PooledPostgresHook(PostgresHook):
+    """PostgresHook cujas conexões vêm do pool do worker"""
+
+    def get_sqlalchemy_engine(self, engine_kwargs=None):
+        return get_engine(self.postgres_conn_id)
+
+    def get_conn(self):
+        return _ConexaoPool(get_engine(self.postgres_conn_id).raw_connection())
+
+    def get_pandas_df(self, sql, parameters=None, **kwargs):
+        """DataFrame com o resultado da consulta, lido por uma conexão do pool"""
+        with closing(self.get_conn()) as conexao, closing(conexao.cursor()) as cursor:
+            cursor.execute(sql, parameters)
+            colunas = [descricao[0] for descricao in cursor.description]
+            return pd.DataFrame.from_records(cursor.fetchall(), columns=colunas, **kwargs)
+
+
+def get_hook(conn_id):
+    """Hook com conexões do pool para o conn_id"""
+    return PooledPostgresHook(postgres_conn_id=conn_id)
+
+
+def _consulta_cronometrada(postgres_hook, sql):
+    inicio = time.perf_counter()
+    df = postgres_hook.get_pandas_df(sql)
+    return df, time.perf_counter() - inicio
+
+
+def run_queries(postgres_hook, consultas, max_workers=None):
+    """
+    Executa consultas independentes em paralelo, cada uma com uma conexão do pool
+    - consultas: dict nome -> SQL
+    - max_workers: threads simultâneas (padrão: PIPELINE_POOL_SIZE)
+    Retorna (dict nome -> DataFrame, dict nome -> latência em segundos).
+    """
+    max_workers = max(1, min(len(consultas), max_workers or POOL_SIZE))
+    resultados = {}
+    latencias = {}
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='consulta') as executor:
+        futuros = {
+            executor.submit(_consulta_cronometrada, postgres_hook, sql): nome
+            for nome, sql in consultas.items()
+        }
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            resultados[nome], latencias[nome] = futuro.result()
+            logging.info(f"✓ Consulta {nome}: {latencias[nome]:.3f}s ({len(resultados[nome])} registros)")
+    total = time.perf_counter() - inicio
+
+    logging.info(
+        f"✓ {len(consultas)} consultas em {total:.3f}s com {max_workers} conexões "
+        f"(soma das latências: {sum(latencias.values()):.3f}s)"
+    )
+    return resultados, latencias
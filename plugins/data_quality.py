@@ -0,0 +1,434 @@
+"""
+Qualidade de dados
+
+Estágio declarativo de validação, aplicado a cada chunk na extração. Todas as
+regras são avaliadas sobre o chunk já em memória (máscaras booleanas
+vetorizadas, sem loops por registro) e os registros reprovados são separados
+na mesma passada, sem reler a origem.
+
+Tipos de regra:
+- schema: tipos das colunas ('texto', 'numero', 'inteiro', 'data'); valores
+  não convertíveis são falhas e as colunas numéricas saem convertidas
+- obrigatorio: colunas que não podem ser nulas
+- nulos: taxa máxima de nulos da coluna no dataset inteiro
+- intervalo: valores numéricos entre minimo e maximo (inclusivos)
+- unico: chave sem repetição, dentro do chunk e entre chunks (hash da chave)
+- referencia: valores presentes no conjunto de referência (chave estrangeira)
+
+Ação de cada regra:
+- 'alerta': apenas registra a falha (padrão)
+- 'quarentena': remove o registro, gravado no dataset intermediário
+  quarentena_<dataset> com a coluna Motivo_Quarentena
+- 'erro': report() levanta ValueError após gravar os resultados
+
+Os resultados (registros, falhas e taxa por regra) são gravados na tabela
+data_quality_resultados, uma linha por regra e execução, junto com a carga
+(mesma transação, como os fingerprints).
+
+No modo ELT, check_table() avalia as mesmas regras em SQL sobre a staging
+(colunas TEXT), com conversões guardadas (pipeline_numero, pipeline_inteiro,
+pipeline_data) que devolvem NULL em vez de abortar a transação; os
+reprovados saem da staging para a mesma quarentena, e os resultados são os
+mesmos do modo ETL para a mesma entrada.
+
+Exemplo:
+    regras = [
+        {'tipo': 'schema', 'colunas': {'Preco_Venda': 'numero'}, 'acao': 'quarentena'},
+        {'tipo': 'referencia', 'coluna': 'ID_Produto', 'referencia': 'produtos', 'acao': 'quarentena'},
+    ]
+    with DataQuality('vendas', regras, referencias={'produtos': ids_produtos}) as qualidade:
+        for chunk in chunks:
+            chunk = qualidade.check(chunk)
+    resultados = qualidade.report()
+    ...
+    save_results(loader, 'pipeline_produtos_vendas', resultados)
+"""
+
+import csv
+import io
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from intermediate_storage import FrameWriter
+
+ACOES = ('alerta', 'quarentena', 'erro')
+TIPOS_SCHEMA = ('texto', 'numero', 'inteiro', 'data')
+FORMATO_DATA = '%Y-%m-%d'
+COLUNA_MOTIVO = 'Motivo_Quarentena'
+TABELA_RESULTADOS = 'data_quality_resultados'
+LOTE_QUARENTENA = 100_000
+LIMITE_INTEIRO = 2**31 - 1
+
+DDL_QUALIDADE = f"""
+CREATE TABLE IF NOT EXISTS {TABELA_RESULTADOS} (
+    Pipeline VARCHAR(100),
+    Run_Id VARCHAR(250),
+    Dataset VARCHAR(100),
+    Regra VARCHAR(100),
+    Coluna VARCHAR(200),
+    Registros BIGINT,
+    Falhas BIGINT,
+    Taxa DECIMAL(7,4),
+    Acao VARCHAR(20),
+    Status VARCHAR(10),
+    Verificado_Em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_data_quality_resultados_run_id ON {TABELA_RESULTADOS} (Run_Id);
+"""
+
+# Conversões de TEXT sem erro (NULL se o valor não converte), nos mesmos formatos aceitos pelo pandas
+DDL_CONVERSOES = r"""
+CREATE OR REPLACE FUNCTION pipeline_numero(valor TEXT) RETURNS NUMERIC
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN valor ~ '^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d{1,4})?\s*$' THEN valor::numeric END
+$$;
+CREATE OR REPLACE FUNCTION pipeline_inteiro(valor TEXT) RETURNS INTEGER
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN numero = trunc(numero) AND abs(numero) <= 2147483647 THEN numero::integer END
+    FROM pipeline_numero(valor) AS numero
+$$;
+CREATE OR REPLACE FUNCTION pipeline_data(valor TEXT) RETURNS DATE
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE
+        WHEN partes IS NULL OR partes[1]::int < 1 OR partes[2]::int NOT BETWEEN 1 AND 12 THEN NULL
+        WHEN partes[3]::int BETWEEN 1 AND extract(day from make_date(partes[1]::int, partes[2]::int, 1)
+                                                       + interval '1 month - 1 day')
+            THEN make_date(partes[1]::int, partes[2]::int, partes[3]::int)
+    END
+    FROM regexp_match(valor, '^(\d{4})-(\d{1,2})-(\d{1,2})$') AS partes
+$$;
+"""
+
+# Regras do pipeline_produtos_vendas
+REGRAS_QUALIDADE_PRODUTOS = [
+    {'tipo': 'schema', 'colunas': {'ID_Produto': 'texto', 'Preco_Custo': 'numero'}, 'acao': 'quarentena'},
+    {'tipo': 'obrigatorio', 'colunas': ['ID_Produto'], 'acao': 'quarentena'},
+    {'tipo': 'unico', 'colunas': ['ID_Produto']},
+    {'tipo': 'intervalo', 'coluna': 'Preco_Custo', 'minimo': 0},
+    {'tipo': 'nulos', 'coluna': 'Preco_Custo', 'taxa_maxima': 0.5},
+    {'tipo': 'nulos', 'coluna': 'Fornecedor', 'taxa_maxima': 0.5},
+]
+REGRAS_QUALIDADE_VENDAS = [
+    {'tipo': 'schema', 'colunas': {'Quantidade_Vendida': 'inteiro', 'Preco_Venda': 'numero',
+                                   'Data_Venda': 'data'}, 'acao': 'quarentena'},
+    {'tipo': 'obrigatorio', 'colunas': ['ID_Venda', 'ID_Produto', 'Data_Venda'], 'acao': 'quarentena'},
+    # Repetições são resolvidas pelo upsert (chave ID_Venda, Data_Venda): apenas alerta
+    {'tipo': 'unico', 'colunas': ['ID_Venda']},
+    {'tipo': 'intervalo', 'coluna': 'Quantidade_Vendida', 'minimo': 1, 'acao': 'quarentena'},
+    {'tipo': 'intervalo', 'coluna': 'Preco_Venda', 'minimo': 0, 'acao': 'quarentena'},
+    {'tipo': 'referencia', 'coluna': 'ID_Produto', 'referencia': 'produtos', 'acao': 'quarentena'},
+    {'tipo': 'nulos', 'coluna': 'Preco_Venda', 'taxa_maxima': 0.5},
+]
+
+
+def _nome_regra(regra):
+    if 'nome' in regra:
+        return regra['nome']
+    alvo = regra.get('coluna') or '+'.join(regra.get('colunas', []))
+    return f"{regra['tipo']}:{alvo}"
+
+
+def _coluna_regra(regra):
+    colunas = regra.get('colunas')
+    if colunas is None:
+        return regra['coluna']
+    return ', '.join(colunas)
+
+
+def _converter(serie, tipo):
+    """Converte a coluna para o tipo do schema; retorna (valores convertidos, máscara de falhas)"""
+    if tipo == 'texto':
+        return serie, np.zeros(len(serie), dtype=bool)
+    if tipo == 'data':
+        datas = pd.to_datetime(serie, format=FORMATO_DATA, errors='coerce')
+        return serie, (serie.notna() & datas.isna()).to_numpy()
+
+    numeros = pd.to_numeric(serie, errors='coerce')
+    falhas = serie.notna() & numeros.isna()
+    if tipo == 'inteiro':
+        # Fora do Int32 também é falha: a conversão do schema levantaria erro
+        falhas |= numeros.notna() & ((numeros % 1 != 0) | (numeros.abs() > LIMITE_INTEIRO))
+    return numeros, falhas.to_numpy()
+
+
+def _conversao_sql(coluna, tipo):
+    """Falha de conversão de uma coluna TEXT da staging (mesmo critério de _converter)"""
+    if tipo == 'texto':
+        return 'FALSE'
+    funcao = {'numero': 'pipeline_numero', 'inteiro': 'pipeline_inteiro', 'data': 'pipeline_data'}[tipo]
+    return f"(NULLIF({coluna}, '') IS NOT NULL AND {funcao}({coluna}) IS NULL)"
+
+
+def _falha_sql(regra, indice):
+    """Expressão SQL da violação da regra sobre a staging (alias s), como _mascara"""
+    tipo = regra['tipo']
+    if tipo == 'schema':
+        return ' OR '.join(_conversao_sql(coluna, tipo_coluna) for coluna, tipo_coluna in regra['colunas'].items())
+    if tipo == 'obrigatorio':
+        return ' OR '.join(f"NULLIF({coluna}, '') IS NULL" for coluna in regra['colunas'])
+    if tipo == 'nulos':
+        return f"NULLIF({regra['coluna']}, '') IS NULL"
+    if tipo == 'intervalo':
+        limites = []
+        if regra.get('minimo') is not None:
+            limites.append(f"pipeline_numero({regra['coluna']}) < {regra['minimo']}")
+        if regra.get('maximo') is not None:
+            limites.append(f"pipeline_numero({regra['coluna']}) > {regra['maximo']}")
+        return ' OR '.join(limites) or 'FALSE'
+    if tipo == 'unico':
+        return f"ordem_{indice} > 1"
+    if tipo == 'referencia':
+        coluna = regra['coluna']
+        return (f"NULLIF({coluna}, '') IS NOT NULL AND NOT EXISTS "
+                f"(SELECT 1 FROM referencia_{regra['referencia']} r WHERE r.valor = s.{coluna})")
+
+    raise ValueError(f"Tipo de regra inválido: {tipo}")
+
+
+class DataQuality:
+    """
+    Avalia as regras de qualidade de um dataset, chunk a chunk
+    - check(df): retorna os registros aprovados (reprovados em quarentena)
+    - check_table(loader, tabela, colunas): o mesmo sobre uma staging no banco (modo ELT)
+    - results(): DataFrame com uma linha por regra
+    - report(): registra os resultados e aplica as regras com ação 'erro'
+    """
+
+    def __init__(self, dataset, regras, referencias=None):
+        for regra in regras:
+            if regra.get('acao', 'alerta') not in ACOES:
+                raise ValueError(f"Ação inválida na regra {_nome_regra(regra)}: {regra['acao']}")
+            if regra['tipo'] == 'schema' and not set(regra['colunas'].values()) <= set(TIPOS_SCHEMA):
+                raise ValueError(f"Tipo inválido na regra {_nome_regra(regra)}: {regra['colunas']}")
+            if regra['tipo'] == 'referencia' and regra['referencia'] not in (referencias or {}):
+                raise ValueError(f"Referência não informada para a regra {_nome_regra(regra)}")
+
+        self.dataset = dataset
+        self.regras = regras
+        self.registros = 0
+        self.quarentena = 0
+        self._falhas = {_nome_regra(regra): 0 for regra in regras}
+        self._referencias = {nome: pd.Index(valores).unique() for nome, valores in (referencias or {}).items()}
+        # Hashes das chaves já vistas: conjunto com inserção e consulta O(1) por chave
+        self._vistos = {_nome_regra(regra): set() for regra in regras if regra['tipo'] == 'unico'}
+        self._writer = FrameWriter(f"quarentena_{dataset}")
+
+    def _falhas_unico(self, df, regra):
+        """Chaves repetidas no chunk ou já vistas em chunks anteriores"""
+        nome = _nome_regra(regra)
+        hashes = pd.util.hash_pandas_object(df[regra['colunas']], index=False)
+        repetidos = hashes.duplicated().to_numpy(copy=True)
+        hashes = hashes.tolist()
+        vistos = self._vistos[nome]
+        repetidos |= np.fromiter((valor in vistos for valor in hashes), dtype=bool, count=len(hashes))
+        vistos.update(hashes)
+        return repetidos
+
+    def _mascara(self, df, regra, convertidos):
+        """Máscara dos registros que violam a regra"""
+        tipo = regra['tipo']
+        if tipo == 'obrigatorio':
+            return df[regra['colunas']].isna().any(axis=1).to_numpy()
+        if tipo == 'nulos':
+            return df[regra['coluna']].isna().to_numpy()
+        if tipo == 'intervalo':
+            valores = convertidos.get(regra['coluna'])
+            if valores is None:
+                valores = pd.to_numeric(df[regra['coluna']], errors='coerce')
+            falhas = np.zeros(len(df), dtype=bool)
+            if regra.get('minimo') is not None:
+                falhas |= (valores < regra['minimo']).to_numpy()
+            if regra.get('maximo') is not None:
+                falhas |= (valores > regra['maximo']).to_numpy()
+            return falhas
+        if tipo == 'unico':
+            return self._falhas_unico(df, regra)
+        if tipo == 'referencia':
+            valores = df[regra['coluna']]
+            return (valores.notna() & ~valores.isin(self._referencias[regra['referencia']])).to_numpy()
+
+        raise ValueError(f"Tipo de regra inválido: {tipo}")
+
+    def check(self, df):
+        """
+        Avalia todas as regras no chunk
+        - Colunas numéricas do schema são convertidas nos registros aprovados
+        Retorna os registros que não foram para a quarentena.
+        """
+        convertidos = {}
+        mascaras = {}
+        for regra in self.regras:
+            if regra['tipo'] == 'schema':
+                falhas = np.zeros(len(df), dtype=bool)
+                for coluna, tipo in regra['colunas'].items():
+                    valores, falhas_coluna = _converter(df[coluna], tipo)
+                    if tipo in ('numero', 'inteiro'):
+                        convertidos[coluna] = valores
+                    falhas |= falhas_coluna
+                mascaras[_nome_regra(regra)] = falhas
+            else:
+                mascaras[_nome_regra(regra)] = self._mascara(df, regra, convertidos)
+
+        for nome, mascara in mascaras.items():
+            self._falhas[nome] += int(mascara.sum())
+        self.registros += len(df)
+
+        originais = df
+        if convertidos:
+            df = df.assign(**convertidos)
+
+        quarentena = [(mascaras[_nome_regra(regra)], _nome_regra(regra))
+                      for regra in self.regras if regra.get('acao') == 'quarentena']
+        if not quarentena:
+            return df
+
+        reprovados = np.logical_or.reduce([mascara for mascara, _ in quarentena])
+        if not reprovados.any():
+            return df
+
+        # Motivo: primeira regra violada por cada registro; valores como vieram da origem
+        motivos = np.select([mascara for mascara, _ in quarentena], [nome for _, nome in quarentena], '')
+        rejeitados = originais[reprovados].astype('string').assign(**{COLUNA_MOTIVO: motivos[reprovados]})
+        self._writer.write(rejeitados)
+        self.quarentena += int(reprovados.sum())
+        return df[~reprovados]
+
+    def _enviar_referencia(self, cursor, nome):
+        """Tabela temporária com os valores de uma referência, para as regras em SQL"""
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows([valor] for valor in self._referencias[nome].astype(str))
+        buffer.seek(0)
+        cursor.execute(f"CREATE TEMP TABLE referencia_{nome} (valor TEXT) ON COMMIT DROP")
+        cursor.copy_expert(f"COPY referencia_{nome} (valor) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(f"ANALYZE referencia_{nome}")
+
+    def check_table(self, loader, tabela, colunas):
+        """
+        Avalia todas as regras sobre uma tabela de staging (colunas TEXT), na transação do loader
+        - Mesmas contagens de check(); as conversões nunca levantam erro
+        - Registros reprovados por regras de quarentena são removidos da staging
+          e gravados na quarentena com as colunas informadas
+        """
+        avaliacao = f"qualidade_{tabela}"
+        falhas = ', '.join(f"COALESCE({_falha_sql(regra, indice)}, FALSE) AS falha_{indice}"
+                           for indice, regra in enumerate(self.regras))
+        ordens = ''.join(f", ROW_NUMBER() OVER (PARTITION BY {', '.join(regra['colunas'])} ORDER BY ctid) "
+                         f"AS ordem_{indice}"
+                         for indice, regra in enumerate(self.regras) if regra['tipo'] == 'unico')
+        quarentena = [(indice, _nome_regra(regra)) for indice, regra in enumerate(self.regras)
+                      if regra.get('acao') == 'quarentena']
+
+        with loader.cursor() as cursor:
+            for nome in self._referencias:
+                self._enviar_referencia(cursor, nome)
+            cursor.execute(f"CREATE TEMP TABLE {avaliacao} ON COMMIT DROP AS "
+                           f"SELECT linha, {falhas} FROM (SELECT *, ctid AS linha{ordens} FROM {tabela}) s")
+
+            contagens = ', '.join(f"COUNT(*) FILTER (WHERE falha_{indice})" for indice in range(len(self.regras)))
+            cursor.execute(f"SELECT COUNT(*), {contagens} FROM {avaliacao}")
+            registros, *contagens = cursor.fetchone()
+            for regra, falhas_regra in zip(self.regras, contagens):
+                self._falhas[_nome_regra(regra)] += falhas_regra
+            self.registros += registros
+
+            if quarentena:
+                # Motivo: primeira regra violada por cada registro
+                motivo = ' '.join(f"WHEN falha_{indice} THEN %s" for indice, _ in quarentena)
+                cursor.execute(
+                    f"DELETE FROM {tabela} t USING {avaliacao} a "
+                    f"WHERE t.ctid = a.linha AND ({' OR '.join(f'falha_{indice}' for indice, _ in quarentena)}) "
+                    f"RETURNING {', '.join(f't.{coluna}' for coluna in colunas)}, CASE {motivo} END",
+                    [nome for _, nome in quarentena],
+                )
+                while True:
+                    lote = cursor.fetchmany(LOTE_QUARENTENA)
+                    if not lote:
+                        break
+                    self._writer.write(pd.DataFrame.from_records(lote, columns=[*colunas, COLUNA_MOTIVO])
+                                       .astype('string'))
+                    self.quarentena += len(lote)
+
+            cursor.execute(f"DROP TABLE {avaliacao}")
+            for nome in self._referencias:
+                cursor.execute(f"DROP TABLE referencia_{nome}")
+
+    def results(self):
+        """Resultado por regra: registros avaliados, falhas, taxa, ação e status"""
+        linhas = []
+        for regra in self.regras:
+            nome = _nome_regra(regra)
+            falhas = self._falhas[nome]
+            taxa = falhas / self.registros if self.registros else 0.0
+            if regra['tipo'] == 'nulos':
+                reprovada = taxa > regra['taxa_maxima']
+            else:
+                reprovada = falhas > 0
+            linhas.append({
+                'Dataset': self.dataset,
+                'Regra': nome,
+                'Coluna': _coluna_regra(regra),
+                'Registros': self.registros,
+                'Falhas': falhas,
+                'Taxa': round(taxa, 4),
+                'Acao': regra.get('acao', 'alerta'),
+                'Status': 'falha' if reprovada else 'ok',
+            })
+        return pd.DataFrame(linhas)
+
+    def null_counts(self):
+        """Nulos por coluna contados pelas regras de taxa de nulos"""
+        return {regra['coluna']: self._falhas[_nome_regra(regra)]
+                for regra in self.regras if regra['tipo'] == 'nulos'}
+
+    def report(self):
+        """
+        Registra os resultados nos logs
+        - Levanta ValueError se alguma regra com ação 'erro' falhou
+        Retorna os resultados como lista de dicts (XCom), para save_results().
+        """
+        resultados = self.results()
+        for linha in resultados.itertuples(index=False):
+            marcador = '✓' if linha.Status == 'ok' else ('✗' if linha.Acao == 'erro' else '⚠')
+            logging.info(f"{marcador} {self.dataset} {linha.Regra}: {linha.Falhas} falha(s) "
+                         f"em {linha.Registros} registros ({linha.Taxa:.2%}, {linha.Acao})")
+        if self.quarentena:
+            logging.warning(f"⚠ {self.quarentena} registros de {self.dataset} em quarentena: {self._writer.caminho}")
+
+        erros = resultados[(resultados['Status'] == 'falha') & (resultados['Acao'] == 'erro')]
+        if not erros.empty:
+            raise ValueError(f"Erro de qualidade em {self.dataset}: regra(s) {', '.join(erros['Regra'])}")
+        return resultados.to_dict('records')
+
+    def close(self):
+        """Fecha a quarentena (removendo a de execuções anteriores se não houve reprovados)"""
+        if self._writer.registros:
+            self._writer.close()
+        elif os.path.exists(self._writer.caminho):
+            os.remove(self._writer.caminho)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_results(loader, pipeline, resultados):
+    """
+    Grava os resultados de report() em data_quality_resultados, na transação do BulkLoader
+    - Substitui os resultados de uma tentativa anterior da mesma execução
+    """
+    if not resultados:
+        return
+    df = pd.DataFrame(resultados).assign(Pipeline=pipeline)
+    for dataset in df['Dataset'].unique():
+        loader.execute(
+            f"DELETE FROM {TABELA_RESULTADOS} WHERE Pipeline = %s AND Dataset = %s "
+            f"AND Run_Id IS NOT DISTINCT FROM %s",
+            (pipeline, dataset, loader.run_id),
+        )
+    loader.load(TABELA_RESULTADOS, df)
+    logging.info(f"✓ {len(df)} resultados de qualidade gravados em {TABELA_RESULTADOS}")
@@ -0,0 +1,123 @@
+"""
+Dimensão de produtos em cache
+
+Os joins de vendas com produtos (Preco_Custo na transformação, Nome_Produto e
+Categoria no relatório consolidado) usam um índice de ID_Produto com as
+colunas guardadas em arrays numpy: cada venda é resolvida com uma busca no
+índice (get_indexer) e um take nos arrays, sem merge de DataFrames.
+
+A dimensão já limpa (após a imputação) é gravada como arquivo intermediário
+com uma chave derivada do hash do arquivo de origem e das regras de
+imputação. Enquanto produtos_loja.csv e as regras não mudam, as execuções
+seguintes reaproveitam a dimensão sem reler o CSV nem refazer a limpeza;
+qualquer mudança gera uma chave nova e a dimensão é reconstruída.
+
+Uso:
+    dimensao = ProductDimension.load(chave)
+    if dimensao is None:
+        dimensao = ProductDimension(df_produtos_limpos)
+        dimensao.save(chave)
+    custos = dimensao.lookup(df_vendas['ID_Produto'], 'Preco_Custo')
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from intermediate_storage import frame_exists, intermediate_path, load_frame, save_frame
+
+DIMENSAO_PRODUTOS = 'dimensao_produtos'
+COLUNAS_DIMENSAO = ['Preco_Custo', 'Nome_Produto', 'Categoria']
+
+
+def dimension_key(hash_origem, regras):
+    """Chave da dimensão: muda com o conteúdo da origem ou com as regras de limpeza"""
+    conteudo = hash_origem + json.dumps(regras, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode()).hexdigest()[:16]
+
+
+class ProductDimension:
+    """
+    Índice ID_Produto -> Preco_Custo, Nome_Produto, Categoria em arrays
+    - frame: produtos limpos (um registro por ID_Produto)
+    - IDs ausentes na dimensão resultam em nulo
+    """
+
+    def __init__(self, df_produtos):
+        self.frame = df_produtos.drop_duplicates('ID_Produto').reset_index(drop=True)
+        self._indice = pd.Index(self.frame['ID_Produto'])
+        # Colunas categóricas (ex.: Categoria) são mantidas como Categorical: o take opera nos códigos
+        self._colunas = {
+            coluna: self.frame[coluna].array if isinstance(self.frame[coluna].dtype, pd.CategoricalDtype)
+            else self.frame[coluna].to_numpy()
+            for coluna in COLUNAS_DIMENSAO
+        }
+
+    def __len__(self):
+        return len(self.frame)
+
+    def positions(self, ids):
+        """
+        Posição de cada ID na dimensão (-1 se ausente)
+        - IDs categóricos: busca apenas as categorias e expande pelos códigos
+        """
+        if isinstance(getattr(ids, 'dtype', None), pd.CategoricalDtype):
+            por_categoria = np.append(self._indice.get_indexer(ids.cat.categories), -1)
+            return por_categoria[np.asarray(ids.cat.codes)]
+        return self._indice.get_indexer(ids)
+
+    def _take(self, posicoes, coluna):
+        ausentes = posicoes < 0
+        if isinstance(self._colunas[coluna], pd.Categorical):
+            categorico = self._colunas[coluna]
+            codigos = categorico.codes.take(posicoes, mode='clip')
+            codigos[ausentes] = -1
+            return pd.Categorical.from_codes(codigos, dtype=categorico.dtype)
+
+        valores = self._colunas[coluna].take(posicoes, mode='clip')
+        if ausentes.any():
+            valores = valores.astype(float if valores.dtype.kind in 'iuf' else object)
+            valores[ausentes] = np.nan if valores.dtype.kind == 'f' else None
+        return valores
+
+    def lookup(self, ids, coluna):
+        """Array com o valor da coluna para cada ID"""
+        return self._take(self.positions(ids), coluna)
+
+    def take(self, ids, colunas):
+        """DataFrame com as colunas para cada ID (mesmo índice de ids, se for Series)"""
+        posicoes = self.positions(ids)
+        return pd.DataFrame(
+            {coluna: self._take(posicoes, coluna) for coluna in colunas},
+            index=ids.index if isinstance(ids, pd.Series) else None,
+        )
+
+    @staticmethod
+    def _dataset(chave):
+        return f"{DIMENSAO_PRODUTOS}_{chave}"
+
+    def save(self, chave):
+        """Grava a dimensão e remove as versões de chaves anteriores"""
+        caminho = save_frame(self.frame, self._dataset(chave))
+        for antigo in glob.glob(intermediate_path(self._dataset('*'))):
+            if antigo != caminho:
+                try:
+                    os.remove(antigo)
+                except OSError:
+                    pass
+        logging.info(f"✓ Dimensão de produtos gravada em cache ({len(self)} produtos, chave {chave})")
+        return caminho
+
+    @classmethod
+    def load(cls, chave):
+        """Dimensão gravada para a chave, ou None se não houver cache válido"""
+        if not frame_exists(cls._dataset(chave)):
+            return None
+        dimensao = cls(load_frame(cls._dataset(chave), memory_map=True))
+        logging.info(f"✓ Dimensão de produtos reaproveitada do cache ({len(dimensao)} produtos, chave {chave})")
+        return dimensao
@@ -0,0 +1,201 @@
+"""
+Modo ELT: transformação dentro do PostgreSQL
+
+No modo ELT os CSVs de origem são enviados sem alteração (COPY direto do
+arquivo) para tabelas de staging e toda a transformação é feita em SQL, sem
+trazer os registros para o worker:
+- limpeza de produtos (Preco_Custo pela média da categoria, Fornecedor padrão)
+- preenchimento de Preco_Venda, Receita_Total, Margem_Lucro e Mes_Venda
+- join de relatorio_vendas e atualização da camada agregada
+
+As expressões de preenchimento de nulos são geradas a partir das mesmas
+regras declarativas do modo ETL (ver imputation.impute_sql). As regras de
+qualidade também são as do modo ETL, avaliadas na staging por
+DataQuality.check_table, e as conversões de TEXT são guardadas
+(pipeline_numero, pipeline_inteiro, pipeline_data): um valor inválido vira
+NULL em vez de abortar a transação da carga.
+
+Parâmetro modo_execucao da DAG:
+- 'etl': transformação em pandas no worker (padrão)
+- 'elt': transformação em SQL no banco
+"""
+
+import logging
+
+import pandas as pd
+
+from imputation import REGRAS_PRODUTOS, REGRAS_VENDAS, impute_sql
+from schema_manager import partition_months
+
+MODO_ETL = 'etl'
+MODO_ELT = 'elt'
+MODOS_EXECUCAO = (MODO_ETL, MODO_ELT)
+
+STAGING_PRODUTOS = 'raw_produtos_loja'
+STAGING_VENDAS = 'raw_vendas_produtos'
+
+COLUNAS_STAGING = {
+    STAGING_PRODUTOS: ['ID_Produto', 'Nome_Produto', 'Categoria', 'Preco_Custo', 'Fornecedor', 'Status'],
+    STAGING_VENDAS: ['ID_Venda', 'ID_Produto', 'Quantidade_Vendida', 'Preco_Venda', 'Data_Venda', 'Canal_Venda'],
+}
+
+# Staging sem tipos (TEXT) e sem WAL: recebe o CSV como está e é recarregada a cada execução
+DDL_STAGING = {
+    tabela: f"CREATE UNLOGGED TABLE IF NOT EXISTS {tabela} ({', '.join(f'{coluna} TEXT' for coluna in colunas)})"
+    for tabela, colunas in COLUNAS_STAGING.items()
+}
+
+SQL_PRODUTOS = f"""
+WITH tipados AS (
+    SELECT DISTINCT ON (ID_Produto)
+        ID_Produto,
+        Nome_Produto,
+        Categoria,
+        pipeline_numero(Preco_Custo) AS Preco_Custo,
+        NULLIF(Fornecedor, '') AS Fornecedor,
+        Status
+    FROM {STAGING_PRODUTOS}
+    WHERE ID_Produto IS NOT NULL
+    ORDER BY ID_Produto
+)
+INSERT INTO produtos_processados (ID_Produto, Nome_Produto, Categoria, Preco_Custo, Fornecedor, Status, Run_Id)
+SELECT
+    ID_Produto,
+    Nome_Produto,
+    Categoria,
+    {{Preco_Custo}},
+    {{Fornecedor}},
+    Status,
+    %(run_id)s
+FROM tipados
+ON CONFLICT (ID_Produto) DO UPDATE SET
+    Nome_Produto = EXCLUDED.Nome_Produto,
+    Categoria = EXCLUDED.Categoria,
+    Preco_Custo = EXCLUDED.Preco_Custo,
+    Fornecedor = EXCLUDED.Fornecedor,
+    Status = EXCLUDED.Status,
+    Run_Id = EXCLUDED.Run_Id
+"""
+
+# Vendas tipadas dentro da janela de carga, com o Preco_Custo do produto
+CTE_VENDAS = f"""
+WITH tipados AS (
+    SELECT
+        v.ID_Venda,
+        v.ID_Produto,
+        pipeline_inteiro(v.Quantidade_Vendida) AS Quantidade_Vendida,
+        pipeline_numero(v.Preco_Venda) AS Preco_Venda,
+        pipeline_data(v.Data_Venda) AS Data_Venda,
+        v.Canal_Venda,
+        p.Preco_Custo
+    FROM {STAGING_VENDAS} v
+    LEFT JOIN produtos_processados p ON p.ID_Produto = v.ID_Produto
+),
+janela AS (
+    SELECT * FROM tipados
+    WHERE Data_Venda IS NOT NULL
+      AND (%(inicio)s::date IS NULL OR Data_Venda >= %(inicio)s::date)
+      AND (%(fim)s::date IS NULL OR Data_Venda <= %(fim)s::date)
+)
+"""
+
+SQL_VENDAS = CTE_VENDAS + """,
+limpos AS (
+    SELECT DISTINCT ON (ID_Venda, Data_Venda)
+        ID_Venda, ID_Produto, Quantidade_Vendida, {Preco_Venda} AS Preco_Venda,
+        Data_Venda, Canal_Venda, Preco_Custo
+    FROM janela
+    ORDER BY ID_Venda, Data_Venda
+)
+INSERT INTO vendas_processadas (
+    ID_Venda, ID_Produto, Quantidade_Vendida, Preco_Venda, Data_Venda,
+    Canal_Venda, Receita_Total, Margem_Lucro, Mes_Venda, Run_Id
+)
+SELECT
+    ID_Venda,
+    ID_Produto,
+    Quantidade_Vendida,
+    Preco_Venda,
+    Data_Venda,
+    Canal_Venda,
+    Quantidade_Vendida * Preco_Venda,
+    Preco_Venda - Preco_Custo,
+    to_char(Data_Venda, 'YYYY-MM'),
+    %(run_id)s
+FROM limpos
+ON CONFLICT (ID_Venda, Data_Venda) DO UPDATE SET
+    ID_Produto = EXCLUDED.ID_Produto,
+    Quantidade_Vendida = EXCLUDED.Quantidade_Vendida,
+    Preco_Venda = EXCLUDED.Preco_Venda,
+    Canal_Venda = EXCLUDED.Canal_Venda,
+    Receita_Total = EXCLUDED.Receita_Total,
+    Margem_Lucro = EXCLUDED.Margem_Lucro,
+    Mes_Venda = EXCLUDED.Mes_Venda,
+    Run_Id = EXCLUDED.Run_Id
+"""
+
+SQL_MESES_VENDAS = CTE_VENDAS + "SELECT DISTINCT date_trunc('month', Data_Venda)::date FROM janela"
+
+SQL_MARCA_VENDAS = CTE_VENDAS + "SELECT MAX(Data_Venda) FROM janela"
+
+SQL_DIAS_VENDAS = CTE_VENDAS + "SELECT DISTINCT Data_Venda FROM janela"
+
+
+def resolve_execution_mode(context):
+    """Lê o modo de execução (ETL em pandas ou ELT em SQL) da execução da DAG"""
+    params = context.get('params') or {}
+    modo = params.get('modo_execucao') or MODO_ETL
+    if modo not in MODOS_EXECUCAO:
+        raise ValueError(f"modo_execucao inválido: {modo} (esperado um de {MODOS_EXECUCAO})")
+    return modo
+
+
+def stage_csv(loader, tabela, caminhos):
+    """Recarrega a tabela de staging com um ou mais CSVs brutos (COPY direto de cada arquivo)"""
+    if isinstance(caminhos, str):
+        caminhos = [caminhos]
+    loader.execute(DDL_STAGING[tabela])
+    loader.truncate(tabela)
+    registros = 0
+    for caminho in caminhos:
+        copiados = loader.copy_file(tabela, caminho)
+        logging.info(f"✓ {copiados} registros de {caminho} enviados para {tabela}")
+        registros += copiados
+    return registros
+
+
+def transform_produtos_sql(loader, regras=REGRAS_PRODUTOS):
+    """Limpa os produtos da staging e faz upsert em produtos_processados"""
+    sql = SQL_PRODUTOS.format(**impute_sql(regras, ['Preco_Custo', 'Fornecedor']))
+    return loader.insert_select('produtos_processados', sql, {'run_id': loader.run_id})
+
+
+def staged_months(postgres_hook, janela):
+    """Meses (Periods) das vendas da staging dentro da janela, para criar as partições antes da carga"""
+    parametros = {'inicio': janela['inicio'], 'fim': janela['fim']}
+    registros = postgres_hook.get_records(SQL_MESES_VENDAS, parameters=parametros)
+    return partition_months(pd.Series([registro[0] for registro in registros]))
+
+
+def transform_vendas_sql(loader, janela, regras=REGRAS_VENDAS):
+    """
+    Transforma as vendas da staging e faz upsert em vendas_processadas
+    - Apenas vendas dentro da janela de carga
+    - As partições mensais já devem existir (ver staged_months)
+    Retorna (registros, meses afetados, dias afetados, marca d'água).
+    """
+    parametros = {'inicio': janela['inicio'], 'fim': janela['fim'], 'run_id': loader.run_id}
+
+    with loader.cursor() as cursor:
+        cursor.execute(SQL_MESES_VENDAS, parametros)
+        meses = partition_months(pd.Series([registro[0] for registro in cursor.fetchall()]))
+
+        cursor.execute(SQL_DIAS_VENDAS, parametros)
+        dias = [dia for dia, in cursor.fetchall()]
+
+        cursor.execute(SQL_MARCA_VENDAS, parametros)
+        marca = cursor.fetchone()[0]
+
+    sql = SQL_VENDAS.format(**impute_sql(regras, ['Preco_Venda']))
+    registros = loader.insert_select('vendas_processadas', sql, parametros)
+    return registros, [mes.strftime('%Y-%m') for mes in meses], dias, marca
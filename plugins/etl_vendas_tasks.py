@@ -0,0 +1,129 @@
+"""
+Tasks do etl_vendas_pipeline
+
+Funções executadas pelas tasks da DAG dags/etl_vendas_pipeline.py, importadas
+apenas na execução (ver lazy_tasks.py).
+"""
+
+import logging
+
+from bulk_loader import BulkLoader, ensure_table
+from connection_pool import get_hook
+from imputation import REGRAS_DADOS_VENDAS, impute
+from incremental import (
+    DDL_WATERMARKS,
+    MODO_FULL,
+    compute_watermark,
+    filter_window,
+    resolve_load_window,
+    update_watermark,
+)
+from instrumentation import instrument
+from intermediate_storage import save_frame, load_frame
+from schema_registry import apply_schema, read_dtypes
+from streaming import read_csv
+
+# Arquivo de origem
+DADOS_FILE = '/opt/airflow/data/dados_vendas.csv'
+
+# Identificação da marca d'água da carga incremental
+WATERMARK_PIPELINE = 'etl_vendas_pipeline'
+WATERMARK_TABELA = 'vendas'
+
+# Tabela de destino, índices e marca d'água
+DDL_VENDAS = """
+CREATE TABLE IF NOT EXISTS vendas (
+    ID_Produto VARCHAR(10),
+    Valor DECIMAL(10,2),
+    Quantidade INTEGER,
+    Data DATE,
+    Regiao VARCHAR(20),
+    TotalVenda DECIMAL(10,2)
+);
+
+-- Índices para a substituição por intervalo de datas e consultas por produto
+CREATE INDEX IF NOT EXISTS ix_vendas_data ON vendas (Data);
+CREATE INDEX IF NOT EXISTS ix_vendas_produto ON vendas (ID_Produto);
+""" + DDL_WATERMARKS
+
+def create_table(**context):
+    """
+    Cria a tabela vendas (substitui o PostgresOperator: nenhum provider importado no parse da DAG)
+    - A tabela criada pelo to_sql das versões anteriores é migrada antes dos índices (ver ensure_table)
+    """
+    ensure_table(get_hook('postgres_default'), 'vendas', DDL_VENDAS)
+    logging.info("✓ Tabela vendas verificada")
+
+@instrument('extract')
+def extract_data(**context):
+    """Extrai dados do arquivo CSV"""
+    file_path = DADOS_FILE
+    logging.info(f"Extraindo dados de: {file_path}")
+    
+    # Extrai apenas a janela de datas desta execução (marca d'água ou backfill)
+    postgres_hook = get_hook('postgres_default')
+    janela = resolve_load_window(context, postgres_hook, WATERMARK_PIPELINE, WATERMARK_TABELA)
+    
+    # dtypes do registro de schemas: categorias para ID_Produto e Regiao, Int32, decimais
+    df = apply_schema(read_csv(file_path, dtype=read_dtypes('dados_vendas')), 'dados_vendas')
+    df = filter_window(df, 'Data', janela)
+    logging.info(f"Dados extraídos: {len(df)} registros")
+    
+    # Salva dados extraídos para próxima tarefa
+    save_frame(df, 'dados_extraidos')
+    return {
+        'registros': len(df),
+        'modo': janela['modo'],
+        'inicio': janela['inicio'].isoformat() if janela['inicio'] else None,
+        'fim': janela['fim'].isoformat() if janela['fim'] else None,
+    }
+
+@instrument('transform')
+def transform_data(**context):
+    """Transforma os dados extraídos"""
+    logging.info("Iniciando transformação dos dados")
+    
+    # Carrega dados extraídos
+    df = load_frame('dados_extraidos')
+    
+    # Limpeza: trata valores nulos (Valor e Quantidade nulos viram 0)
+    df, _ = impute(df, REGRAS_DADOS_VENDAS)
+    
+    # Transformação: calcula total de vendas
+    df['TotalVenda'] = df['Valor'] * df['Quantidade']
+    
+    # Converte data e valores para os tipos do registro de schemas
+    df = apply_schema(df, 'dados_transformados')
+    
+    logging.info(f"Dados transformados: {len(df)} registros")
+    
+    # Salva dados transformados
+    save_frame(df, 'dados_transformados')
+    return f"Transformados {len(df)} registros"
+
+@instrument('load')
+def load_data(**context):
+    """Carrega dados transformados no PostgreSQL"""
+    logging.info("Carregando dados no PostgreSQL")
+    
+    # Carrega dados transformados
+    df = load_frame('dados_transformados', memory_map=True)
+    
+    # Conecta ao PostgreSQL
+    postgres_hook = get_hook('postgres_default')
+    
+    # Janela definida na extração: a tabela não tem chave, então os dias da
+    # janela são substituídos (DELETE + COPY na mesma transação)
+    janela = context['ti'].xcom_pull(task_ids='extract_data')
+    
+    with BulkLoader(postgres_hook) as loader:
+        if janela['modo'] == MODO_FULL:
+            loader.truncate('vendas')
+        elif len(df) > 0 or janela['fim'] is not None:
+            inicio = janela['inicio'] or (df['Data'].min().date() if len(df) > 0 else None)
+            loader.delete_range('vendas', 'Data', inicio, janela['fim'])
+        loader.load('vendas', df)
+        update_watermark(loader, WATERMARK_PIPELINE, WATERMARK_TABELA, compute_watermark(df, 'Data'))
+    
+    logging.info(f"Dados carregados: {len(df)} registros na tabela vendas")
+    return f"Carregados {len(df)} registros"
@@ -0,0 +1,161 @@
+"""
+Cache de fingerprint dos arquivos de origem
+
+Evita reprocessar arquivos idênticos aos da última carga bem-sucedida. Para
+cada arquivo de origem é guardado em pipeline_fingerprints (ao lado de
+pipeline_watermarks) o tamanho, o mtime e o hash SHA-256 do conteúdo:
+- Caminho rápido: tamanho e mtime iguais aos gravados reaproveitam o hash
+  sem reler o arquivo
+- Caso contrário o hash é recalculado; conteúdo igual com mtime diferente
+  (ex.: arquivo copiado de novo) continua sendo considerado inalterado
+
+A extração compara o fingerprint atual com o gravado e, se nada mudou, pula a
+leitura e reaproveita os arquivos intermediários da execução anterior; as
+tasks seguintes também são puladas. O fingerprint só é gravado junto com a
+carga (mesma transação), então uma execução que falhou nunca é reaproveitada.
+
+O cache só vale no modo incremental: full e backfill sempre reprocessam.
+O parâmetro forcar_reprocessamento da DAG invalida o cache da execução.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from incremental import MODO_INCREMENTAL, resolve_load_mode
+
+DDL_FINGERPRINTS = """
+CREATE TABLE IF NOT EXISTS pipeline_fingerprints (
+    Pipeline VARCHAR(100),
+    Origem VARCHAR(500),
+    Tamanho BIGINT,
+    Mtime_NS BIGINT,
+    Hash VARCHAR(64),
+    Parametros TEXT,
+    Resultado TEXT,
+    Atualizado_Em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Pipeline, Origem)
+);
+"""
+
+BLOCO_HASH = 1 << 20
+
+
+def resolve_force_refresh(context):
+    """Lê o parâmetro forcar_reprocessamento da execução da DAG"""
+    params = context.get('params') or {}
+    return bool(params.get('forcar_reprocessamento', False))
+
+
+def resolve_cache_enabled(context):
+    """O cache vale apenas no modo incremental e sem forcar_reprocessamento"""
+    return not resolve_force_refresh(context) and resolve_load_mode(context) == MODO_INCREMENTAL
+
+
+def content_hash(caminho, bloco=BLOCO_HASH):
+    """Hash SHA-256 do conteúdo do arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for parte in iter(lambda: arquivo.read(bloco), b''):
+            digest.update(parte)
+    return digest.hexdigest()
+
+
+def read_fingerprint(postgres_hook, pipeline, origem):
+    """Retorna o fingerprint gravado na última carga, ou None"""
+    registro = postgres_hook.get_first(
+        "SELECT Tamanho, Mtime_NS, Hash, Parametros, Resultado FROM pipeline_fingerprints "
+        "WHERE Pipeline = %s AND Origem = %s",
+        parameters=(pipeline, origem),
+    )
+    if not registro:
+        return None
+    return {
+        'origem': origem,
+        'tamanho': registro[0],
+        'mtime_ns': registro[1],
+        'hash': registro[2],
+        'parametros': json.loads(registro[3] or '{}'),
+        'resultado': json.loads(registro[4] or '{}'),
+    }
+
+
+def file_fingerprint(caminho, anterior=None):
+    """
+    Calcula o fingerprint de um arquivo
+    - Reaproveita o hash de anterior se tamanho e mtime não mudaram
+    """
+    estado = os.stat(caminho)
+    fingerprint = {'origem': caminho, 'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+    if anterior and (anterior['tamanho'], anterior['mtime_ns']) == (estado.st_size, estado.st_mtime_ns):
+        fingerprint['hash'] = anterior['hash']
+    else:
+        fingerprint['hash'] = content_hash(caminho)
+    return fingerprint
+
+
+def check_source(context, postgres_hook, pipeline, caminho, parametros=None):
+    """
+    Verifica se o arquivo de origem mudou desde a última carga
+    - parametros: opções que mudam a saída da extração (ex.: particionar_por);
+      valores diferentes dos gravados invalidam o cache
+    Retorna (inalterado, fingerprint atual, resultado gravado da extração anterior).
+    """
+    parametros = parametros or {}
+    anterior = read_fingerprint(postgres_hook, pipeline, caminho) if resolve_cache_enabled(context) else None
+    fingerprint = file_fingerprint(caminho, anterior)
+    fingerprint['parametros'] = parametros
+
+    inalterado = (
+        anterior is not None
+        and anterior['hash'] == fingerprint['hash']
+        and anterior['parametros'] == parametros
+    )
+    if inalterado:
+        logging.info(f"✓ {caminho} inalterado desde a última carga (sha256 {fingerprint['hash'][:12]})")
+        return True, fingerprint, anterior['resultado']
+
+    logging.info(f"Fingerprint de {caminho}: sha256 {fingerprint['hash'][:12]} ({fingerprint['tamanho']} bytes)")
+    return False, fingerprint, None
+
+
+def save_fingerprint(loader, pipeline, fingerprint):
+    """Grava o fingerprint de um arquivo dentro da transação do BulkLoader"""
+    if not fingerprint:
+        return
+
+    loader.execute(
+        """
+        INSERT INTO pipeline_fingerprints (
+            Pipeline, Origem, Tamanho, Mtime_NS, Hash, Parametros, Resultado, Atualizado_Em
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (Pipeline, Origem) DO UPDATE SET
+            Tamanho = EXCLUDED.Tamanho,
+            Mtime_NS = EXCLUDED.Mtime_NS,
+            Hash = EXCLUDED.Hash,
+            Parametros = EXCLUDED.Parametros,
+            Resultado = EXCLUDED.Resultado,
+            Atualizado_Em = CURRENT_TIMESTAMP
+        """,
+        (
+            pipeline, fingerprint['origem'], fingerprint['tamanho'], fingerprint['mtime_ns'],
+            fingerprint['hash'], json.dumps(fingerprint.get('parametros') or {}),
+            json.dumps(fingerprint.get('resultado') or {}, default=str),
+        ),
+    )
+    logging.info(f"✓ Fingerprint de {fingerprint['origem']} gravado")
+
+
+def invalidate_fingerprints(postgres_hook, pipeline, origem=None):
+    """Remove os fingerprints do pipeline (ou de uma origem), forçando o reprocessamento"""
+    if origem is None:
+        postgres_hook.run("DELETE FROM pipeline_fingerprints WHERE Pipeline = %s", parameters=(pipeline,))
+    else:
+        postgres_hook.run(
+            "DELETE FROM pipeline_fingerprints WHERE Pipeline = %s AND Origem = %s",
+            parameters=(pipeline, origem),
+        )
+    logging.info(f"✓ Cache de fingerprint de {pipeline} invalidado" + (f" ({origem})" if origem else ""))
@@ -0,0 +1,119 @@
+"""
+Modo fundido: extract → transform → load em uma única task
+
+Em lotes pequenos e médios a maior parte do tempo da DAG é a passagem entre
+tasks pelo scheduler, e cada task relê o arquivo intermediário gravado pela
+anterior em /tmp (que é local ao worker). No modo fundido as mesmas funções
+das tasks rodam em sequência, no mesmo processo:
+- os datasets intermediários ficam em memória como tabelas Arrow
+  (intermediate_storage.in_memory), sem gravar nem reler arquivos
+- o XCom entre as etapas é mantido em memória por FusedTaskInstance, com o
+  mesmo formato do Airflow (tasks mapeadas retornam uma lista)
+- cada etapa mantém seus logs e suas métricas (@instrument), identificadas
+  pelo task_id da etapa
+
+Parâmetro execucao_fundida da DAG:
+- False: uma task por etapa, com shards em tasks mapeadas (padrão; lotes grandes)
+- True: todas as etapas na task pipeline_fundido
+
+Uso:
+    with FusedRun(context, datasets) as execucao:
+        execucao.run('extract_vendas', extract_vendas)
+        execucao.run('transform_data', transform_data, mapeamentos=[{'shard': None}])
+"""
+
+import logging
+import time
+
+from intermediate_storage import in_memory
+
+TASK_FUNDIDA = 'pipeline_fundido'
+
+
+def resolve_fused(context):
+    """Lê o parâmetro execucao_fundida da execução da DAG"""
+    params = context.get('params') or {}
+    return bool(params.get('execucao_fundida', False))
+
+
+class FusedTaskInstance:
+    """
+    TaskInstance das etapas do modo fundido
+    - XCom em memória, com o task_id da etapa em execução
+    - Identificação (dag_id, run_id) da task real pipeline_fundido
+    """
+
+    def __init__(self, ti=None):
+        self._ti = ti
+        self._xcom = {}
+        self.task_id = None
+        self.map_index = -1
+
+    @property
+    def dag_id(self):
+        return getattr(self._ti, 'dag_id', None)
+
+    @property
+    def run_id(self):
+        return getattr(self._ti, 'run_id', None)
+
+    def xcom_push(self, key, value):
+        valores = self._xcom.setdefault((self.task_id, key), {})
+        valores[self.map_index] = value
+
+    def xcom_pull(self, task_ids, key='return_value'):
+        valores = self._xcom.get((task_ids, key))
+        if valores is None:
+            return None
+        # Etapa mapeada: lista com o valor de cada instância, como no Airflow
+        if list(valores) == [-1]:
+            return valores[-1]
+        return [valores[indice] for indice in sorted(valores)]
+
+
+class FusedRun:
+    """
+    Executa as etapas do pipeline em sequência no processo da task
+    - datasets: nomes dos datasets intermediários mantidos em memória
+    - run() retorna o resultado da etapa (lista de resultados se mapeada)
+    """
+
+    def __init__(self, context, datasets):
+        self.ti = FusedTaskInstance(context.get('ti'))
+        self.context = {**context, 'ti': self.ti}
+        self.tempos = {}
+        self._memoria = in_memory(*datasets)
+
+    def run(self, task_id, funcao, mapeamentos=None):
+        logging.info(f"=== Modo fundido: etapa {task_id} ===")
+        self.ti.task_id = task_id
+        inicio = time.perf_counter()
+        if mapeamentos is None:
+            self.ti.map_index = -1
+            resultado = funcao(**self.context)
+            self.ti.xcom_push('return_value', resultado)
+        else:
+            resultado = []
+            for indice, kwargs in enumerate(mapeamentos):
+                self.ti.map_index = indice
+                resultado.append(funcao(**kwargs, **self.context))
+                self.ti.xcom_push('return_value', resultado[-1])
+            self.ti.map_index = -1
+        self.tempos[task_id] = round(time.perf_counter() - inicio, 3)
+        return resultado
+
+    def xcom_pull(self, task_ids, key='return_value'):
+        return self.ti.xcom_pull(task_ids=task_ids, key=key)
+
+    def metrics(self):
+        """Métricas de cada etapa (@instrument), por task_id (lista se mapeada)"""
+        return {task_id: self.ti.xcom_pull(task_ids=task_id, key='metricas') for task_id in self.tempos}
+
+    def __enter__(self):
+        self._memoria.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._memoria.__exit__(exc_type, exc, tb)
+        resumo = ', '.join(f"{task_id} {tempo:.2f}s" for task_id, tempo in self.tempos.items())
+        logging.info(f"✓ Modo fundido: {resumo}")
@@ -0,0 +1,129 @@
+"""
+Imputação de valores nulos
+
+Estágio declarativo de preenchimento de nulos, reutilizado pelas DAGs. Cada
+regra informa a coluna e a estratégia; as estatísticas por grupo são
+calculadas com um único groupby e aplicadas com map, sem loops por categoria.
+
+Estratégias:
+- media_grupo / mediana_grupo: média/mediana da coluna dentro do grupo
+- constante: valor fixo
+- derivada: outra coluna multiplicada por um fator (ex.: Preco_Custo * 1.3)
+
+impute_sql() gera as expressões SQL equivalentes, usadas pelo modo ELT.
+
+Exemplo:
+    regras = [
+        {'coluna': 'Preco_Custo', 'estrategia': 'media_grupo', 'grupo': 'Categoria'},
+        {'coluna': 'Fornecedor', 'estrategia': 'constante', 'valor': 'Não Informado'},
+    ]
+    df, preenchidos = impute(df, regras)
+"""
+
+import logging
+
+import pandas as pd
+
+ESTRATEGIAS_NUMERICAS = {'media_grupo', 'mediana_grupo', 'derivada'}
+AGREGACOES = {'media_grupo': 'mean', 'mediana_grupo': 'median'}
+
+# Regras do pipeline_produtos_vendas
+REGRAS_PRODUTOS = [
+    {'coluna': 'Preco_Custo', 'estrategia': 'media_grupo', 'grupo': 'Categoria'},
+    {'coluna': 'Fornecedor', 'estrategia': 'constante', 'valor': 'Não Informado'},
+]
+REGRAS_VENDAS = [
+    {'coluna': 'Preco_Venda', 'estrategia': 'derivada', 'origem': 'Preco_Custo', 'fator': 1.3},
+]
+
+# Regras do etl_vendas_pipeline
+REGRAS_DADOS_VENDAS = [
+    {'coluna': 'Valor', 'estrategia': 'constante', 'valor': 0},
+    {'coluna': 'Quantidade', 'estrategia': 'constante', 'valor': 0},
+]
+
+
+def _valores_preenchimento(df, regra):
+    """Calcula, para todas as linhas, o valor que substitui os nulos da regra"""
+    estrategia = regra['estrategia']
+
+    if estrategia in AGREGACOES:
+        estatisticas = df.groupby(regra['grupo'], observed=True)[regra['coluna']].agg(AGREGACOES[estrategia])
+        return df[regra['grupo']].map(estatisticas), estatisticas
+    if estrategia == 'constante':
+        return regra['valor'], None
+    if estrategia == 'derivada':
+        return pd.to_numeric(df[regra['origem']], errors='coerce') * regra.get('fator', 1), None
+
+    raise ValueError(f"Estratégia de imputação inválida: {estrategia}")
+
+
+def impute(df, regras, verbose=True):
+    """
+    Aplica as regras de imputação em ordem
+    - Colunas das estratégias numéricas são convertidas com pd.to_numeric
+    - verbose: registra nos logs as colunas (e grupos) preenchidos
+    Retorna o DataFrame e um dict coluna -> número de valores preenchidos.
+    """
+    preenchidos = {}
+
+    for regra in regras:
+        coluna = regra['coluna']
+        if regra['estrategia'] in ESTRATEGIAS_NUMERICAS or isinstance(regra.get('valor'), (int, float)):
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce')
+
+        mask = df[coluna].isna()
+        num_nulos = int(mask.sum())
+        preenchidos[coluna] = num_nulos
+        if num_nulos == 0:
+            continue
+
+        valores, estatisticas = _valores_preenchimento(df, regra)
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype) and valores not in df[coluna].cat.categories:
+            # Coluna categórica (ver schema_registry.py): o valor constante vira uma categoria nova
+            df[coluna] = df[coluna].cat.add_categories([valores])
+        df[coluna] = df[coluna].fillna(valores)
+
+        if verbose and estatisticas is not None:
+            for grupo in df.loc[mask, regra['grupo']].unique():
+                logging.info(f"✓ Preenchido {coluna} para {regra['grupo']} '{grupo}' "
+                             f"({regra['estrategia']}): {estatisticas[grupo]:.2f}")
+        elif verbose:
+            logging.info(f"✓ Preenchido {num_nulos} valores de {coluna} ({regra['estrategia']})")
+
+    return df, preenchidos
+
+
+def _literal_sql(valor):
+    if isinstance(valor, (int, float)):
+        return repr(valor)
+    # '%' duplicado: as consultas do modo ELT são executadas com parâmetros
+    return "'" + str(valor).replace("'", "''").replace('%', '%%') + "'"
+
+
+def impute_sql(regras, colunas):
+    """
+    Expressões SQL equivalentes às regras, para transformação no banco (modo ELT)
+    - colunas: colunas a retornar; sem regra, a expressão é a própria coluna
+    - mediana_grupo não é suportada (não há mediana como função de janela no PostgreSQL)
+    Retorna um dict coluna -> expressão SQL.
+    """
+    expressoes = {coluna: coluna for coluna in colunas}
+
+    for regra in regras:
+        coluna = regra['coluna']
+        estrategia = regra['estrategia']
+        if coluna not in expressoes:
+            continue
+
+        if estrategia == 'media_grupo':
+            substituto = f"AVG({coluna}) OVER (PARTITION BY {regra['grupo']})"
+        elif estrategia == 'constante':
+            substituto = _literal_sql(regra['valor'])
+        elif estrategia == 'derivada':
+            substituto = f"{regra['origem']} * {regra.get('fator', 1)}"
+        else:
+            raise ValueError(f"Estratégia de imputação não suportada em SQL: {estrategia}")
+        expressoes[coluna] = f"COALESCE({coluna}, {substituto})"
+
+    return expressoes
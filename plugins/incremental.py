@@ -0,0 +1,140 @@
+"""
+Carga incremental por marca d'água (high-water mark)
+
+Em vez de truncar e recarregar todo o histórico a cada execução, cada
+pipeline guarda em pipeline_watermarks a última data carregada com sucesso.
+A extração filtra apenas os registros a partir da marca e a carga faz upsert
+(staging + INSERT ... ON CONFLICT), de modo que o custo diário cresce com os
+registros novos e não com o histórico.
+
+A marca é só a data: o último dia é sempre reprocessado (o upsert torna isso
+idempotente), então um ID de desempate não filtraria nada e perderia vendas
+do último dia que chegassem com IDs menores.
+
+Modos de carga (parâmetro modo_carga da DAG):
+- incremental: processa registros com data >= marca d'água (padrão)
+- full: trunca as tabelas e recarrega tudo
+- backfill: reprocessa o intervalo [backfill_inicio, backfill_fim]
+"""
+
+import logging
+from datetime import date
+
+import pandas as pd
+
+MODO_INCREMENTAL = 'incremental'
+MODO_FULL = 'full'
+MODO_BACKFILL = 'backfill'
+MODOS_CARGA = (MODO_INCREMENTAL, MODO_FULL, MODO_BACKFILL)
+
+DDL_WATERMARKS = """
+CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+    Pipeline VARCHAR(100),
+    Tabela VARCHAR(100),
+    Ultima_Data DATE,
+    Atualizado_Em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Pipeline, Tabela)
+);
+"""
+
+
+def resolve_load_mode(context):
+    """Lê o modo de carga da execução da DAG"""
+    params = context.get('params') or {}
+    modo = params.get('modo_carga') or MODO_INCREMENTAL
+    if modo not in MODOS_CARGA:
+        raise ValueError(f"modo_carga inválido: {modo} (esperado um de {MODOS_CARGA})")
+    return modo
+
+
+def _parse_data(valor, nome):
+    if valor in (None, ''):
+        raise ValueError(f"Parâmetro {nome} é obrigatório no modo backfill")
+    return date.fromisoformat(str(valor))
+
+
+def read_watermark(postgres_hook, pipeline, tabela):
+    """Retorna a última data da marca d'água, ou None se não existir"""
+    registro = postgres_hook.get_first(
+        "SELECT Ultima_Data FROM pipeline_watermarks WHERE Pipeline = %s AND Tabela = %s",
+        parameters=(pipeline, tabela),
+    )
+    return registro[0] if registro else None
+
+
+def resolve_load_window(context, postgres_hook, pipeline, tabela):
+    """
+    Define a janela de datas a processar nesta execução
+    Retorna um dict com modo, inicio e fim (datas inclusivas, None = sem limite).
+    """
+    modo = resolve_load_mode(context)
+    params = context.get('params') or {}
+
+    if modo == MODO_FULL:
+        janela = {'modo': modo, 'inicio': None, 'fim': None}
+    elif modo == MODO_BACKFILL:
+        inicio = _parse_data(params.get('backfill_inicio'), 'backfill_inicio')
+        fim = _parse_data(params.get('backfill_fim'), 'backfill_fim')
+        if fim < inicio:
+            raise ValueError(f"Intervalo de backfill inválido: {inicio} > {fim}")
+        janela = {'modo': modo, 'inicio': inicio, 'fim': fim}
+    else:
+        # O último dia já carregado é reprocessado: o upsert torna isso idempotente
+        # e cobre registros que chegaram depois da última execução
+        ultima_data = read_watermark(postgres_hook, pipeline, tabela)
+        logging.info(f"Marca d'água de {pipeline}.{tabela}: {ultima_data}")
+        janela = {'modo': modo, 'inicio': ultima_data, 'fim': None}
+
+    logging.info(f"✓ Modo de carga: {janela['modo']} (janela: {janela['inicio']} até {janela['fim']})")
+    return janela
+
+
+def filter_window(df, coluna_data, janela):
+    """Mantém apenas os registros cuja data está dentro da janela de carga"""
+    if janela['inicio'] is None and janela['fim'] is None:
+        return df
+
+    datas = pd.to_datetime(df[coluna_data])
+    mask = pd.Series(True, index=df.index)
+    if janela['inicio'] is not None:
+        mask &= datas >= pd.Timestamp(janela['inicio'])
+    if janela['fim'] is not None:
+        mask &= datas <= pd.Timestamp(janela['fim'])
+    return df[mask]
+
+
+def compute_watermark(df, coluna_data):
+    """Retorna a maior data de um lote carregado (None se não houver datas)"""
+    ultima_data = pd.to_datetime(df[coluna_data]).max()
+    return None if pd.isna(ultima_data) else ultima_data.date()
+
+
+def merge_watermark(atual, novo):
+    """Combina duas marcas mantendo a maior (None = sem marca)"""
+    if atual is None:
+        return novo
+    if novo is None:
+        return atual
+    return max(atual, novo)
+
+
+def update_watermark(loader, pipeline, tabela, ultima_data):
+    """
+    Grava a marca d'água dentro da transação do BulkLoader
+    - A marca nunca retrocede (um backfill antigo não move a marca para trás)
+    """
+    if ultima_data is None:
+        logging.info(f"Nenhum registro novo: marca d'água de {pipeline}.{tabela} mantida")
+        return
+
+    loader.execute(
+        """
+        INSERT INTO pipeline_watermarks (Pipeline, Tabela, Ultima_Data, Atualizado_Em)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (Pipeline, Tabela) DO UPDATE SET
+            Ultima_Data = GREATEST(pipeline_watermarks.Ultima_Data, EXCLUDED.Ultima_Data),
+            Atualizado_Em = CURRENT_TIMESTAMP
+        """,
+        (pipeline, tabela, ultima_data),
+    )
+    logging.info(f"✓ Marca d'água de {pipeline}.{tabela} atualizada para {ultima_data}")
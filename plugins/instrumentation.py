@@ -0,0 +1,198 @@
+"""
+Instrumentação de desempenho das tasks
+
+O decorator instrument() envolve a função de uma task e mede, para a fase
+(extract, transform, load, report):
+- tempo de execução (wall time) e tempo de CPU
+- pico de memória residente (RSS) durante a task
+- registros e bytes lidos/gravados
+
+Leituras e gravações são contabilizadas pelos próprios módulos de E/S
+(intermediate_storage, streaming.read_csv, BulkLoader) via record_read() e
+record_write(), sem alterar o código das tasks.
+
+As métricas são:
+- enviadas ao XCom (chave 'metricas')
+- emitidas pelo Stats do Airflow, que as encaminha para StatsD ou
+  OpenTelemetry conforme a seção [metrics] da configuração
+- gravadas em um arquivo JSON Lines local para análise offline
+
+Configuração via variável de ambiente:
+- PIPELINE_METRICS_FILE: arquivo do exportador local
+  (padrão: /tmp/pipeline_metrics.jsonl; vazio desativa)
+
+Uso:
+    @instrument('transform')
+    def transform_data(**context):
+        ...
+"""
+
+import functools
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from datetime import datetime
+
+ARQUIVO_METRICAS = os.environ.get('PIPELINE_METRICS_FILE', '/tmp/pipeline_metrics.jsonl')
+PREFIXO_METRICAS = 'pipeline'
+
+# Medições em andamento (tasks instrumentadas em execução neste processo)
+_ativas = []
+_lock = threading.Lock()
+
+
+def _rss_atual():
+    """RSS atual do processo em bytes (pico acumulado onde /proc não existe)"""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MonitorMemoria(threading.Thread):
+    """Amostra o RSS do processo em segundo plano e guarda o maior valor"""
+
+    def __init__(self, intervalo=0.01):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.pico = _rss_atual()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, _rss_atual())
+
+    def stop(self):
+        self._parar.set()
+        self.join()
+        self.pico = max(self.pico, _rss_atual())
+        return self.pico
+
+
+def _contabilizar(campo_registros, campo_bytes, registros, num_bytes):
+    with _lock:
+        for medicao in _ativas:
+            medicao[campo_registros] += int(registros or 0)
+            medicao[campo_bytes] += int(num_bytes or 0)
+
+
+def record_read(registros=0, num_bytes=0):
+    """Contabiliza registros e bytes lidos pela task em execução"""
+    _contabilizar('registros_lidos', 'bytes_lidos', registros, num_bytes)
+
+
+def record_write(registros=0, num_bytes=0):
+    """Contabiliza registros e bytes gravados pela task em execução"""
+    _contabilizar('registros_gravados', 'bytes_gravados', registros, num_bytes)
+
+
+def _identificacao(funcao, context):
+    ti = context.get('ti')
+    dag = context.get('dag')
+    return {
+        'dag_id': getattr(dag, 'dag_id', None) or getattr(ti, 'dag_id', None),
+        'task_id': getattr(ti, 'task_id', None) or funcao.__name__,
+        'run_id': getattr(ti, 'run_id', None) or context.get('run_id'),
+        'map_index': getattr(ti, 'map_index', -1),
+    }
+
+
+def _emitir_stats(metricas):
+    """Emite as métricas pelo Stats do Airflow (StatsD/OpenTelemetry)"""
+    try:
+        from airflow.stats import Stats
+    except ImportError:
+        return
+
+    nome = f"{PREFIXO_METRICAS}.{metricas['dag_id']}.{metricas['task_id']}"
+    tags = {'fase': metricas['fase'], 'dag_id': metricas['dag_id'], 'task_id': metricas['task_id']}
+    try:
+        Stats.timing(f"{nome}.wall_time", metricas['wall_time_s'] * 1000, tags=tags)
+        Stats.timing(f"{nome}.cpu_time", metricas['cpu_time_s'] * 1000, tags=tags)
+        Stats.gauge(f"{nome}.peak_rss_mb", metricas['pico_rss_mb'], tags=tags)
+        for campo in ('registros_lidos', 'registros_gravados', 'bytes_lidos', 'bytes_gravados'):
+            Stats.incr(f"{nome}.{campo}", metricas[campo], tags=tags)
+    except Exception as erro:
+        logging.warning(f"⚠ Falha ao emitir métricas: {erro}")
+
+
+def _exportar_arquivo(metricas, arquivo=None):
+    """Acrescenta as métricas ao arquivo JSON Lines local"""
+    arquivo = ARQUIVO_METRICAS if arquivo is None else arquivo
+    if not arquivo:
+        return
+    try:
+        with open(arquivo, 'a') as saida:
+            saida.write(json.dumps(metricas, default=str) + '\n')
+    except OSError as erro:
+        logging.warning(f"⚠ Falha ao gravar métricas em {arquivo}: {erro}")
+
+
+def instrument(fase):
+    """
+    Decorator de instrumentação de uma task
+    - fase: 'extract', 'transform', 'load' ou 'report'
+    A task é executada normalmente; as métricas são registradas mesmo em caso
+    de erro (com status 'falha'), e o erro é propagado.
+    """
+    def decorator(funcao):
+        @functools.wraps(funcao)
+        def wrapper(*args, **context):
+            medicao = {
+                'registros_lidos': 0,
+                'registros_gravados': 0,
+                'bytes_lidos': 0,
+                'bytes_gravados': 0,
+            }
+            monitor = MonitorMemoria()
+            monitor.start()
+            with _lock:
+                _ativas.append(medicao)
+            iniciado_em = datetime.now()
+            inicio = time.perf_counter()
+            inicio_cpu = time.process_time()
+            status = 'falha'
+            try:
+                resultado = funcao(*args, **context)
+                status = 'sucesso'
+                return resultado
+            finally:
+                wall_time = time.perf_counter() - inicio
+                cpu_time = time.process_time() - inicio_cpu
+                pico = monitor.stop()
+                with _lock:
+                    _ativas.remove(medicao)
+
+                metricas = {
+                    **_identificacao(funcao, context),
+                    'fase': fase,
+                    'status': status,
+                    'inicio': iniciado_em.isoformat(timespec='seconds'),
+                    'wall_time_s': round(wall_time, 3),
+                    'cpu_time_s': round(cpu_time, 3),
+                    'pico_rss_mb': round(pico / 2**20, 1),
+                    **medicao,
+                }
+                logging.info(
+                    f"✓ Métricas [{fase}]: {wall_time:.2f}s (CPU {cpu_time:.2f}s), "
+                    f"pico {metricas['pico_rss_mb']} MB, "
+                    f"lidos {medicao['registros_lidos']} registros/{medicao['bytes_lidos'] / 2**20:.1f} MB, "
+                    f"gravados {medicao['registros_gravados']} registros/{medicao['bytes_gravados'] / 2**20:.1f} MB"
+                )
+
+                ti = context.get('ti')
+                if ti is not None:
+                    try:
+                        ti.xcom_push(key='metricas', value=metricas)
+                    except Exception as erro:
+                        logging.warning(f"⚠ Falha ao enviar métricas ao XCom: {erro}")
+                _emitir_stats(metricas)
+                _exportar_arquivo(metricas)
+
+        return wrapper
+
+    return decorator
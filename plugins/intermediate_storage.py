@@ -0,0 +1,332 @@
+"""
+Armazenamento intermediário entre tasks
+
+Substitui a troca de arquivos CSV em /tmp por arquivos colunares tipados
+(Parquet ou Arrow IPC). Os tipos das colunas (datas, inteiros, decimais) são
+preservados entre as tasks, evitando reinferência de dtypes e re-parse de
+datas a cada etapa do pipeline.
+
+No modo fundido (ver plugins/fused.py) as etapas rodam no mesmo processo e os
+datasets indicados em in_memory() ficam em memória como tabelas Arrow, sem
+gravar nem reler arquivos; as funções abaixo são as mesmas nos dois casos.
+
+Configuração via variáveis de ambiente:
+- PIPELINE_INTERMEDIATE_FORMAT: 'parquet' (padrão), 'arrow' ou 'csv'
+- PIPELINE_INTERMEDIATE_DIR: diretório dos arquivos (padrão: /tmp)
+"""
+
+import contextlib
+import logging
+import os
+
+import pandas as pd
+
+from instrumentation import record_read, record_write
+
+FORMATO_PADRAO = os.environ.get('PIPELINE_INTERMEDIATE_FORMAT', 'parquet')
+DIRETORIO_PADRAO = os.environ.get('PIPELINE_INTERMEDIATE_DIR', '/tmp')
+
+EXTENSOES = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+    'csv': '.csv',
+}
+
+# Datasets em memória durante in_memory(): nome -> pa.Table
+_memoria = {}
+_prefixos_memoria = ()
+
+
+def _em_memoria(nome, diretorio=None):
+    """O dataset é um dos indicados em in_memory() (ou um shard dele) no diretório padrão"""
+    return diretorio is None and any(nome == prefixo or nome.startswith(f"{prefixo}_")
+                                     for prefixo in _prefixos_memoria)
+
+
+@contextlib.contextmanager
+def in_memory(*nomes):
+    """
+    Mantém os datasets informados (e seus shards) em memória enquanto o bloco executa
+    - Os demais datasets (cache da dimensão, quarentena, snapshots) continuam em arquivo
+    - Ao sair do bloco as tabelas são descartadas
+    """
+    global _prefixos_memoria
+    anteriores = _prefixos_memoria
+    _prefixos_memoria = anteriores + tuple(nomes)
+    try:
+        yield
+    finally:
+        _prefixos_memoria = anteriores
+        for nome in [nome for nome in _memoria if not _em_memoria(nome)]:
+            del _memoria[nome]
+
+
+def _tabela_arrow(df, arrow_schema=None):
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, schema=arrow_schema, preserve_index=False)
+
+
+def intermediate_path(nome, formato=None, diretorio=None):
+    """Retorna o caminho do arquivo intermediário para um dataset"""
+    formato = formato or FORMATO_PADRAO
+    if formato not in EXTENSOES:
+        raise ValueError(f"Formato intermediário inválido: {formato}")
+    return os.path.join(diretorio or DIRETORIO_PADRAO, f"{nome}{EXTENSOES[formato]}")
+
+
+def frame_exists(nome, formato=None, diretorio=None):
+    """Indica se o dataset intermediário já foi gravado"""
+    if _em_memoria(nome, diretorio):
+        return nome in _memoria
+    return os.path.exists(intermediate_path(nome, formato, diretorio))
+
+
+def _aplicar_schema(df, schema):
+    """Converte as colunas presentes no DataFrame para os dtypes do schema"""
+    if not schema:
+        return df
+    colunas = {col: dtype for col, dtype in schema.items() if col in df.columns}
+    return df.astype(colunas)
+
+
+def save_frame(df, nome, formato=None, diretorio=None, schema=None):
+    """
+    Salva um DataFrame como arquivo intermediário
+    - Aplica o schema (coluna -> dtype) antes de gravar, se informado
+    - Grava em Parquet, Arrow IPC ou CSV
+    - A gravação é atômica (arquivo temporário + rename), então tasks
+      paralelas podem gravar o mesmo dataset sem corromper o arquivo
+    - Retorna o caminho gravado
+    """
+    df = _aplicar_schema(df, schema)
+    if _em_memoria(nome, diretorio):
+        _memoria[nome] = _tabela_arrow(df)
+        record_write(len(df))
+        logging.info(f"✓ Dados intermediários mantidos em memória: {nome} ({len(df)} registros)")
+        return nome
+
+    formato = formato or FORMATO_PADRAO
+    caminho = intermediate_path(nome, formato, diretorio)
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+
+    if formato == 'parquet':
+        df.to_parquet(caminho_tmp, index=False, engine='pyarrow')
+    elif formato == 'arrow':
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(tabela, caminho_tmp, compression='uncompressed')
+    else:
+        df.to_csv(caminho_tmp, index=False)
+    os.replace(caminho_tmp, caminho)
+    record_write(len(df), os.path.getsize(caminho))
+
+    logging.info(f"✓ Dados intermediários salvos em: {caminho} ({len(df)} registros)")
+    return caminho
+
+
+def load_frame(nome, formato=None, diretorio=None, columns=None, schema=None, memory_map=False):
+    """
+    Lê um arquivo intermediário gravado por save_frame
+    - columns: lê apenas as colunas informadas (projeção colunar)
+    - memory_map: mapeia o arquivo em memória em vez de copiá-lo (Parquet/Arrow)
+    """
+    if _em_memoria(nome, diretorio):
+        tabela = _tabela_memoria(nome)
+        df = (tabela.select(columns) if columns else tabela).to_pandas()
+        record_read(len(df))
+        return _aplicar_schema(df, schema)
+
+    formato = formato or FORMATO_PADRAO
+    caminho = intermediate_path(nome, formato, diretorio)
+
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Arquivo intermediário não encontrado: {caminho}")
+
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+
+        df = pq.read_table(caminho, columns=columns, memory_map=memory_map).to_pandas()
+    elif formato == 'arrow':
+        import pyarrow.feather as feather
+
+        df = feather.read_table(caminho, columns=columns, memory_map=memory_map).to_pandas()
+    else:
+        df = pd.read_csv(caminho, usecols=columns)
+
+    record_read(len(df), os.path.getsize(caminho))
+    return _aplicar_schema(df, schema)
+
+
+def _tabela_memoria(nome):
+    if nome not in _memoria:
+        raise FileNotFoundError(f"Dataset intermediário não encontrado em memória: {nome}")
+    return _memoria[nome]
+
+
+def iter_frame(nome, chunk_size, formato=None, diretorio=None, columns=None, schema=None):
+    """
+    Lê um arquivo intermediário em chunks de até chunk_size registros
+    - Parquet: lê por lotes de row groups, sem carregar o arquivo inteiro
+    - Arrow: mapeia o arquivo em memória e fatia em lotes
+    - CSV: leitura incremental do pandas
+    - Em memória: fatia a tabela Arrow em lotes
+    """
+    if _em_memoria(nome, diretorio):
+        tabela = _tabela_memoria(nome)
+        lotes = (tabela.select(columns) if columns else tabela).to_batches(max_chunksize=chunk_size)
+        for lote in lotes:
+            record_read(lote.num_rows)
+            yield _aplicar_schema(lote.to_pandas(), schema)
+        return
+
+    formato = formato or FORMATO_PADRAO
+    caminho = intermediate_path(nome, formato, diretorio)
+
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Arquivo intermediário não encontrado: {caminho}")
+
+    record_read(0, os.path.getsize(caminho))
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+
+        arquivo = pq.ParquetFile(caminho, memory_map=True)
+        lotes = (lote.to_pandas() for lote in arquivo.iter_batches(batch_size=chunk_size, columns=columns))
+    elif formato == 'arrow':
+        import pyarrow.feather as feather
+
+        tabela = feather.read_table(caminho, columns=columns, memory_map=True)
+        lotes = (lote.to_pandas() for lote in tabela.to_batches(max_chunksize=chunk_size))
+    else:
+        lotes = pd.read_csv(caminho, usecols=columns, chunksize=chunk_size)
+
+    for lote in lotes:
+        record_read(len(lote))
+        yield _aplicar_schema(lote, schema)
+
+
+def _schema_estavel(arrow_schema):
+    """
+    Índices de colunas categóricas (dicionário) em int32: o pandas usa int8
+    para poucas categorias, e chunks seguintes podem ter mais categorias
+    """
+    import pyarrow as pa
+
+    campos = [
+        campo.with_type(pa.dictionary(pa.int32(), campo.type.value_type, campo.type.ordered))
+        if pa.types.is_dictionary(campo.type) else campo
+        for campo in arrow_schema
+    ]
+    return pa.schema(campos, metadata=arrow_schema.metadata)
+
+
+def _schema_sem_dicionarios(arrow_schema):
+    """
+    Colunas categóricas (dicionário) gravadas pelos valores: o arquivo Arrow IPC
+    aceita um único dicionário por coluna, e as categorias mudam entre chunks
+    """
+    import pyarrow as pa
+
+    campos = [campo.with_type(campo.type.value_type) if pa.types.is_dictionary(campo.type) else campo
+              for campo in arrow_schema]
+    return pa.schema(campos, metadata=arrow_schema.metadata)
+
+
+class FrameWriter:
+    """
+    Grava um dataset intermediário de forma incremental, um chunk por vez.
+    O schema Arrow do primeiro chunk é fixado e os chunks seguintes são
+    convertidos para ele, garantindo tipos estáveis no arquivo final.
+    Sem nenhum chunk, close() grava o DataFrame vazio de modelo (ou as colunas
+    do schema), e o dataset existe para as tasks seguintes.
+
+    Uso:
+        with FrameWriter('vendas_transformadas') as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, nome, formato=None, diretorio=None, schema=None, modelo=None):
+        self.nome = nome
+        self.formato = formato or FORMATO_PADRAO
+        self.caminho = intermediate_path(nome, self.formato, diretorio)
+        self.schema = schema
+        self.modelo = modelo
+        self.registros = 0
+        self.chunks = 0
+        self._writer = None
+        self._arrow_schema = None
+        # Em memória (in_memory): tabelas Arrow dos chunks, concatenadas em close()
+        self._tabelas = [] if _em_memoria(nome, diretorio) else None
+
+    def write(self, df):
+        df = _aplicar_schema(df, self.schema)
+
+        if self._tabelas is not None:
+            import pyarrow as pa
+
+            if self._arrow_schema is None:
+                self._arrow_schema = _schema_estavel(pa.Schema.from_pandas(df, preserve_index=False))
+            self._tabelas.append(_tabela_arrow(df, self._arrow_schema))
+        elif self.formato == 'csv':
+            df.to_csv(self.caminho, index=False, mode='w' if self.registros == 0 else 'a',
+                      header=self.registros == 0)
+        else:
+            import pyarrow as pa
+
+            if self._writer is None:
+                arrow_schema = pa.Schema.from_pandas(df, preserve_index=False)
+                self._arrow_schema = (_schema_estavel(arrow_schema) if self.formato == 'parquet'
+                                      else _schema_sem_dicionarios(arrow_schema))
+                self._writer = self._abrir_writer(self._arrow_schema)
+            tabela = pa.Table.from_pandas(df, schema=self._arrow_schema, preserve_index=False)
+            self._writer.write_table(tabela)
+
+        self.registros += len(df)
+        self.chunks += 1
+
+    def _vazio(self):
+        """DataFrame sem registros gravado quando nenhum chunk foi escrito"""
+        if self.modelo is not None:
+            return self.modelo.iloc[0:0]
+        return pd.DataFrame({coluna: pd.Series([], dtype=dtype) for coluna, dtype in (self.schema or {}).items()})
+
+    def _abrir_writer(self, arrow_schema):
+        if self.formato == 'parquet':
+            import pyarrow.parquet as pq
+
+            return pq.ParquetWriter(self.caminho, arrow_schema)
+
+        import pyarrow as pa
+
+        return pa.ipc.new_file(self.caminho, arrow_schema)
+
+    def close(self):
+        if self.chunks == 0:
+            self.write(self._vazio())
+
+        if self._tabelas is not None:
+            import pyarrow as pa
+
+            if self._tabelas:
+                _memoria[self.nome] = pa.concat_tables(self._tabelas)
+                self._tabelas = []
+            record_write(self.registros)
+            logging.info(f"✓ Dados intermediários mantidos em memória: {self.nome} ({self.registros} registros)")
+            return self.nome
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.caminho):
+            record_write(self.registros, os.path.getsize(self.caminho))
+        logging.info(f"✓ Dados intermediários salvos em: {self.caminho} ({self.registros} registros)")
+        return self.caminho
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,40 @@
+"""
+Referências preguiçosas às funções das tasks
+
+O DAG processor reimporta cada arquivo de DAG a cada ciclo de parse. Se o
+arquivo da DAG importa pandas, os providers e os módulos do pipeline no topo,
+todo parse paga essas importações, mesmo sem executar nenhuma task. Com
+lazy_task() a DAG referencia a função pelo nome do módulo; o módulo só é
+importado quando a task executa no worker.
+
+Este módulo usa apenas a biblioteca padrão: importá-lo não carrega nada do
+pipeline.
+
+Uso (no arquivo da DAG):
+    from lazy_tasks import lazy_task
+
+    PythonOperator(task_id='extract_vendas',
+                   python_callable=lazy_task('produtos_vendas_tasks', 'extract_vendas'))
+"""
+
+import importlib
+
+
+def load_task(modulo, funcao):
+    """Importa o módulo e retorna a função da task"""
+    return getattr(importlib.import_module(modulo), funcao)
+
+
+def lazy_task(modulo, funcao):
+    """
+    Callable que importa modulo.funcao na primeira chamada e a executa
+    - O nome da função é preservado (logs, métricas, interface do Airflow)
+    """
+    def executar(*args, **context):
+        return load_task(modulo, funcao)(*args, **context)
+
+    executar.__name__ = funcao
+    executar.__qualname__ = funcao
+    executar.__module__ = modulo
+    executar.__doc__ = f"Task {modulo}.{funcao} (importada na execução)"
+    return executar
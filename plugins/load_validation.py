@@ -0,0 +1,120 @@
+"""
+Validação da carga por execução
+
+Em vez de contar as tabelas inteiras (COUNT(*) cresce com o histórico), a
+validação confere apenas o que a execução atual gravou:
+- Cada registro carregado recebe o run_id da execução na coluna Run_Id
+  (BulkLoader com run_id, ver bulk_loader.py)
+- O BulkLoader registra, pelo RETURNING dos próprios INSERTs, quantos
+  registros gravou em cada tabela e as somas de controle (checksums) de
+  algumas colunas (ex.: soma de Receita_Total)
+- Após o commit, uma única consulta conta e soma no banco os registros com
+  Run_Id da execução (índice em Run_Id) e compara com o que foi registrado
+- No início da execução (create_schema), marcas deixadas por uma tentativa
+  anterior da mesma execução são liberadas (release_run)
+
+O custo é proporcional ao lote, não ao tamanho da tabela, e uma carga parcial
+silenciosa (registros ou valores perdidos entre o loader e o banco) gera erro.
+
+Parâmetro validar_checksums da DAG (padrão True): desativa as somas de
+controle, mantendo apenas a conferência das contagens.
+"""
+
+import logging
+import math
+
+COLUNA_RUN_ID = 'Run_Id'
+
+# Colunas somadas como checksum em cada tabela validada
+CHECKSUMS = {
+    'produtos_processados': ['Preco_Custo'],
+    'vendas_processadas': ['Receita_Total', 'Margem_Lucro'],
+    'relatorio_vendas': ['Receita_Total', 'Margem_Lucro'],
+}
+
+# Diferença absoluta aceita nas somas (conversão de DECIMAL para float no XCom)
+TOLERANCIA_CHECKSUM = 0.01
+
+
+def release_run(postgres_hook, run_id):
+    """Remove o run_id de registros gravados por tentativas anteriores da mesma execução"""
+    if run_id is None:
+        return
+    postgres_hook.run(
+        ';'.join(f"UPDATE {tabela} SET {COLUNA_RUN_ID} = NULL WHERE {COLUNA_RUN_ID} = %(run_id)s"
+                 for tabela in CHECKSUMS),
+        parameters={'run_id': run_id},
+    )
+
+
+def resolve_run_id(context):
+    """run_id da execução da DAG (None fora do Airflow)"""
+    return context.get('run_id') or getattr(context.get('ti'), 'run_id', None)
+
+
+def resolve_checksums(context):
+    """Colunas de checksum por tabela, conforme o parâmetro validar_checksums"""
+    params = context.get('params') or {}
+    return CHECKSUMS if params.get('validar_checksums', True) else {}
+
+
+def merge_written(*gravados):
+    """Soma os registros e checksums gravados por vários loaders (ex.: shards)"""
+    total = {}
+    for parcial in gravados:
+        for tabela, gravado in (parcial or {}).items():
+            acumulado = total.setdefault(tabela, {'registros': 0, 'checksums': {}})
+            acumulado['registros'] += gravado['registros']
+            for coluna, soma in gravado['checksums'].items():
+                acumulado['checksums'][coluna] = acumulado['checksums'].get(coluna, 0.0) + soma
+    return total
+
+
+def _consulta_execucao(gravados):
+    partes = []
+    for tabela, gravado in gravados.items():
+        somas = ', '.join(f"'{coluna}', COALESCE(SUM({coluna}), 0)" for coluna in gravado['checksums'])
+        partes.append(
+            f"SELECT '{tabela}', COUNT(*), json_build_object({somas}) "
+            f"FROM {tabela} WHERE {COLUNA_RUN_ID} = %(run_id)s"
+        )
+    return '\nUNION ALL\n'.join(partes)
+
+
+def validate_run(postgres_hook, run_id, gravados):
+    """
+    Confere no banco os registros gravados pela execução
+    - gravados: {tabela: {'registros': n, 'checksums': {coluna: soma}}}
+    Retorna {tabela: registros da execução}; levanta ValueError em divergências.
+    """
+    if not gravados:
+        logging.info("Nenhum registro gravado nesta execução: nada a validar")
+        return {}
+
+    if run_id is None:
+        logging.warning("⚠ Execução sem run_id: contagens da carga não conferidas no banco")
+        return {tabela: gravado['registros'] for tabela, gravado in gravados.items()}
+
+    divergencias = []
+    contagens = {}
+    for tabela, registros, somas in postgres_hook.get_records(
+        _consulta_execucao(gravados), parameters={'run_id': run_id}
+    ):
+        esperado = gravados[tabela]
+        contagens[tabela] = registros
+        logging.info(f"✓ {tabela}: {registros} registros da execução (carga: {esperado['registros']})")
+        if registros != esperado['registros']:
+            divergencias.append(
+                f"{tabela}: {registros} registros no banco, {esperado['registros']} gravados pela carga"
+            )
+        for coluna, soma in esperado['checksums'].items():
+            obtido = float(somas[coluna])
+            if not math.isclose(obtido, soma, rel_tol=1e-9, abs_tol=TOLERANCIA_CHECKSUM):
+                divergencias.append(f"{tabela}.{coluna}: soma {obtido:.2f} no banco, {soma:.2f} gravada pela carga")
+
+    if divergencias:
+        for divergencia in divergencias:
+            logging.error(f"✗ {divergencia}")
+        raise ValueError(f"Erro na validação: carga parcial ou divergente ({len(divergencias)} divergência(s))")
+
+    return contagens
@@ -0,0 +1,258 @@
+"""
+Backend analítico local (SQLite embutido)
+
+Os relatórios de generate_report e detect_low_performance consultam o
+PostgreSQL. Com o parâmetro backend_relatorios='sqlite', as mesmas consultas
+rodam em um banco SQLite local montado a partir dos dados transformados da
+execução (Parquet/Arrow em TMP_*_TRANSFORM, ver intermediate_storage), sem
+ida ao servidor e sem depender da carga no PostgreSQL:
+- O banco é montado uma vez por run_id, pela primeira task de relatório (ou
+  pelo modo fundido, enquanto os dados estão em memória); as demais o
+  reaproveitam
+- A montagem grava um arquivo novo (sem journal, índices criados depois da
+  carga, uma transação) e o troca com o anterior ao final, então as consultas
+  nunca veem um banco pela metade
+- vendas_agregadas é materializada com as mesmas colunas da camada agregada
+  (ver aggregates.py), então o SQL dos relatórios é o mesmo nos dois backends
+- Os resumos diários de vendas_sketches (ver sketches.py) são acumulados dos
+  mesmos chunks de vendas durante a montagem
+- LocalAnalyticsHook expõe get_pandas_df() como o PostgresHook, então
+  connection_pool.run_queries() funciona com os dois backends
+
+Os relatórios refletem os dados transformados da execução: no modo
+incremental, apenas a janela de carga (o histórico completo fica no
+PostgreSQL). O modo ELT não gera arquivos transformados: nele os relatórios
+sempre usam o PostgreSQL.
+
+Parâmetro backend_relatorios da DAG:
+- 'postgres': consultas no PostgreSQL (padrão)
+- 'sqlite': consultas no SQLite local
+
+Configuração via variável de ambiente:
+- PIPELINE_LOCAL_DB: arquivo SQLite (padrão: vendas_relatorios.db no diretório
+  intermediário, ver PIPELINE_INTERMEDIATE_DIR)
+"""
+
+import fcntl
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from elt import MODO_ELT, resolve_execution_mode
+from intermediate_storage import DIRETORIO_PADRAO
+from sketches import COLUNAS_SKETCHES, DaySketches
+
+BACKEND_POSTGRES = 'postgres'
+BACKEND_SQLITE = 'sqlite'
+BACKENDS_RELATORIOS = (BACKEND_POSTGRES, BACKEND_SQLITE)
+
+BANCO_LOCAL = os.environ.get('PIPELINE_LOCAL_DB', os.path.join(DIRETORIO_PADRAO, 'vendas_relatorios.db'))
+
+# Espera por outra conexão gravando (generate_report e detect_low_performance rodam em paralelo)
+TIMEOUT_BLOQUEIO = 30
+
+# Banco novo, descartado se a montagem falhar: sem journal nem fsync
+PRAGMAS_CARGA = """
+PRAGMA journal_mode = OFF;
+PRAGMA synchronous = OFF;
+"""
+
+COLUNAS_PRODUTOS = ['ID_Produto', 'Nome_Produto', 'Categoria', 'Preco_Custo', 'Fornecedor', 'Status']
+COLUNAS_VENDAS = ['ID_Venda', 'Data_Venda', 'ID_Produto', 'Quantidade_Vendida', 'Preco_Venda',
+                  'Canal_Venda', 'Receita_Total', 'Margem_Lucro', 'Mes_Venda']
+
+DDL_LOCAL = """
+CREATE TABLE produtos_processados (
+    ID_Produto TEXT,
+    Nome_Produto TEXT,
+    Categoria TEXT,
+    Preco_Custo REAL,
+    Fornecedor TEXT,
+    Status TEXT
+);
+CREATE TABLE vendas_processadas (
+    ID_Venda TEXT,
+    Data_Venda TEXT NOT NULL,
+    ID_Produto TEXT,
+    Quantidade_Vendida INTEGER,
+    Preco_Venda REAL,
+    Canal_Venda TEXT,
+    Receita_Total REAL,
+    Margem_Lucro REAL,
+    Mes_Venda TEXT
+);
+CREATE TABLE vendas_sketches (
+    Data_Venda TEXT,
+    Num_Vendas INTEGER,
+    Total_Quantidade INTEGER,
+    Total_Receita REAL,
+    Num_Receitas INTEGER,
+    Soma_Margem REAL,
+    Num_Margens INTEGER,
+    Margem_Minima REAL,
+    Margem_Maxima REAL,
+    Sketch_Margem TEXT,
+    Sketch_Ticket TEXT,
+    Top_Produtos TEXT
+);
+CREATE TABLE execucao_local (
+    Run_Id TEXT,
+    Montado_Em TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Índices criados depois da carga (mais rápido que mantê-los a cada INSERT)
+INDICES_LOCAL = (
+    "CREATE UNIQUE INDEX ix_produtos_processados ON produtos_processados (ID_Produto)",
+    "CREATE INDEX ix_vendas_processadas_produto ON vendas_processadas (ID_Produto)",
+    "CREATE UNIQUE INDEX ix_vendas_sketches ON vendas_sketches (Data_Venda)",
+)
+
+# Mesmas colunas de vendas_agregadas no PostgreSQL (ver aggregates.SQL_AGREGAR)
+SQL_AGREGADOS = """
+CREATE TABLE vendas_agregadas AS
+SELECT
+    v.Mes_Venda AS Mes_Venda,
+    v.ID_Produto AS ID_Produto,
+    v.Canal_Venda AS Canal_Venda,
+    MAX(p.Nome_Produto) AS Nome_Produto,
+    MAX(p.Categoria) AS Categoria,
+    COUNT(*) AS Num_Vendas,
+    SUM(v.Quantidade_Vendida) AS Total_Quantidade,
+    ROUND(SUM(v.Receita_Total), 2) AS Total_Receita,
+    COUNT(v.Receita_Total) AS Num_Receitas,
+    ROUND(SUM(v.Margem_Lucro), 2) AS Soma_Margem,
+    COUNT(v.Margem_Lucro) AS Num_Margens,
+    MIN(v.Margem_Lucro) AS Margem_Minima,
+    MAX(v.Margem_Lucro) AS Margem_Maxima
+FROM vendas_processadas v
+LEFT JOIN produtos_processados p ON p.ID_Produto = v.ID_Produto
+GROUP BY v.Mes_Venda, v.ID_Produto, v.Canal_Venda
+"""
+
+
+def resolve_report_backend(context):
+    """Lê o backend dos relatórios da execução da DAG (o modo ELT sempre usa o PostgreSQL)"""
+    params = context.get('params') or {}
+    backend = params.get('backend_relatorios') or BACKEND_POSTGRES
+    if backend not in BACKENDS_RELATORIOS:
+        raise ValueError(f"backend_relatorios inválido: {backend} (esperado um de {BACKENDS_RELATORIOS})")
+    if backend == BACKEND_SQLITE and resolve_execution_mode(context) == MODO_ELT:
+        logging.warning("⚠ Modo ELT não gera arquivos transformados: relatórios no PostgreSQL")
+        return BACKEND_POSTGRES
+    return backend
+
+
+def _conectar(banco=None):
+    banco = banco or BANCO_LOCAL
+    if not os.path.exists(banco):
+        raise FileNotFoundError(f"SQLite local não montado: {banco}")
+    return sqlite3.connect(banco, timeout=TIMEOUT_BLOQUEIO)
+
+
+def _registros(df, colunas):
+    """Tuplas prontas para o sqlite3: datas em ISO, categorias como texto, nulos como None"""
+    df = df[[coluna for coluna in colunas if coluna in df.columns]]
+    convertidas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime('%Y-%m-%d')
+        convertidas[coluna] = serie.astype(object).where(serie.notna(), None)
+    return list(df.columns), list(zip(*convertidas.values()))
+
+
+def _inserir(conn, tabela, df, colunas):
+    """INSERT em lote do DataFrame (tabela sem índices: sem verificação de conflito por registro)"""
+    colunas, registros = _registros(df, colunas)
+    conn.executemany(
+        f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+        registros,
+    )
+    return len(registros)
+
+
+def _execucao(banco):
+    """run_id do banco local já montado (None se não existe)"""
+    if not os.path.exists(banco):
+        return None
+    with closing(sqlite3.connect(banco, timeout=TIMEOUT_BLOQUEIO)) as conn:
+        try:
+            registro = conn.execute("SELECT Run_Id FROM execucao_local").fetchone()
+        except sqlite3.DatabaseError:
+            return None
+    return registro[0] if registro else None
+
+
+def _montar(destino, df_produtos, chunks_vendas, run_id):
+    """Grava o banco em destino: carga em lote, resumos diários, índices e camada agregada"""
+    with closing(sqlite3.connect(destino)) as conn:
+        conn.executescript(PRAGMAS_CARGA + DDL_LOCAL)
+        with conn:
+            num_produtos = _inserir(conn, 'produtos_processados', df_produtos, COLUNAS_PRODUTOS)
+            # Resumos diários acumulados dos mesmos chunks, sem reler as vendas
+            sketches = DaySketches()
+            num_vendas = 0
+            for chunk in chunks_vendas:
+                num_vendas += _inserir(conn, 'vendas_processadas', chunk, COLUNAS_VENDAS)
+                sketches.add(chunk)
+            _inserir(conn, 'vendas_sketches', sketches.frame(), COLUNAS_SKETCHES)
+            for indice in INDICES_LOCAL:
+                conn.execute(indice)
+            conn.execute(SQL_AGREGADOS)
+            conn.execute("INSERT INTO execucao_local (Run_Id) VALUES (?)", (run_id,))
+    return num_produtos, num_vendas
+
+
+def build_local(run_id, ler_dados, banco=None):
+    """
+    Monta o SQLite local com os dados transformados da execução, uma vez por run_id
+    - ler_dados(): (df_produtos, chunks de vendas), chamada apenas se o banco precisa ser montado
+    - Tasks em paralelo esperam a montagem em andamento (lock no arquivo .lock)
+    Retorna o caminho do banco.
+    """
+    banco = banco or BANCO_LOCAL
+    os.makedirs(os.path.dirname(os.path.abspath(banco)), exist_ok=True)
+    with open(f"{banco}.lock", 'w') as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        if run_id is not None and _execucao(banco) == run_id:
+            logging.info(f"✓ SQLite local ({banco}) já montado para {run_id}")
+            return banco
+
+        inicio = time.perf_counter()
+        temporario = f"{banco}.{os.getpid()}.tmp"
+        try:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            num_produtos, num_vendas = _montar(temporario, *ler_dados(), run_id)
+            os.replace(temporario, banco)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+    logging.info(f"✓ SQLite local ({banco}): {num_produtos} produtos e {num_vendas} vendas "
+                 f"carregados em {time.perf_counter() - inicio:.3f}s")
+    return banco
+
+
+class LocalAnalyticsHook:
+    """Hook de consulta no SQLite local com a interface usada pelos relatórios"""
+
+    def __init__(self, banco=None):
+        self.banco = banco or BANCO_LOCAL
+
+    def get_pandas_df(self, sql, parameters=None):
+        """Executa a consulta (uma conexão por chamada); colunas em minúsculas, como no PostgreSQL"""
+        with closing(_conectar(self.banco)) as conn:
+            df = pd.read_sql_query(sql, conn, params=parameters)
+        df.columns = df.columns.str.lower()
+        return df
+
+    def replace_table(self, tabela, df):
+        """Substitui o conteúdo de uma tabela de resultados pelo DataFrame"""
+        with closing(_conectar(self.banco)) as conn, conn:
+            df.to_sql(tabela, conn, if_exists='replace', index=False)
+        logging.info(f"✓ {len(df)} registros gravados em {tabela} (SQLite local)")
@@ -0,0 +1,252 @@
+"""
+Extração de múltiplos arquivos de origem
+
+Em produção cada loja deposita seu próprio arquivo diário de vendas. Com o
+parâmetro arquivos_vendas da DAG (um padrão glob, ex.:
+'/opt/airflow/data/lojas/vendas_*.csv'), a extração:
+- descobre os arquivos pelo padrão
+- ignora os já ingeridos (tabela pipeline_arquivos_ingeridos): mesmo
+  caminho com tamanho e mtime iguais, ou com conteúdo idêntico (hash)
+- lê os arquivos novos em paralelo, um por processo (ProcessPoolExecutor);
+  cada processo lê o arquivo uma única vez, em blocos que alimentam o hash e o parse em
+  chunks e grava um Parquet próprio no diretório intermediário, devolvendo
+  ao processo da task apenas o hash e o número de registros
+- mantém no máximo ARQUIVOS_POR_PROCESSO arquivos em leitura por processo:
+  os seguintes só são enviados conforme os anteriores são consumidos
+- marca cada registro com o arquivo de origem (coluna Arquivo_Origem)
+
+Os processos de leitura são criados por forkserver (ou spawn), e não por
+fork: o processo da task tem threads em execução (monitor de memória do
+@instrument), que não sobrevivem a um fork.
+
+Os Parquets são relidos em chunks de chunk_size registros, na ordem dos
+arquivos, e seguem pelo mesmo fluxo da extração em chunks (qualidade,
+janela, shards); cada um é removido assim que consumido. Os arquivos só são
+registrados como ingeridos junto com a carga (mesma transação), então uma
+execução que falhou os lê de novo.
+
+No modo incremental os arquivos novos são carregados inteiros (o upsert
+torna isso idempotente); full e backfill releem todos os arquivos, e
+forcar_reprocessamento ignora o registro de ingestão.
+
+Configuração via variável de ambiente:
+- PIPELINE_EXTRACT_PROCESSES: processos de leitura (padrão: número de CPUs)
+"""
+
+import collections
+import glob
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from fingerprint_cache import BLOCO_HASH, content_hash, resolve_cache_enabled
+from intermediate_storage import DIRETORIO_PADRAO, FrameWriter, intermediate_path, iter_frame
+from streaming import CHUNK_SIZE_PADRAO
+
+COLUNA_ORIGEM = 'Arquivo_Origem'
+PROCESSOS_LEITURA = int(os.environ.get('PIPELINE_EXTRACT_PROCESSES', 0)) or os.cpu_count() or 1
+
+# Arquivos enviados e ainda não consumidos, por processo de leitura
+ARQUIVOS_POR_PROCESSO = 2
+
+# Início dos processos de leitura sem fork (o processo da task tem threads)
+METODO_INICIO = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+DDL_ARQUIVOS = """
+CREATE TABLE IF NOT EXISTS pipeline_arquivos_ingeridos (
+    Pipeline VARCHAR(100),
+    Origem VARCHAR(500),
+    Tamanho BIGINT,
+    Mtime_NS BIGINT,
+    Hash VARCHAR(64),
+    Registros BIGINT,
+    Run_Id VARCHAR(250),
+    Ingerido_Em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Pipeline, Origem)
+);
+"""
+
+
+def resolve_source_pattern(context):
+    """Padrão glob do parâmetro arquivos_vendas (None: arquivo único)"""
+    params = context.get('params') or {}
+    return params.get('arquivos_vendas') or None
+
+
+def tag_source(df, caminho):
+    """Acrescenta a coluna Arquivo_Origem (categórica, um único valor)"""
+    origem = pd.Categorical.from_codes([0] * len(df), categories=[caminho])
+    return df.assign(**{COLUNA_ORIGEM: origem})
+
+
+def read_ingested(postgres_hook, pipeline):
+    """Arquivos já ingeridos pelo pipeline: {caminho: (tamanho, mtime_ns, hash)}"""
+    registros = postgres_hook.get_records(
+        "SELECT Origem, Tamanho, Mtime_NS, Hash FROM pipeline_arquivos_ingeridos WHERE Pipeline = %s",
+        parameters=(pipeline,),
+    )
+    return {origem: (tamanho, mtime_ns, hash_) for origem, tamanho, mtime_ns, hash_ in registros}
+
+
+def pending_files(context, postgres_hook, pipeline, padrao):
+    """
+    Arquivos do padrão que precisam ser lidos nesta execução
+    - Arquivos com tamanho e mtime iguais aos registrados são ignorados sem leitura
+    Retorna (lista de {'origem', 'tamanho', 'mtime_ns'}, {caminho: hash já ingerido}).
+    """
+    arquivos = sorted(glob.glob(padrao))
+    if not arquivos:
+        logging.warning(f"⚠ Nenhum arquivo encontrado para {padrao}")
+
+    ingeridos = read_ingested(postgres_hook, pipeline) if resolve_cache_enabled(context) else {}
+    pendentes = []
+    for caminho in arquivos:
+        estado = os.stat(caminho)
+        anterior = ingeridos.get(caminho)
+        if anterior and (anterior[0], anterior[1]) == (estado.st_size, estado.st_mtime_ns):
+            continue
+        pendentes.append({'origem': caminho, 'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns})
+
+    logging.info(f"✓ {len(arquivos)} arquivo(s) em {padrao}: {len(pendentes)} novo(s) ou alterado(s)")
+    return pendentes, {caminho: anterior[2] for caminho, anterior in ingeridos.items()}
+
+
+class _LeituraComHash(io.RawIOBase):
+    """Arquivo binário que atualiza um SHA-256 com os blocos lidos pelo parser do pandas"""
+
+    def __init__(self, arquivo):
+        super().__init__()
+        self._arquivo = arquivo
+        self.digest = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        lidos = self._arquivo.readinto(buffer)
+        self.digest.update(memoryview(buffer)[:lidos])
+        return lidos
+
+    def hexdigest(self):
+        """Hash do arquivo inteiro: lê (e descarta) o que o parser não consumiu"""
+        for _ in iter(lambda: self.read(BLOCO_HASH), b''):
+            pass
+        return self.digest.hexdigest()
+
+
+def _ler_arquivo(caminho, destino, nome, chunk_size, read_csv_kwargs):
+    """
+    Executado em um processo de leitura: hash e parse a partir de uma única leitura do arquivo
+    - O arquivo é lido em blocos; cada bloco entregue ao parser atualiza o hash
+    - Os chunks são gravados no Parquet nome em destino
+    Retorna (hash, registros).
+    """
+    with open(caminho, 'rb') as arquivo, FrameWriter(nome, formato='parquet', diretorio=destino) as writer:
+        leitura = _LeituraComHash(arquivo)
+        blocos = io.BufferedReader(leitura, buffer_size=BLOCO_HASH)
+        for chunk in pd.read_csv(blocos, chunksize=chunk_size, **read_csv_kwargs):
+            writer.write(tag_source(chunk, caminho))
+        hash_conteudo = leitura.hexdigest()
+    return hash_conteudo, writer.registros
+
+
+def _contexto_processos():
+    """Contexto de multiprocessing dos processos de leitura"""
+    contexto = multiprocessing.get_context(METODO_INICIO)
+    if METODO_INICIO == 'forkserver':
+        # O servidor importa só este módulo (e não o __main__ do worker do Airflow)
+        contexto.set_forkserver_preload([__name__])
+    return contexto
+
+
+def read_files(arquivos, hashes_ingeridos=None, processos=None, chunk_size=CHUNK_SIZE_PADRAO, **read_csv_kwargs):
+    """
+    Lê os arquivos em paralelo e gera chunks de até chunk_size registros, na ordem da lista
+    - Arquivos com conteúdo igual ao já ingerido (hash) são descartados
+    - Cada arquivo lido recebe o hash em arquivo['hash'] e os registros em arquivo['registros']
+    """
+    if not arquivos:
+        return
+    hashes_ingeridos = hashes_ingeridos or {}
+    processos = max(1, min(len(arquivos), processos or PROCESSOS_LEITURA))
+    logging.info(f"Lendo {len(arquivos)} arquivo(s) com {processos} processo(s) ({METODO_INICIO})")
+
+    destino = tempfile.mkdtemp(prefix='arquivos_vendas_', dir=DIRETORIO_PADRAO)
+    try:
+        with ProcessPoolExecutor(max_workers=processos, mp_context=_contexto_processos()) as executor:
+            pendentes = iter(enumerate(arquivos))
+            em_leitura = collections.deque()
+
+            def enviar():
+                for indice, arquivo in pendentes:
+                    nome = f"arquivo_{indice}"
+                    futuro = executor.submit(_ler_arquivo, arquivo['origem'], destino, nome, chunk_size,
+                                             read_csv_kwargs)
+                    em_leitura.append((arquivo, nome, futuro))
+                    return
+
+            for _ in range(processos * ARQUIVOS_POR_PROCESSO):
+                enviar()
+            while em_leitura:
+                arquivo, nome, futuro = em_leitura.popleft()
+                hash_conteudo, registros = futuro.result()
+                enviar()
+                arquivo['hash'] = hash_conteudo
+                arquivo['registros'] = registros
+                if hashes_ingeridos.get(arquivo['origem']) == hash_conteudo:
+                    logging.info(f"✓ {arquivo['origem']}: conteúdo já ingerido (sha256 {hash_conteudo[:12]})")
+                else:
+                    logging.info(f"✓ {arquivo['origem']}: {registros} registros")
+                    yield from iter_frame(nome, chunk_size, formato='parquet', diretorio=destino)
+                os.remove(intermediate_path(nome, 'parquet', destino))
+    finally:
+        shutil.rmtree(destino, ignore_errors=True)
+
+
+def new_files(arquivos, hashes_ingeridos=None):
+    """
+    Calcula o hash dos arquivos sem fazer o parse (modo ELT: o COPY lê o arquivo no banco)
+    - Arquivos com conteúdo igual ao já ingerido são descartados
+    """
+    hashes_ingeridos = hashes_ingeridos or {}
+    novos = []
+    for arquivo in arquivos:
+        arquivo['hash'] = content_hash(arquivo['origem'])
+        if hashes_ingeridos.get(arquivo['origem']) == arquivo['hash']:
+            logging.info(f"✓ {arquivo['origem']}: conteúdo já ingerido (sha256 {arquivo['hash'][:12]})")
+            continue
+        novos.append(arquivo)
+    return novos
+
+
+def mark_ingested(loader, pipeline, arquivos):
+    """Registra os arquivos lidos como ingeridos, dentro da transação do BulkLoader"""
+    for arquivo in arquivos or []:
+        if 'hash' not in arquivo:
+            continue
+        loader.execute(
+            """
+            INSERT INTO pipeline_arquivos_ingeridos (
+                Pipeline, Origem, Tamanho, Mtime_NS, Hash, Registros, Run_Id, Ingerido_Em
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (Pipeline, Origem) DO UPDATE SET
+                Tamanho = EXCLUDED.Tamanho,
+                Mtime_NS = EXCLUDED.Mtime_NS,
+                Hash = EXCLUDED.Hash,
+                Registros = EXCLUDED.Registros,
+                Run_Id = EXCLUDED.Run_Id,
+                Ingerido_Em = CURRENT_TIMESTAMP
+            """,
+            (pipeline, arquivo['origem'], arquivo['tamanho'], arquivo['mtime_ns'], arquivo['hash'],
+             arquivo.get('registros'), loader.run_id),
+        )
+    if arquivos:
+        logging.info(f"✓ {len(arquivos)} arquivo(s) registrados em pipeline_arquivos_ingeridos")
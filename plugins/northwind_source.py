@@ -0,0 +1,243 @@
+"""
+Extração de produtos e vendas do banco Northwind (db/northwind.sql)
+
+Com o parâmetro fonte_dados='northwind', o pipeline lê as vendas de
+orders/order_details e os produtos de products no PostgreSQL, em vez dos CSVs.
+As linhas de pedido são lidas sem materializar o resultado inteiro no worker:
+- o intervalo de order_id é dividido em faixas contíguas, lidas em paralelo,
+  uma thread e uma conexão do pool por faixa
+- cada faixa usa um cursor nomeado (server-side): o servidor mantém o
+  resultado e o worker busca chunk_size registros por vez
+- os chunks das faixas passam por uma fila limitada: com o consumidor
+  (qualidade, shards, gravação) mais lento, as leituras esperam, e o pico de
+  memória fica em torno de 2 chunks por faixa
+- a janela de carga (incremental/backfill) é aplicada no próprio SELECT
+
+Os chunks têm as mesmas colunas dos CSVs (vendas_produtos.csv e
+produtos_loja.csv), então seguem pela mesma qualidade e transformação.
+Mapeamento das colunas:
+- ID_Venda: order_id-product_id (chave de order_details)
+- Preco_Venda: unit_price de order_details com o desconto aplicado
+- Canal_Venda: transportadora do pedido (shippers.company_name)
+- Preco_Custo: unit_price de products (o Northwind não tem preço de custo)
+- Status: 'Inativo' para produtos descontinuados
+
+No modo ELT, as staging são preenchidas por INSERT ... SELECT no próprio
+banco, sem passar pelo worker.
+
+Parâmetro fonte_dados da DAG:
+- 'csv': arquivos CSV de data/ (padrão)
+- 'northwind': tabelas do Northwind no PostgreSQL
+
+Configuração via variável de ambiente:
+- PIPELINE_NORTHWIND_READERS: faixas de order_id lidas em paralelo (padrão: 4)
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pandas as pd
+
+from elt import DDL_STAGING, STAGING_PRODUTOS, STAGING_VENDAS
+from instrumentation import record_read
+from schema_registry import read_dtypes
+
+FONTE_CSV = 'csv'
+FONTE_NORTHWIND = 'northwind'
+FONTES_DADOS = (FONTE_CSV, FONTE_NORTHWIND)
+
+LEITORES = int(os.environ.get('PIPELINE_NORTHWIND_READERS', 4))
+
+# Chunks aguardando o consumidor, por faixa
+CHUNKS_EM_FILA = 2
+
+COLUNAS_PRODUTOS = ['ID_Produto', 'Nome_Produto', 'Categoria', 'Preco_Custo', 'Fornecedor', 'Status']
+COLUNAS_VENDAS = ['ID_Venda', 'ID_Produto', 'Quantidade_Vendida', 'Preco_Venda', 'Data_Venda', 'Canal_Venda']
+
+SQL_PRODUTOS = """
+SELECT
+    p.product_id::text AS "ID_Produto",
+    p.product_name AS "Nome_Produto",
+    c.category_name AS "Categoria",
+    ROUND(p.unit_price::numeric, 2)::float8 AS "Preco_Custo",
+    s.company_name AS "Fornecedor",
+    CASE WHEN p.discontinued = 1 THEN 'Inativo' ELSE 'Ativo' END AS "Status"
+FROM products p
+LEFT JOIN categories c ON c.category_id = p.category_id
+LEFT JOIN suppliers s ON s.supplier_id = p.supplier_id
+"""
+
+SQL_IDS_PRODUTOS = 'SELECT product_id::text AS "ID_Produto" FROM products'
+
+# Filtro da janela de carga sobre orders (alias o)
+FILTRO_JANELA = """
+    (%(inicio)s::date IS NULL OR o.order_date >= %(inicio)s::date)
+    AND (%(fim)s::date IS NULL OR o.order_date <= %(fim)s::date)
+"""
+
+SQL_LIMITES = f"""
+SELECT MIN(o.order_id), MAX(o.order_id)
+FROM orders o
+WHERE {FILTRO_JANELA}
+"""
+
+SQL_VENDAS = f"""
+SELECT
+    o.order_id::text || '-' || d.product_id::text AS "ID_Venda",
+    d.product_id::text AS "ID_Produto",
+    d.quantity::integer AS "Quantidade_Vendida",
+    ROUND((d.unit_price * (1 - d.discount))::numeric, 2)::float8 AS "Preco_Venda",
+    to_char(o.order_date, 'YYYY-MM-DD') AS "Data_Venda",
+    s.company_name AS "Canal_Venda"
+FROM orders o
+JOIN order_details d ON d.order_id = o.order_id
+LEFT JOIN shippers s ON s.shipper_id = o.ship_via
+WHERE o.order_id BETWEEN %(primeiro)s AND %(ultimo)s
+  AND {FILTRO_JANELA}
+"""
+
+# Marca o fim de uma faixa na fila
+_FIM = object()
+
+
+def resolve_source(context):
+    """Lê o parâmetro fonte_dados da execução da DAG"""
+    params = context.get('params') or {}
+    fonte = params.get('fonte_dados') or FONTE_CSV
+    if fonte not in FONTES_DADOS:
+        raise ValueError(f"fonte_dados inválida: {fonte} (esperado um de {FONTES_DADOS})")
+    if fonte == FONTE_NORTHWIND and params.get('arquivos_vendas'):
+        raise ValueError("arquivos_vendas não se aplica a fonte_dados='northwind'")
+    return fonte
+
+
+def _frame(registros):
+    """Chunk de linhas de pedido com os dtypes de leitura de vendas_produtos.csv"""
+    dtypes = read_dtypes('vendas')
+    return pd.DataFrame.from_records(registros, columns=COLUNAS_VENDAS).astype(
+        {coluna: dtypes[coluna] for coluna in COLUNAS_VENDAS if coluna in dtypes}
+    )
+
+
+def read_products(postgres_hook):
+    """Produtos do Northwind com as colunas de produtos_loja.csv"""
+    df = postgres_hook.get_pandas_df(SQL_PRODUTOS)
+    record_read(len(df))
+    return df[COLUNAS_PRODUTOS].astype(read_dtypes('produtos'))
+
+
+def read_product_ids(postgres_hook):
+    """IDs dos produtos do Northwind (referência da regra de qualidade das vendas)"""
+    return postgres_hook.get_pandas_df(SQL_IDS_PRODUTOS)['ID_Produto']
+
+
+def products_hash(df_produtos):
+    """Hash do conteúdo dos produtos extraídos (chave do cache da dimensão, no lugar do hash do CSV)"""
+    return hashlib.sha256(pd.util.hash_pandas_object(df_produtos, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def key_ranges(postgres_hook, janela, leitores=LEITORES):
+    """Divide o intervalo de order_id da janela em até leitores faixas contíguas [primeiro, ultimo]"""
+    parametros = {'inicio': janela['inicio'], 'fim': janela['fim']}
+    primeiro, ultimo = postgres_hook.get_first(SQL_LIMITES, parameters=parametros)
+    if primeiro is None:
+        return []
+    leitores = max(1, min(leitores, ultimo - primeiro + 1))
+    largura = -(-(ultimo - primeiro + 1) // leitores)
+    return [(inicio, min(inicio + largura - 1, ultimo)) for inicio in range(primeiro, ultimo + 1, largura)]
+
+
+def _ler_faixa(postgres_hook, faixa, janela, chunk_size, indice):
+    """Gera os chunks de uma faixa de order_id por um cursor nomeado (server-side)"""
+    parametros = {'primeiro': faixa[0], 'ultimo': faixa[1], 'inicio': janela['inicio'], 'fim': janela['fim']}
+    with closing(postgres_hook.get_conn()) as conexao:
+        try:
+            with conexao.cursor(name=f"northwind_vendas_{indice}") as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(SQL_VENDAS, parametros)
+                while True:
+                    registros = cursor.fetchmany(chunk_size)
+                    if not registros:
+                        break
+                    yield _frame(registros)
+        finally:
+            # Apenas leitura: encerra a transação do cursor antes de devolver a conexão ao pool
+            conexao.rollback()
+
+
+def _enfileirar(fila, item, parar):
+    """Coloca o item na fila, esperando espaço; desiste se o consumidor parou"""
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def iter_order_lines(postgres_hook, janela, chunk_size, leitores=LEITORES):
+    """
+    Gera chunks de linhas de pedido (colunas de vendas_produtos.csv) da janela de carga
+    - Faixas de order_id lidas em paralelo, cada uma por um cursor nomeado
+    - A ordem dos chunks entre faixas não é garantida
+    """
+    faixas = key_ranges(postgres_hook, janela, leitores)
+    if not faixas:
+        logging.info("Nenhum pedido do Northwind na janela de carga")
+        return
+    logging.info(f"Northwind: {len(faixas)} faixa(s) de order_id lidas em paralelo: {faixas}")
+
+    fila = queue.Queue(maxsize=CHUNKS_EM_FILA * len(faixas))
+    parar = threading.Event()
+
+    def ler(indice, faixa):
+        try:
+            for chunk in _ler_faixa(postgres_hook, faixa, janela, chunk_size, indice):
+                if not _enfileirar(fila, chunk, parar):
+                    return
+        except Exception as erro:
+            _enfileirar(fila, erro, parar)
+        finally:
+            _enfileirar(fila, _FIM, parar)
+
+    with ThreadPoolExecutor(max_workers=len(faixas), thread_name_prefix='northwind') as executor:
+        for indice, faixa in enumerate(faixas):
+            executor.submit(ler, indice, faixa)
+        try:
+            ativas = len(faixas)
+            while ativas:
+                item = fila.get()
+                if item is _FIM:
+                    ativas -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    record_read(len(item))
+                    yield item
+        finally:
+            # Consumidor encerrado (fim, erro ou gerador fechado): libera as threads bloqueadas na fila
+            parar.set()
+
+
+def stage_northwind(loader, tabela):
+    """Recarrega a tabela de staging do modo ELT a partir do Northwind (INSERT ... SELECT no banco)"""
+    sql, colunas = {
+        STAGING_PRODUTOS: (SQL_PRODUTOS, COLUNAS_PRODUTOS),
+        STAGING_VENDAS: (SQL_VENDAS, COLUNAS_VENDAS),
+    }[tabela]
+    loader.execute(DDL_STAGING[tabela])
+    loader.truncate(tabela)
+    selecao = ', '.join(f'"{coluna}"::text' for coluna in colunas)
+    parametros = {'primeiro': -2 ** 31, 'ultimo': 2 ** 31 - 1, 'inicio': None, 'fim': None}
+    with loader.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {tabela} ({', '.join(colunas)}) SELECT {selecao} FROM ({sql}) origem",
+                       parametros)
+        registros = cursor.rowcount
+    logging.info(f"✓ {registros} registros do Northwind enviados para {tabela}")
+    return registros
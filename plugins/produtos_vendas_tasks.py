@@ -0,0 +1,1096 @@
+"""
+Tasks do pipeline_produtos_vendas
+
+Funções executadas pelas tasks da DAG 6324089/pipeline_produtos_vendas.py.
+A DAG referencia estas funções por nome (ver lazy_tasks.py), então este
+módulo, o pandas e os providers só são importados quando uma task executa,
+nunca durante o parse da DAG.
+"""
+
+from datetime import date
+import logging
+import os
+
+import pandas as pd
+
+from aggregates import refresh_aggregates
+from bulk_loader import BulkLoader
+from connection_pool import get_hook, run_queries
+from data_quality import REGRAS_QUALIDADE_PRODUTOS, REGRAS_QUALIDADE_VENDAS, DataQuality, save_results
+from dimension_cache import ProductDimension, dimension_key
+from elt import (
+    COLUNAS_STAGING,
+    MODO_ELT,
+    STAGING_PRODUTOS,
+    STAGING_VENDAS,
+    resolve_execution_mode,
+    stage_csv,
+    staged_months,
+    transform_produtos_sql,
+    transform_vendas_sql,
+)
+from fingerprint_cache import check_source, content_hash, invalidate_fingerprints, resolve_force_refresh, save_fingerprint
+from fused import TASK_FUNDIDA, FusedRun, resolve_fused
+from imputation import REGRAS_PRODUTOS, impute
+from incremental import (
+    MODO_FULL,
+    MODO_INCREMENTAL,
+    compute_watermark,
+    filter_window,
+    merge_watermark,
+    resolve_load_mode,
+    resolve_load_window,
+    update_watermark,
+)
+from instrumentation import instrument
+from intermediate_storage import FrameWriter, frame_exists, iter_frame, load_frame, save_frame
+from report_snapshots import save_snapshot, snapshot_version
+from local_analytics import BACKEND_SQLITE, LocalAnalyticsHook, build_local, resolve_report_backend
+from load_validation import merge_written, release_run, resolve_checksums, resolve_run_id, validate_run
+from northwind_source import (
+    FONTE_NORTHWIND,
+    iter_order_lines,
+    products_hash,
+    read_product_ids,
+    read_products,
+    resolve_source,
+    stage_northwind,
+)
+from multi_source import mark_ingested, new_files, pending_files, read_files, resolve_source_pattern
+from schema_registry import apply_schema, empty_frame, log_memory, read_dtypes
+from schema_manager import create_partitions, ensure_schema, partition_months
+from sketches import DaySketches, merge_sketches, period_summary, refresh_sketches, top_products, write_sketches
+from sharding import ShardWriter, build_relatorio_sql, resolve_sharding, shard_dataset
+from streaming import (
+    iter_csv_chunks,
+    read_csv,
+    resolve_streaming_params,
+    stream_transform_vendas,
+    transform_vendas_chunk,
+)
+
+# Caminhos dos arquivos
+PRODUTOS_FILE = '/opt/airflow/data/produtos_loja.csv'
+VENDAS_FILE = '/opt/airflow/data/vendas_produtos.csv'
+
+# Datasets intermediários entre tasks (Parquet tipado em /tmp, ver plugins/intermediate_storage.py)
+TMP_PRODUTOS = 'produtos_extraidos'
+TMP_VENDAS = 'vendas_extraidas'
+TMP_PRODUTOS_TRANSFORM = 'produtos_transformados'
+TMP_VENDAS_TRANSFORM = 'vendas_transformadas'
+TMP_SKETCHES = 'resumos_diarios'
+
+# Identificação da marca d'água da carga incremental
+WATERMARK_PIPELINE = 'pipeline_produtos_vendas'
+WATERMARK_TABELA = 'vendas_processadas'
+
+
+def create_schema(**context):
+    """
+    Task 4: Criar tabelas no PostgreSQL
+    - Cria tabelas com chaves primárias e índices
+    - Particiona vendas_processadas e relatorio_vendas por mês de Data_Venda
+    - Migra tabelas de execuções anteriores (ver plugins/schema_manager.py)
+    - Limpa as tabelas na recarga total do modo particionado
+    - Invalida o cache de fingerprint quando forcar_reprocessamento está ativo
+    - Libera o run_id de registros gravados por uma tentativa anterior desta execução
+    """
+    logging.info(f"=== VERIFICANDO SCHEMA ===")
+    postgres_hook = get_hook('northwind_postgres')
+    ensure_schema(postgres_hook)
+    release_run(postgres_hook, resolve_run_id(context))
+    
+    if resolve_force_refresh(context):
+        invalidate_fingerprints(postgres_hook, WATERMARK_PIPELINE)
+    
+    # No modo particionado cada shard carrega em sua própria transação,
+    # então a recarga total limpa as tabelas antes da extração
+    if resolve_sharding(context) is not None and resolve_load_mode(context) == MODO_FULL:
+        logging.info("Modo full particionado: limpando tabelas antes da carga")
+        postgres_hook.run("TRUNCATE TABLE produtos_processados, vendas_processadas, relatorio_vendas")
+
+
+@instrument('extract')
+def extract_produtos(**context):
+    """
+    Task 1: Extrair dados de produtos
+    - Valida existência do arquivo
+    - Lê dados do CSV (ou reaproveita a extração anterior se o arquivo não mudou)
+    - Com fonte_dados='northwind', lê a tabela products (ver plugins/northwind_source.py)
+    - Aplica as regras de qualidade (ver plugins/data_quality.py)
+    - No modo ELT, envia o CSV bruto para a staging e aplica as regras de qualidade no banco
+    - Registra logs informativos
+    """
+    logging.info(f"=== INICIANDO EXTRAÇÃO DE PRODUTOS ===")
+    
+    fonte_northwind = resolve_source(context) == FONTE_NORTHWIND
+    if fonte_northwind:
+        logging.info("Fonte: tabela products do Northwind")
+    else:
+        # Validar se arquivo existe
+        if not os.path.exists(PRODUTOS_FILE):
+            raise FileNotFoundError(f"Arquivo não encontrado: {PRODUTOS_FILE}")
+        
+        logging.info(f"Arquivo encontrado: {PRODUTOS_FILE}")
+    
+    postgres_hook = get_hook('northwind_postgres')
+    if fonte_northwind:
+        # Origem no banco: sem cache de fingerprint de arquivo
+        inalterado, fingerprint, anterior = False, None, None
+    else:
+        # Arquivo idêntico ao da última carga: reaproveita a extração anterior
+        inalterado, fingerprint, anterior = check_source(context, postgres_hook, WATERMARK_PIPELINE, PRODUTOS_FILE)
+    modo_elt = resolve_execution_mode(context) == MODO_ELT
+    if inalterado and not modo_elt and frame_exists(TMP_PRODUTOS):
+        logging.info("✓ Reaproveitando produtos extraídos na execução anterior")
+        context['ti'].xcom_push(key='fingerprint', value=fingerprint)
+        return {**anterior, 'inalterado': True}
+    
+    if modo_elt:
+        # ELT: CSV bruto direto para a staging (COPY), sem passar pelo pandas; qualidade avaliada no banco
+        with BulkLoader(postgres_hook) as loader, DataQuality('produtos', REGRAS_QUALIDADE_PRODUTOS) as qualidade:
+            if fonte_northwind:
+                num_registros = stage_northwind(loader, STAGING_PRODUTOS)
+            else:
+                num_registros = stage_csv(loader, STAGING_PRODUTOS, PRODUTOS_FILE)
+            qualidade.check_table(loader, STAGING_PRODUTOS, COLUNAS_STAGING[STAGING_PRODUTOS])
+        context['ti'].xcom_push(key='qualidade', value=qualidade.report())
+        nulos = qualidade.null_counts()
+        nulos_preco = nulos['Preco_Custo']
+        nulos_fornecedor = nulos['Fornecedor']
+        num_quarentena = qualidade.quarentena
+        logging.info(f"✓ Número de registros extraídos: {num_registros}")
+        logging.info(f"⚠ Valores nulos encontrados:")
+        logging.info(f"  - Preco_Custo: {nulos_preco}")
+        logging.info(f"  - Fornecedor: {nulos_fornecedor}")
+    else:
+        # Ler arquivo CSV (dtypes do registro de schemas) e aplicar as regras de qualidade
+        if fonte_northwind:
+            df_produtos = read_products(postgres_hook)
+        else:
+            df_produtos = read_csv(PRODUTOS_FILE, dtype=read_dtypes('produtos'))
+        num_registros = len(df_produtos)
+        with DataQuality('produtos', REGRAS_QUALIDADE_PRODUTOS) as qualidade:
+            df_produtos = apply_schema(qualidade.check(df_produtos), 'produtos')
+        log_memory(df_produtos, 'Produtos')
+        context['ti'].xcom_push(key='qualidade', value=qualidade.report())
+        
+        # Registrar informações
+        logging.info(f"✓ Número de registros extraídos: {num_registros}")
+        logging.info(f"✓ Colunas: {list(df_produtos.columns)}")
+        logging.info(f"✓ Categorias encontradas: {df_produtos['Categoria'].unique().tolist()}")
+        
+        nulos = qualidade.null_counts()
+        nulos_preco = nulos['Preco_Custo']
+        nulos_fornecedor = nulos['Fornecedor']
+        num_quarentena = qualidade.quarentena
+        
+        # Salvar dados extraídos
+        save_frame(df_produtos, TMP_PRODUTOS)
+        if fonte_northwind:
+            # Chave do cache da dimensão de produtos (sem arquivo para calcular o hash)
+            context['ti'].xcom_push(key='hash_produtos', value=products_hash(df_produtos))
+    
+    resultado = {
+        'registros_extraidos': num_registros,
+        'registros_quarentena': num_quarentena,
+        'nulos_preco': nulos_preco,
+        'nulos_fornecedor': nulos_fornecedor
+    }
+    
+    # Gravado em pipeline_fingerprints junto com a carga
+    if fingerprint:
+        fingerprint['resultado'] = resultado
+    context['ti'].xcom_push(key='fingerprint', value=fingerprint)
+    
+    return {**resultado, 'inalterado': inalterado}
+
+
+@instrument('extract')
+def extract_vendas(**context):
+    """
+    Task 2: Extrair dados de vendas
+    - Valida existência do arquivo
+    - Lê dados do CSV (completo ou em chunks no modo streaming)
+    - Com arquivos_vendas, lê em paralelo os arquivos do padrão ainda não
+      ingeridos (ver plugins/multi_source.py)
+    - Com fonte_dados='northwind', lê orders/order_details em chunks, por faixas
+      de order_id em paralelo (ver plugins/northwind_source.py)
+    - Aplica as regras de qualidade a cada chunk (ver plugins/data_quality.py)
+    - Divide as vendas em shards quando particionar_por está definido
+    - Cria as partições mensais dos meses extraídos, antes das cargas paralelas
+    - Reaproveita a extração anterior se o arquivo não mudou
+    - No modo ELT, envia o CSV bruto para a staging e aplica as regras de qualidade no banco
+    - Registra logs informativos
+    """
+    logging.info(f"=== INICIANDO EXTRAÇÃO DE VENDAS ===")
+    
+    padrao_vendas = resolve_source_pattern(context)
+    fonte_northwind = resolve_source(context) == FONTE_NORTHWIND
+    if padrao_vendas:
+        logging.info(f"Padrão de arquivos de vendas: {padrao_vendas}")
+    elif fonte_northwind:
+        logging.info("Fonte: tabelas orders/order_details do Northwind")
+    else:
+        # Validar se arquivo existe
+        if not os.path.exists(VENDAS_FILE):
+            raise FileNotFoundError(f"Arquivo não encontrado: {VENDAS_FILE}")
+        
+        logging.info(f"Arquivo encontrado: {VENDAS_FILE}")
+    
+    modo_streaming, chunk_size = resolve_streaming_params(context)
+    particionar_por = resolve_sharding(context)
+    postgres_hook = get_hook('northwind_postgres')
+    
+    if padrao_vendas:
+        # Vários arquivos: o registro de arquivos ingeridos substitui o cache de fingerprint
+        arquivos, hashes_ingeridos = pending_files(context, postgres_hook, WATERMARK_PIPELINE, padrao_vendas)
+        inalterado, fingerprint, anterior = False, None, None
+    elif fonte_northwind:
+        # Origem no banco: sem cache de fingerprint de arquivo
+        inalterado, fingerprint, anterior = False, None, None
+    else:
+        # Arquivo idêntico ao da última carga (com o mesmo particionamento): reaproveita os shards
+        inalterado, fingerprint, anterior = check_source(
+            context, postgres_hook, WATERMARK_PIPELINE, VENDAS_FILE, {'particionar_por': particionar_por}
+        )
+    modo_elt = resolve_execution_mode(context) == MODO_ELT
+    if (inalterado and not modo_elt
+            and all(frame_exists(shard_dataset(TMP_VENDAS, s['shard'])) for s in anterior['lista_shards'])):
+        logging.info("✓ Reaproveitando vendas extraídas na execução anterior")
+        context['ti'].xcom_push(key='shards', value=anterior['lista_shards'])
+        context['ti'].xcom_push(key='fingerprint', value=fingerprint)
+        return {**anterior['resumo'], 'inalterado': True}
+    
+    # Chave estrangeira: IDs de produtos_loja.csv (apenas a coluna ID_Produto) ou da tabela products
+    if fonte_northwind:
+        ids_produtos = read_product_ids(postgres_hook)
+    else:
+        ids_produtos = read_csv(PRODUTOS_FILE, usecols=['ID_Produto'])['ID_Produto'].dropna()
+    qualidade = DataQuality('vendas', REGRAS_QUALIDADE_VENDAS, referencias={'produtos': ids_produtos})
+    
+    if modo_elt:
+        # ELT: CSV bruto direto para a staging; a janela de carga é aplicada em SQL por transform_data
+        if particionar_por is not None:
+            logging.warning("⚠ Modo ELT: particionar_por ignorado, a transformação roda inteira no banco")
+        origens = VENDAS_FILE
+        if padrao_vendas:
+            novos = new_files(arquivos, hashes_ingeridos)
+            inalterado = not novos
+            origens = [arquivo['origem'] for arquivo in novos]
+        with BulkLoader(postgres_hook) as loader, qualidade:
+            if fonte_northwind:
+                num_registros = stage_northwind(loader, STAGING_VENDAS)
+            else:
+                num_registros = stage_csv(loader, STAGING_VENDAS, origens)
+            qualidade.check_table(loader, STAGING_VENDAS, COLUNAS_STAGING[STAGING_VENDAS])
+        context['ti'].xcom_push(key='qualidade', value=qualidade.report())
+        nulos_preco_venda = qualidade.null_counts()['Preco_Venda']
+        num_quarentena = qualidade.quarentena
+        shards = [{'shard': None}]
+        logging.info(f"⚠ Valores nulos encontrados:")
+        logging.info(f"  - Preco_Venda: {nulos_preco_venda}")
+    else:
+        # Janela de datas a extrair (incremental a partir da marca d'água ou backfill)
+        janela = resolve_load_window(context, postgres_hook, WATERMARK_PIPELINE, WATERMARK_TABELA)
+        if padrao_vendas and janela['modo'] == MODO_INCREMENTAL:
+            # Os arquivos novos já são o incremento: carregados inteiros (o upsert é idempotente)
+            janela = {**janela, 'inicio': None}
+        
+        if padrao_vendas or fonte_northwind or modo_streaming:
+            if padrao_vendas:
+                # Um DataFrame por arquivo novo, lidos em paralelo e marcados com Arquivo_Origem
+                chunks = read_files(arquivos, hashes_ingeridos, chunk_size=chunk_size,
+                                    dtype=read_dtypes('vendas'))
+            elif fonte_northwind:
+                # Cursores nomeados por faixa de order_id, com a janela de carga aplicada no SELECT
+                chunks = iter_order_lines(postgres_hook, janela, chunk_size)
+            else:
+                # Ler CSV em chunks e gravar incrementalmente, sem carregar o arquivo inteiro
+                logging.info(f"Modo streaming ativo: chunks de {chunk_size} registros")
+                chunks = iter_csv_chunks(VENDAS_FILE, chunk_size, dtype=read_dtypes('vendas'))
+            num_registros = 0
+            num_chunks = 0
+            datas = []
+            meses = set()
+            colunas = []
+            with qualidade, ShardWriter(TMP_VENDAS, particionar_por) as writer:
+                for chunk in chunks:
+                    chunk = apply_schema(qualidade.check(chunk), 'vendas')
+                    chunk = filter_window(chunk, 'Data_Venda', janela)
+                    writer.write(chunk)
+                    num_registros += len(chunk)
+                    num_chunks += 1
+                    datas.extend([chunk['Data_Venda'].min(), chunk['Data_Venda'].max()])
+                    meses.update(partition_months(chunk['Data_Venda']))
+                    colunas = list(chunk.columns)
+                if (padrao_vendas or fonte_northwind) and num_chunks == 0:
+                    # Nenhum arquivo novo (ou pedido na janela): vendas extraídas vazias
+                    inalterado = bool(padrao_vendas)
+                    writer.write(empty_frame('vendas'))
+                shards = writer.close()
+            datas = [data for data in datas if pd.notna(data)]
+            data_inicio = min(datas) if datas else None
+            data_fim = max(datas) if datas else None
+        else:
+            # Ler arquivo CSV
+            with qualidade:
+                df_vendas = apply_schema(qualidade.check(read_csv(VENDAS_FILE, dtype=read_dtypes('vendas'))), 'vendas')
+            df_vendas = filter_window(df_vendas, 'Data_Venda', janela)
+            num_registros = len(df_vendas)
+            log_memory(df_vendas, 'Vendas')
+            data_inicio = df_vendas['Data_Venda'].min()
+            data_fim = df_vendas['Data_Venda'].max()
+            meses = partition_months(df_vendas['Data_Venda'])
+            colunas = list(df_vendas.columns)
+            
+            # Salvar dados extraídos (um arquivo por shard)
+            with ShardWriter(TMP_VENDAS, particionar_por) as writer:
+                writer.write(df_vendas)
+                shards = writer.close()
+        
+        # Partições mensais criadas uma única vez, antes das cargas paralelas dos shards
+        create_partitions(postgres_hook, meses)
+        
+        context['ti'].xcom_push(key='qualidade', value=qualidade.report())
+        nulos_preco_venda = qualidade.null_counts()['Preco_Venda']
+        num_quarentena = qualidade.quarentena
+        
+        logging.info(f"✓ Colunas: {colunas}")
+        logging.info(f"✓ Período de vendas: {data_inicio} até {data_fim}")
+    
+    # Shards processados em paralelo pelas tasks mapeadas transform_data/load_data
+    context['ti'].xcom_push(key='shards', value=shards)
+    if padrao_vendas:
+        # Registrados em pipeline_arquivos_ingeridos junto com a carga
+        context['ti'].xcom_push(key='arquivos', value=arquivos)
+    
+    # Registrar informações
+    logging.info(f"✓ Número de registros extraídos: {num_registros}")
+    
+    resultado = {
+        'registros_extraidos': num_registros,
+        'registros_quarentena': num_quarentena,
+        'nulos_preco_venda': nulos_preco_venda,
+        'shards': len(shards)
+    }
+    
+    # Gravado em pipeline_fingerprints junto com a carga
+    if fingerprint:
+        fingerprint['resultado'] = {'resumo': resultado, 'lista_shards': shards}
+    context['ti'].xcom_push(key='fingerprint', value=fingerprint)
+    
+    return {**resultado, 'inalterado': inalterado}
+
+
+def _entradas_inalteradas(context):
+    """Produtos e vendas idênticos aos da última carga (ver plugins/fingerprint_cache.py)"""
+    ti = context['ti']
+    return all((ti.xcom_pull(task_ids=task_id) or {}).get('inalterado')
+               for task_id in ('extract_produtos', 'extract_vendas'))
+
+
+def _chave_dimensao(context):
+    """Chave do cache da dimensão de produtos: hash da origem (produtos_loja.csv ou products) e regras de limpeza"""
+    fingerprint = context['ti'].xcom_pull(task_ids='extract_produtos', key='fingerprint')
+    if fingerprint:
+        hash_origem = fingerprint['hash']
+    else:
+        hash_origem = (context['ti'].xcom_pull(task_ids='extract_produtos', key='hash_produtos')
+                       or content_hash(PRODUTOS_FILE))
+    return dimension_key(hash_origem, REGRAS_PRODUTOS)
+
+
+def _save_fingerprints(loader, context):
+    """Grava os fingerprints, os arquivos ingeridos e os resultados de qualidade das origens na transação da carga"""
+    for task_id in ('extract_produtos', 'extract_vendas'):
+        save_fingerprint(loader, WATERMARK_PIPELINE, context['ti'].xcom_pull(task_ids=task_id, key='fingerprint'))
+        save_results(loader, WATERMARK_PIPELINE, context['ti'].xcom_pull(task_ids=task_id, key='qualidade'))
+    mark_ingested(loader, WATERMARK_PIPELINE, context['ti'].xcom_pull(task_ids='extract_vendas', key='arquivos'))
+
+
+def list_shards(**context):
+    """
+    Task 2b: Lista os shards gravados por extract_vendas
+    - O retorno é a origem do expand() de transform_data e load_data (o
+      Airflow só mapeia sobre o valor de retorno de uma task, não sobre
+      outras chaves do XCom)
+    """
+    return context['ti'].xcom_pull(task_ids='extract_vendas', key='shards') or [{'shard': None}]
+
+
+def _write_sketches(loader, context, sketches):
+    """
+    Grava os resumos diários acumulados dos chunks da carga (ver plugins/sketches.py)
+    - Com vários arquivos de origem, fora do modo full, um dia pode ter vendas de
+      arquivos de cargas anteriores: os dias da carga são relidos do banco
+    """
+    completo = resolve_load_mode(context) == MODO_FULL
+    if resolve_source_pattern(context) and not completo:
+        return refresh_sketches(loader, sketches.dias)
+    return write_sketches(loader, sketches, completo=completo)
+
+
+def _build_local(context):
+    """Monta o SQLite local dos relatórios com os dados transformados da execução (backend_relatorios='sqlite')"""
+    _, chunk_size = resolve_streaming_params(context)
+    shards = context['ti'].xcom_pull(task_ids='extract_vendas', key='shards') or [{'shard': None}]
+    
+    def ler_dados():
+        chunks_vendas = (chunk for s in shards
+                         for chunk in iter_frame(shard_dataset(TMP_VENDAS_TRANSFORM, s['shard']), chunk_size))
+        return load_frame(TMP_PRODUTOS_TRANSFORM), chunks_vendas
+    
+    return build_local(resolve_run_id(context), ler_dados)
+
+
+def _report_hook(context):
+    """Hook das consultas de relatório: PostgreSQL ou SQLite local, conforme backend_relatorios"""
+    if resolve_report_backend(context) == BACKEND_SQLITE:
+        logging.info("Backend dos relatórios: SQLite local")
+        return LocalAnalyticsHook(_build_local(context))
+    return get_hook('northwind_postgres')
+
+
+def _loader(postgres_hook, context):
+    """BulkLoader que marca os registros com o run_id e registra o que gravou para a validação"""
+    return BulkLoader(postgres_hook, run_id=resolve_run_id(context), checksums=resolve_checksums(context))
+
+
+def _transform_elt(context):
+    """
+    Transformação do modo ELT, em uma única transação no banco
+    - Limpeza de produtos e vendas a partir das tabelas de staging
+    - Receita, margem e Mes_Venda calculados em SQL
+    - relatorio_vendas, camada agregada, marca d'água e fingerprints
+    """
+    postgres_hook = get_hook('northwind_postgres')
+    janela = resolve_load_window(context, postgres_hook, WATERMARK_PIPELINE, WATERMARK_TABELA)
+    
+    # Partições mensais criadas antes, fora da transação da carga
+    create_partitions(postgres_hook, staged_months(postgres_hook, janela))
+    
+    with _loader(postgres_hook, context) as loader:
+        if janela['modo'] == MODO_FULL:
+            logging.info("Modo full: limpando tabelas antes da carga")
+            for tabela in ('produtos_processados', 'vendas_processadas', 'relatorio_vendas'):
+                loader.truncate(tabela)
+        
+        logging.info("--- Limpeza de Produtos (SQL) ---")
+        num_produtos = transform_produtos_sql(loader)
+        logging.info(f"✓ {num_produtos} produtos inseridos/atualizados em produtos_processados")
+        
+        logging.info("--- Limpeza e Transformação de Vendas (SQL) ---")
+        num_vendas, meses, dias, marca = transform_vendas_sql(loader, janela)
+        logging.info(f"✓ {num_vendas} vendas inseridas/atualizadas em vendas_processadas")
+        
+        logging.info("--- Criando Relatório Consolidado (SQL) ---")
+        num_relatorio = build_relatorio_sql(loader, meses)
+        logging.info(f"✓ {num_relatorio} registros inseridos/atualizados em relatorio_vendas")
+        
+        logging.info("--- Atualizando Camada Agregada ---")
+        refresh_aggregates(loader, None if janela['modo'] == MODO_FULL else meses)
+        refresh_sketches(loader, dias, completo=janela['modo'] == MODO_FULL)
+        
+        update_watermark(loader, WATERMARK_PIPELINE, WATERMARK_TABELA, marca)
+        _save_fingerprints(loader, context)
+    
+    return {
+        'produtos_processados': num_produtos,
+        'vendas_processadas': num_vendas,
+        'meses': meses,
+        'gravados': loader.gravados
+    }
+
+
+@instrument('transform')
+def transform_data(shard=None, **context):
+    """
+    Task 3: Transformar e limpar dados (uma instância mapeada por shard)
+    - Limpeza de dados nulos
+    - Cálculos de receita e margem
+    - Criação de campos derivados
+    - No modo streaming, vendas são transformadas chunk a chunk
+    - Com entradas inalteradas, reaproveita os dados transformados anteriores
+    - No modo ELT, toda a transformação é feita em SQL no banco
+    """
+    logging.info(f"=== INICIANDO TRANSFORMAÇÃO DE DADOS ===")
+    if shard is not None:
+        logging.info(f"Shard: {shard}")
+    
+    if resolve_execution_mode(context) == MODO_ELT:
+        if _entradas_inalteradas(context):
+            logging.info("✓ Entradas inalteradas desde a última carga: nada a transformar")
+            return {'reutilizado': True}
+        return _transform_elt(context)
+    
+    if (_entradas_inalteradas(context) and frame_exists(TMP_PRODUTOS_TRANSFORM)
+            and frame_exists(shard_dataset(TMP_VENDAS_TRANSFORM, shard))):
+        logging.info("✓ Entradas inalteradas: reaproveitando dados transformados da execução anterior")
+        return {'reutilizado': True}
+    
+    modo_streaming, chunk_size = resolve_streaming_params(context)
+    
+    # === LIMPEZA DE PRODUTOS ===
+    logging.info("--- Limpeza de Produtos ---")
+    
+    # Dimensão de produtos limpa, reaproveitada enquanto a origem e as regras não mudam
+    chave_dimensao = _chave_dimensao(context)
+    dimensao = ProductDimension.load(chave_dimensao)
+    if dimensao is None:
+        # Carregar dados extraídos
+        df_produtos = load_frame(TMP_PRODUTOS)
+        
+        logging.info(f"Dados carregados: {len(df_produtos)} produtos")
+        
+        # 1. Preencher Preco_Custo nulo com média da categoria
+        # 2. Preencher Fornecedor nulo com "Não Informado"
+        df_produtos, _ = impute(df_produtos, REGRAS_PRODUTOS)
+        df_produtos = apply_schema(df_produtos, 'produtos')
+        
+        dimensao = ProductDimension(df_produtos)
+        dimensao.save(chave_dimensao)
+    df_produtos = dimensao.frame
+    
+    # === LIMPEZA E TRANSFORMAÇÃO DE VENDAS ===
+    logging.info("--- Limpeza e Transformação de Vendas ---")
+    
+    # 3. Preencher Preco_Venda nulo com Preco_Custo * 1.3
+    # 4. Calcular Receita_Total
+    # 5. Calcular Margem_Lucro
+    # 6. Criar campo Mes_Venda
+    if modo_streaming:
+        logging.info(f"Modo streaming ativo: chunks de {chunk_size} registros")
+        with FrameWriter(shard_dataset(TMP_VENDAS_TRANSFORM, shard),
+                         modelo=empty_frame('vendas_transformadas')) as writer:
+            chunks = iter_frame(shard_dataset(TMP_VENDAS, shard), chunk_size)
+            resumo = stream_transform_vendas(chunks, dimensao, writer)
+    else:
+        df_vendas = load_frame(shard_dataset(TMP_VENDAS, shard))
+        df_vendas_final, precos_preenchidos = transform_vendas_chunk(df_vendas, dimensao)
+        save_frame(df_vendas_final, shard_dataset(TMP_VENDAS_TRANSFORM, shard))
+        resumo = {
+            'vendas_processadas': len(df_vendas_final),
+            'precos_preenchidos': precos_preenchidos,
+            'receita_total': float(df_vendas_final['Receita_Total'].sum()),
+            'soma_margem': float(df_vendas_final['Margem_Lucro'].sum()),
+            'margens_validas': int(df_vendas_final['Margem_Lucro'].notna().sum()),
+        }
+    
+    if resumo['precos_preenchidos'] > 0:
+        logging.info(f"✓ Preenchido {resumo['precos_preenchidos']} preços de venda com Preco_Custo * 1.3")
+    logging.info(f"✓ Receita_Total, Margem_Lucro e Mes_Venda calculados")
+    
+    margem_media = resumo['soma_margem'] / resumo['margens_validas'] if resumo['margens_validas'] else 0.0
+    
+    # === RESUMO DAS TRANSFORMAÇÕES ===
+    logging.info("--- Resumo das Transformações ---")
+    logging.info(f"✓ Total de produtos processados: {len(df_produtos)}")
+    logging.info(f"✓ Total de vendas processadas: {resumo['vendas_processadas']}")
+    logging.info(f"✓ Receita total: R$ {resumo['receita_total']:.2f}")
+    logging.info(f"✓ Margem de lucro média: R$ {margem_media:.2f}")
+    
+    # Salvar dados transformados (gravação atômica: todos os shards geram o mesmo arquivo)
+    save_frame(df_produtos, TMP_PRODUTOS_TRANSFORM)
+    
+    logging.info(f"✓ Dados transformados salvos")
+    
+    return {
+        'produtos_processados': len(df_produtos),
+        'vendas_processadas': resumo['vendas_processadas'],
+        'receita_total': resumo['receita_total']
+    }
+
+
+def build_relatorio(df_vendas, dimensao):
+    """Vendas com nome e categoria do produto (lookup na dimensão) no formato da tabela relatorio_vendas"""
+    produtos = dimensao.take(df_vendas['ID_Produto'], ['Nome_Produto', 'Categoria'])
+    
+    # Selecionar apenas colunas necessárias
+    return pd.DataFrame({
+        'ID_Venda': df_vendas['ID_Venda'],
+        'Nome_Produto': produtos['Nome_Produto'],
+        'Categoria': produtos['Categoria'],
+        'Quantidade_Vendida': df_vendas['Quantidade_Vendida'],
+        'Receita_Total': df_vendas['Receita_Total'],
+        'Margem_Lucro': df_vendas['Margem_Lucro'],
+        'Canal_Venda': df_vendas['Canal_Venda'],
+        'Mes_Venda': df_vendas['Mes_Venda'],
+        'Data_Venda': df_vendas['Data_Venda'],
+    })
+
+
+@instrument('load')
+def load_data(shard=None, **context):
+    """
+    Task 5: Carregar dados transformados no PostgreSQL (uma instância mapeada por shard)
+    - Insere dados em produtos_processados
+    - Insere dados em vendas_processadas
+    - Cria relatorio_vendas com join
+    - Usa COPY em uma única transação (ver plugins/bulk_loader.py)
+    - Upsert por chave e atualização da marca d'água (carga incremental)
+    - Nada é carregado se as entradas não mudaram desde a última carga
+    - No modo ELT, os dados já foram carregados por transform_data: apenas valida
+    - Valida inserções
+    No modo particionado, cada shard carrega apenas vendas_processadas; produtos,
+    relatorio_vendas, camada agregada e marca d'água ficam para reduce_shards.
+    """
+    logging.info(f"=== INICIANDO CARGA DE DADOS ===")
+    
+    particionado = shard is not None
+    if particionado:
+        logging.info(f"Shard: {shard}")
+    
+    if _entradas_inalteradas(context):
+        logging.info("✓ Entradas inalteradas desde a última carga: nada a carregar")
+        if particionado:
+            return {'shard': shard, 'vendas_inseridas': 0, 'meses': [], 'ultima_data': None, 'gravados': {}}
+        return validate_load(get_hook('northwind_postgres'), context, {})
+    
+    if resolve_execution_mode(context) == MODO_ELT:
+        logging.info("Modo ELT: dados transformados e carregados no banco por transform_data")
+        resultados = [r for r in context['ti'].xcom_pull(task_ids='transform_data') or [] if r]
+        gravados = merge_written(*[r.get('gravados') for r in resultados])
+        return validate_load(get_hook('northwind_postgres'), context, gravados)
+    
+    modo_streaming, chunk_size = resolve_streaming_params(context)
+    
+    # Carregar dados transformados
+    dimensao = ProductDimension(load_frame(TMP_PRODUTOS_TRANSFORM, memory_map=True))
+    df_produtos = dimensao.frame
+    if modo_streaming:
+        chunks_vendas = iter_frame(shard_dataset(TMP_VENDAS_TRANSFORM, shard), chunk_size)
+    else:
+        chunks_vendas = [load_frame(shard_dataset(TMP_VENDAS_TRANSFORM, shard), memory_map=True)]
+    
+    # Conectar ao PostgreSQL
+    postgres_hook = get_hook('northwind_postgres')
+    
+    modo_carga = resolve_load_mode(context)
+    
+    with _loader(postgres_hook, context) as loader:
+        if not particionado:
+            if modo_carga == MODO_FULL:
+                # Recarga total: limpa as tabelas na mesma transação da carga
+                logging.info("Modo full: limpando tabelas antes da carga")
+                for tabela in ('produtos_processados', 'vendas_processadas', 'relatorio_vendas'):
+                    loader.truncate(tabela)
+            
+            # === CARREGAR PRODUTOS ===
+            logging.info("--- Carregando Produtos ---")
+            num_produtos = loader.upsert('produtos_processados', df_produtos, chaves=['ID_Produto'])
+            logging.info(f"✓ {num_produtos} produtos inseridos/atualizados em produtos_processados")
+        
+        # === CARREGAR VENDAS E CRIAR RELATÓRIO ===
+        logging.info("--- Carregando Vendas e Relatório Consolidado ---")
+        num_vendas = 0
+        num_relatorio = 0
+        marca = None
+        meses = set()
+        sketches = DaySketches()
+        for df_vendas in chunks_vendas:
+            num_vendas += loader.upsert('vendas_processadas', df_vendas, chaves=['ID_Venda', 'Data_Venda'])
+            if not particionado:
+                num_relatorio += loader.upsert('relatorio_vendas', build_relatorio(df_vendas, dimensao),
+                                               chaves=['ID_Venda', 'Data_Venda'])
+            marca = merge_watermark(marca, compute_watermark(df_vendas, 'Data_Venda'))
+            meses.update(df_vendas['Mes_Venda'].dropna().unique())
+            sketches.add(df_vendas)
+        
+        logging.info(f"✓ {num_vendas} vendas inseridas/atualizadas em vendas_processadas")
+        
+        if particionado:
+            # Resultado do shard, combinado por reduce_shards (resumos diários em arquivo intermediário)
+            save_frame(sketches.frame(), shard_dataset(TMP_SKETCHES, shard))
+            return {
+                'shard': shard,
+                'vendas_inseridas': num_vendas,
+                'meses': sorted(meses),
+                'sketches': shard_dataset(TMP_SKETCHES, shard),
+                'ultima_data': marca.isoformat() if marca else None,
+                'gravados': loader.gravados,
+            }
+        
+        logging.info(f"✓ {num_relatorio} registros inseridos/atualizados em relatorio_vendas")
+        
+        # Atualizar a camada agregada (meses afetados) e os resumos diários (dias da carga)
+        logging.info("--- Atualizando Camada Agregada ---")
+        refresh_aggregates(loader, None if modo_carga == MODO_FULL else meses)
+        _write_sketches(loader, context, sketches)
+        
+        # Avançar a marca d'água e gravar os fingerprints junto com a carga (mesma transação)
+        update_watermark(loader, WATERMARK_PIPELINE, WATERMARK_TABELA, marca)
+        _save_fingerprints(loader, context)
+    
+    return validate_load(postgres_hook, context, loader.gravados)
+
+
+@instrument('load')
+def reduce_shards(**context):
+    """
+    Task 5b: Redução do modo particionado
+    - Carrega produtos_processados
+    - Monta relatorio_vendas no banco para os meses carregados pelos shards
+    - Atualiza a camada agregada, a marca d'água e os fingerprints
+    - Valida inserções
+    Sem particionamento, load_data já fez tudo isso e esta task não faz nada.
+    """
+    logging.info(f"=== REDUÇÃO DOS SHARDS ===")
+    
+    if resolve_sharding(context) is None:
+        logging.info("Sem particionamento: carga concluída em load_data")
+        return None
+    if resolve_execution_mode(context) == MODO_ELT:
+        logging.info("Modo ELT: carga concluída em transform_data")
+        return None
+    
+    postgres_hook = get_hook('northwind_postgres')
+    if _entradas_inalteradas(context):
+        logging.info("✓ Entradas inalteradas desde a última carga: nada a reduzir")
+        return validate_load(postgres_hook, context, {})
+    
+    resultados = [r for r in context['ti'].xcom_pull(task_ids='load_data') or [] if r]
+    logging.info(f"Shards carregados: {len(resultados)}")
+    
+    meses = set()
+    marca = None
+    sketches = DaySketches()
+    for resultado in resultados:
+        meses.update(resultado['meses'])
+        if resultado['ultima_data']:
+            marca = merge_watermark(marca, date.fromisoformat(resultado['ultima_data']))
+        if resultado.get('sketches'):
+            sketches.add_frame(load_frame(resultado['sketches']))
+    
+    df_produtos = load_frame(TMP_PRODUTOS_TRANSFORM, memory_map=True)
+    modo_carga = resolve_load_mode(context)
+    
+    with _loader(postgres_hook, context) as loader:
+        logging.info("--- Carregando Produtos ---")
+        num_produtos = loader.upsert('produtos_processados', df_produtos, chaves=['ID_Produto'])
+        logging.info(f"✓ {num_produtos} produtos inseridos/atualizados em produtos_processados")
+        
+        logging.info("--- Criando Relatório Consolidado ---")
+        num_relatorio = build_relatorio_sql(loader, meses)
+        logging.info(f"✓ {num_relatorio} registros inseridos/atualizados em relatorio_vendas")
+        
+        logging.info("--- Atualizando Camada Agregada ---")
+        refresh_aggregates(loader, None if modo_carga == MODO_FULL else meses)
+        _write_sketches(loader, context, sketches)
+        
+        update_watermark(loader, WATERMARK_PIPELINE, WATERMARK_TABELA, marca)
+        _save_fingerprints(loader, context)
+    
+    return validate_load(postgres_hook, context, merge_written(*[r.get('gravados') for r in resultados], loader.gravados))
+
+
+def validate_load(postgres_hook, context, gravados):
+    """
+    Valida a carga desta execução (ver plugins/load_validation.py)
+    - Confere os registros e checksums gravados pelo loader com os do run_id no banco
+    - No modo full, tabelas sem registros gravados indicam erro
+    """
+    # === VALIDAÇÃO ===
+    logging.info("--- Validando Dados Inseridos ---")
+    
+    contagens = validate_run(postgres_hook, resolve_run_id(context), gravados)
+    count_produtos = contagens.get('produtos_processados', 0)
+    count_vendas = contagens.get('vendas_processadas', 0)
+    count_relatorio = contagens.get('relatorio_vendas', 0)
+    logging.info(f"✓ Produtos gravados nesta execução: {count_produtos}")
+    logging.info(f"✓ Vendas gravadas nesta execução: {count_vendas}")
+    logging.info(f"✓ Registros do relatório gravados nesta execução: {count_relatorio}")
+    
+    if resolve_load_mode(context) == MODO_FULL and (count_produtos == 0 or count_vendas == 0 or count_relatorio == 0):
+        raise ValueError("Erro na validação: tabelas vazias detectadas!")
+    
+    logging.info("✓ Validação concluída com sucesso!")
+    
+    return {
+        'produtos_inseridos': count_produtos,
+        'vendas_inseridas': count_vendas,
+        'relatorio_registros': count_relatorio
+    }
+
+
+@instrument('report')
+def generate_report(**context):
+    """
+    Task 6: Gerar relatório analítico
+    - Total de vendas por categoria
+    - Produto mais vendido
+    - Canal de venda com maior receita
+    - Margem de lucro média por categoria
+    - Distribuição de margem e ticket por mês (mediana e p95) e ranking de produtos
+    Consultas leem a camada agregada vendas_agregadas (ver plugins/aggregates.py)
+    e são executadas em paralelo, cada uma com uma conexão do pool
+    Contagens de vendas distintas (COUNT(DISTINCT ID_Venda)) leem vendas_processadas
+    Mediana, p95 e ranking combinam os resumos diários de vendas_sketches (ver plugins/sketches.py)
+    Com backend_relatorios='sqlite', rodam no SQLite local (ver plugins/local_analytics.py)
+    Resultados gravados como snapshot versionado (ver plugins/report_snapshots.py)
+    """
+    logging.info(f"=== GERANDO RELATÓRIO ANALÍTICO ===")
+    
+    # Conectar ao backend dos relatórios
+    postgres_hook = _report_hook(context)
+    
+    # === 1. TOTAL DE VENDAS POR CATEGORIA ===
+    query1 = """
+    SELECT 
+        Categoria,
+        SUM(Total_Quantidade) as Total_Quantidade,
+        SUM(Total_Receita) as Total_Receita,
+        ROUND(SUM(Total_Receita) / NULLIF(SUM(Num_Receitas), 0), 2) as Ticket_Medio
+    FROM vendas_agregadas
+    GROUP BY Categoria
+    ORDER BY Total_Receita DESC
+    """
+    
+    # === 2. PRODUTO MAIS VENDIDO ===
+    # Num_Vendas conta vendas distintas (ID_Venda) do produto campeão, como antes da camada agregada
+    query2 = """
+    SELECT 
+        t.Nome_Produto,
+        t.Total_Vendido,
+        t.Receita_Total,
+        (SELECT COUNT(DISTINCT v.ID_Venda)
+         FROM vendas_processadas v
+         JOIN produtos_processados p ON p.ID_Produto = v.ID_Produto
+         WHERE p.Nome_Produto = t.Nome_Produto) as Num_Vendas
+    FROM (
+        SELECT 
+            Nome_Produto,
+            SUM(Total_Quantidade) as Total_Vendido,
+            SUM(Total_Receita) as Receita_Total
+        FROM vendas_agregadas
+        GROUP BY Nome_Produto
+        ORDER BY Total_Vendido DESC
+        LIMIT 1
+    ) t
+    """
+    
+    # === 3. CANAL DE VENDA COM MAIOR RECEITA ===
+    query3 = """
+    SELECT 
+        Canal_Venda,
+        SUM(Num_Vendas) as Num_Vendas,
+        SUM(Total_Quantidade) as Total_Quantidade,
+        SUM(Total_Receita) as Total_Receita,
+        ROUND(SUM(Total_Receita) / NULLIF(SUM(Num_Receitas), 0), 2) as Ticket_Medio
+    FROM vendas_agregadas
+    GROUP BY Canal_Venda
+    ORDER BY Total_Receita DESC
+    """
+    
+    # === 4. MARGEM DE LUCRO MÉDIA POR CATEGORIA ===
+    query4 = """
+    SELECT 
+        Categoria,
+        ROUND(SUM(Soma_Margem) / NULLIF(SUM(Num_Margens), 0), 2) as Margem_Media,
+        ROUND(MIN(Margem_Minima), 2) as Margem_Minima,
+        ROUND(MAX(Margem_Maxima), 2) as Margem_Maxima,
+        SUM(Num_Vendas) as Num_Vendas
+    FROM vendas_agregadas
+    GROUP BY Categoria
+    ORDER BY Margem_Media DESC
+    """
+    
+    # === RESUMO GERAL ===
+    # Total_Vendas conta vendas distintas (ID_Venda), não linhas da camada agregada
+    query_resumo = """
+    SELECT 
+        (SELECT COUNT(DISTINCT ID_Venda) FROM vendas_processadas) as Total_Vendas,
+        SUM(Total_Quantidade) as Total_Itens_Vendidos,
+        SUM(Total_Receita) as Receita_Total_Geral,
+        ROUND(SUM(Soma_Margem) / NULLIF(SUM(Num_Margens), 0), 2) as Margem_Lucro_Media_Geral
+    FROM vendas_agregadas
+    """
+    
+    # === RESUMOS DIÁRIOS (SKETCHES) ===
+    query_sketches = """
+    SELECT 
+        Data_Venda, Num_Vendas, Total_Receita, Num_Receitas, Soma_Margem, Num_Margens,
+        Margem_Minima, Margem_Maxima, Sketch_Margem, Sketch_Ticket, Top_Produtos
+    FROM vendas_sketches
+    ORDER BY Data_Venda
+    """
+    
+    # Nomes atuais dos produtos do ranking (os resumos guardam o ID_Produto)
+    query_produtos = "SELECT ID_Produto, Nome_Produto FROM produtos_processados"
+    
+    # Consultas independentes: tempo total próximo ao da consulta mais lenta
+    resultados, latencias = run_queries(postgres_hook, {
+        'categoria': query1,
+        'produto_mais_vendido': query2,
+        'canal': query3,
+        'margem': query4,
+        'resumo': query_resumo,
+        'sketches': query_sketches,
+        'produtos': query_produtos,
+    })
+    
+    # Resumos diários combinados por mês e no período; o snapshot guarda apenas o resultado
+    df_sketches = resultados.pop('sketches')
+    resultados['distribuicao'] = merge_sketches(df_sketches)
+    resultados['top_produtos'] = top_products(df_sketches, resultados.pop('produtos'))
+    df_distribuicao = resultados['distribuicao']
+    df_categoria = resultados['categoria']
+    df_top_produto = resultados['produto_mais_vendido']
+    df_canal = resultados['canal']
+    df_margem = resultados['margem']
+    df_resumo = resultados['resumo']
+    
+    logging.info("\n" + "="*60)
+    logging.info("📊 RELATÓRIO DE ANÁLISE DE VENDAS")
+    logging.info("="*60 + "\n")
+    
+    logging.info("--- 1. Total de Vendas por Categoria ---")
+    logging.info(f"\n{df_categoria.to_string(index=False)}\n")
+    
+    logging.info("--- 2. Produto Mais Vendido ---")
+    logging.info(f"\n🏆 Produto Campeão: {df_top_produto['nome_produto'].values[0]}")
+    logging.info(f"   Quantidade Total: {df_top_produto['total_vendido'].values[0]} unidades")
+    logging.info(f"   Receita Gerada: R$ {df_top_produto['receita_total'].values[0]:.2f}")
+    logging.info(f"   Número de Vendas: {df_top_produto['num_vendas'].values[0]}\n")
+    
+    logging.info("--- 3. Desempenho por Canal de Venda ---")
+    logging.info(f"\n{df_canal.to_string(index=False)}")
+    logging.info(f"\n🥇 Canal Líder: {df_canal['canal_venda'].values[0]}")
+    logging.info(f"   Receita: R$ {df_canal['total_receita'].values[0]:.2f}\n")
+    
+    logging.info("--- 4. Margem de Lucro por Categoria ---")
+    logging.info(f"\n{df_margem.to_string(index=False)}\n")
+    
+    logging.info("--- 5. Distribuição de Margem e Ticket por Mês ---")
+    logging.info(f"\n{df_distribuicao.to_string(index=False)}\n")
+    logging.info("Produtos mais vendidos (quantidade estimada pelos resumos diários):")
+    logging.info(f"\n{resultados['top_produtos'].to_string(index=False)}\n")
+    
+    logging.info("--- Resumo Geral ---")
+    logging.info(f"\n💰 RESUMO EXECUTIVO")
+    logging.info(f"   Total de Vendas: {df_resumo['total_vendas'].values[0]}")
+    logging.info(f"   Total de Itens Vendidos: {df_resumo['total_itens_vendidos'].values[0]}")
+    logging.info(f"   Receita Total: R$ {df_resumo['receita_total_geral'].values[0]:.2f}")
+    logging.info(f"   Margem de Lucro Média: R$ {df_resumo['margem_lucro_media_geral'].values[0]:.2f}")
+    total = period_summary(df_distribuicao)
+    logging.info(f"   Margem de Lucro Mediana: R$ {total['margem_mediana']} (p95: R$ {total['margem_p95']})")
+    
+    logging.info("\n" + "="*60)
+    logging.info("✓ Relatório gerado com sucesso!")
+    logging.info("="*60 + "\n")
+    
+    # Snapshot consultável pelos dashboards (latest_snapshot), sem reexecutar a task
+    snapshot = save_snapshot(resultados, snapshot_version(context))
+    
+    return {
+        'total_vendas': int(df_resumo['total_vendas'].values[0]),
+        'receita_total': float(df_resumo['receita_total_geral'].values[0]),
+        'produto_mais_vendido': df_top_produto['nome_produto'].values[0],
+        'canal_lider': df_canal['canal_venda'].values[0],
+        'margem_mediana': total['margem_mediana'],
+        'margem_p95': total['margem_p95'],
+        'latencias_consultas': {nome: round(segundos, 3) for nome, segundos in latencias.items()},
+        'snapshot': snapshot,
+    }
+
+
+@instrument('report')
+def detect_low_performance(**context):
+    """
+    BÔNUS: Detectar produtos com baixa performance
+    - Identifica produtos com menos de 2 vendas
+    - Registra alertas
+    - Cria tabela produtos_baixa_performance
+    - Grava o snapshot baixa_performance (ver plugins/report_snapshots.py)
+    Com backend_relatorios='sqlite', consulta e grava no SQLite local
+    """
+    logging.info(f"=== ANALISANDO PERFORMANCE DE PRODUTOS ===")
+    
+    # Conectar ao backend dos relatórios
+    postgres_hook = _report_hook(context)
+    local = isinstance(postgres_hook, LocalAnalyticsHook)
+    
+    # Query para detectar produtos com baixa performance
+    query = """
+    SELECT 
+        p.ID_Produto,
+        p.Nome_Produto,
+        p.Categoria,
+        p.Preco_Custo,
+        p.Status,
+        COALESCE(SUM(a.Num_Vendas), 0) as Num_Vendas,
+        COALESCE(SUM(a.Total_Quantidade), 0) as Total_Vendido
+    FROM produtos_processados p
+    LEFT JOIN vendas_agregadas a ON p.ID_Produto = a.ID_Produto
+    GROUP BY p.ID_Produto, p.Nome_Produto, p.Categoria, p.Preco_Custo, p.Status
+    HAVING COALESCE(SUM(a.Num_Vendas), 0) < 2
+    ORDER BY Num_Vendas ASC, p.Nome_Produto
+    """
+    
+    df_baixa_performance = postgres_hook.get_pandas_df(query)
+    if local:
+        # No PostgreSQL a tabela é esvaziada por create_tables; no SQLite, substituída a cada execução
+        postgres_hook.replace_table('produtos_baixa_performance', df_baixa_performance)
+    
+    if len(df_baixa_performance) > 0:
+        logging.warning(f"\n⚠️  ALERTA: {len(df_baixa_performance)} produto(s) com baixa performance detectado(s)!")
+        logging.warning(f"\n{df_baixa_performance.to_string(index=False)}\n")
+        
+        # Carregar na tabela de baixa performance
+        if not local:
+            with BulkLoader(postgres_hook) as loader:
+                loader.load('produtos_baixa_performance', df_baixa_performance)
+        
+        logging.warning(f"✓ {len(df_baixa_performance)} produtos registrados em produtos_baixa_performance")
+        
+        # Detalhamento por produto (montado de uma vez, sem iterar linha a linha)
+        detalhes = (
+            "   • " + df_baixa_performance['nome_produto'].astype(str)
+            + " (" + df_baixa_performance['categoria'].astype(str) + "): "
+            + df_baixa_performance['num_vendas'].astype(str) + " venda(s)"
+        )
+        logging.warning("\n".join(detalhes))
+    else:
+        logging.info("✓ Todos os produtos têm performance satisfatória!")
+    
+    # Snapshot gravado mesmo sem alertas: a versão vazia indica que não há produtos com baixa performance
+    snapshot = save_snapshot({'baixa_performance': df_baixa_performance}, snapshot_version(context))
+    
+    return {
+        'produtos_baixa_performance': len(df_baixa_performance),
+        'snapshot': snapshot,
+    }
+
+
+def choose_execution(**context):
+    """Escolhe entre o pipeline em uma única task (modo fundido) e uma task por etapa"""
+    if resolve_fused(context):
+        logging.info("Modo fundido: extract, transform e load na task pipeline_fundido")
+        return TASK_FUNDIDA
+    return ['extract_produtos', 'extract_vendas']
+
+
+def run_fused_pipeline(**context):
+    """
+    Task alternativa (modo fundido): extract → transform → load no mesmo processo
+    - Executa as mesmas funções das tasks, na mesma ordem
+    - Dados intermediários em memória, sem arquivos em /tmp (ver plugins/fused.py)
+    - Logs e métricas continuam separados por etapa
+    """
+    datasets = [TMP_PRODUTOS, TMP_VENDAS, TMP_PRODUTOS_TRANSFORM, TMP_VENDAS_TRANSFORM, TMP_SKETCHES]
+    with FusedRun(context, datasets) as execucao:
+        execucao.run('extract_produtos', extract_produtos)
+        execucao.run('extract_vendas', extract_vendas)
+        shards = execucao.xcom_pull('extract_vendas', key='shards')
+        execucao.run('transform_data', transform_data, mapeamentos=shards)
+        carga = execucao.run('load_data', load_data, mapeamentos=shards)
+        reducao = execucao.run('reduce_shards', reduce_shards)
+        if resolve_report_backend(context) == BACKEND_SQLITE:
+            # Relatórios no SQLite local: montado enquanto os dados transformados estão em memória
+            _build_local(execucao.context)
+    
+    context['ti'].xcom_push(key='metricas_etapas', value=execucao.metrics())
+    return {
+        'tempos_etapas': execucao.tempos,
+        'carga': reducao if reducao is not None else carga[0],
+    }
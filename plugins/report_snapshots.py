@@ -0,0 +1,86 @@
+"""
+Snapshots versionados dos relatórios
+
+Os resultados de generate_report e detect_low_performance são gravados como
+arquivos colunares (Parquet), um diretório por data de execução:
+
+    <PIPELINE_REPORTS_DIR>/2024-01-15/categoria.parquet
+    <PIPELINE_REPORTS_DIR>/2024-01-15/baixa_performance.parquet
+
+- Reexecuções da mesma data substituem os arquivos (gravação atômica)
+- Versões de outras datas são mantidas (histórico consultável)
+- Cada relatório é gravado separadamente, então tasks paralelas não disputam
+  nenhum arquivo de índice: a versão mais recente de um relatório é o maior
+  diretório que contém o arquivo
+
+Dashboards leem o último snapshot com latest_snapshot(), sem reexecutar a
+task nem consultar o banco. A leitura é mapeada em memória e fica em cache
+no processo enquanto o arquivo não muda.
+
+Configuração via variável de ambiente:
+- PIPELINE_REPORTS_DIR: diretório dos snapshots (padrão: /opt/airflow/data/relatorios)
+
+Uso:
+    save_snapshot({'categoria': df_categoria}, snapshot_version(context))
+    df = latest_snapshot('categoria')
+"""
+
+import functools
+import glob
+import logging
+import os
+from datetime import date
+
+from intermediate_storage import EXTENSOES, load_frame, save_frame
+
+DIRETORIO_RELATORIOS = os.environ.get('PIPELINE_REPORTS_DIR', '/opt/airflow/data/relatorios')
+FORMATO_RELATORIOS = 'parquet'
+
+
+def snapshot_version(context):
+    """Versão do snapshot: data lógica da execução (YYYY-MM-DD), ou a data atual"""
+    return context.get('ds') or date.today().isoformat()
+
+
+def save_snapshot(relatorios, versao, diretorio=None):
+    """
+    Grava os relatórios (dict nome -> DataFrame) na versão informada
+    Retorna o diretório da versão.
+    """
+    diretorio_versao = os.path.join(diretorio or DIRETORIO_RELATORIOS, versao)
+    os.makedirs(diretorio_versao, exist_ok=True)
+    for nome, df in relatorios.items():
+        save_frame(df, nome, FORMATO_RELATORIOS, diretorio_versao)
+    logging.info(f"✓ Snapshot {versao} gravado: {', '.join(relatorios)} ({diretorio_versao})")
+    return diretorio_versao
+
+
+def list_versions(nome, diretorio=None):
+    """Versões (datas) com snapshot do relatório, da mais antiga para a mais recente"""
+    padrao = os.path.join(diretorio or DIRETORIO_RELATORIOS, '*', f"{nome}{EXTENSOES[FORMATO_RELATORIOS]}")
+    return sorted(os.path.basename(os.path.dirname(caminho)) for caminho in glob.glob(padrao))
+
+
+@functools.lru_cache(maxsize=64)
+def _ler_snapshot(diretorio_versao, nome, mtime_ns, colunas):
+    # mtime_ns faz parte da chave: um snapshot regravado invalida o cache
+    return load_frame(nome, FORMATO_RELATORIOS, diretorio_versao, columns=list(colunas) if colunas else None,
+                      memory_map=True)
+
+
+def load_snapshot(nome, versao, diretorio=None, columns=None):
+    """DataFrame do relatório na versão informada (cópia; o cache não é alterado)"""
+    diretorio_versao = os.path.join(diretorio or DIRETORIO_RELATORIOS, versao)
+    caminho = os.path.join(diretorio_versao, f"{nome}{EXTENSOES[FORMATO_RELATORIOS]}")
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Snapshot não encontrado: {caminho}")
+    mtime_ns = os.stat(caminho).st_mtime_ns
+    return _ler_snapshot(diretorio_versao, nome, mtime_ns, tuple(columns) if columns else None).copy()
+
+
+def latest_snapshot(nome, diretorio=None, columns=None):
+    """DataFrame da versão mais recente do relatório"""
+    versoes = list_versions(nome, diretorio)
+    if not versoes:
+        raise FileNotFoundError(f"Nenhum snapshot do relatório {nome} em {diretorio or DIRETORIO_RELATORIOS}")
+    return load_snapshot(nome, versoes[-1], diretorio, columns)
@@ -0,0 +1,271 @@
+"""
+Gerenciamento do schema do pipeline_produtos_vendas
+
+Cria as tabelas com chaves primárias e índices nas colunas de join e filtro
+(ID_Produto, Categoria, Canal_Venda, Mes_Venda). vendas_processadas e
+relatorio_vendas são particionadas por intervalo mensal de Data_Venda, e as
+partições de novos meses são criadas sob demanda antes de cada carga.
+
+Tabelas de execuções anteriores (sem particionamento ou sem chave) são
+migradas automaticamente para o novo formato por ensure_schema().
+"""
+
+import logging
+
+import pandas as pd
+
+from aggregates import DDL_AGREGADOS
+from data_quality import DDL_CONVERSOES, DDL_QUALIDADE
+from fingerprint_cache import DDL_FINGERPRINTS
+from incremental import DDL_WATERMARKS
+from multi_source import DDL_ARQUIVOS
+from sketches import DDL_SKETCHES
+
+TABELAS_PARTICIONADAS = ('vendas_processadas', 'relatorio_vendas')
+
+DDL_TABELAS = """
+-- Tabela de produtos processados
+CREATE TABLE IF NOT EXISTS produtos_processados (
+    ID_Produto VARCHAR(10) PRIMARY KEY,
+    Nome_Produto VARCHAR(100),
+    Categoria VARCHAR(50),
+    Preco_Custo DECIMAL(10,2),
+    Fornecedor VARCHAR(100),
+    Status VARCHAR(20),
+    Run_Id VARCHAR(250),
+    Data_Processamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tabela de vendas processadas (particionada por mês de Data_Venda)
+CREATE TABLE IF NOT EXISTS vendas_processadas (
+    ID_Venda VARCHAR(10),
+    ID_Produto VARCHAR(10),
+    Quantidade_Vendida INTEGER,
+    Preco_Venda DECIMAL(10,2),
+    Data_Venda DATE NOT NULL,
+    Canal_Venda VARCHAR(20),
+    Receita_Total DECIMAL(10,2),
+    Margem_Lucro DECIMAL(10,2),
+    Mes_Venda VARCHAR(7),
+    Arquivo_Origem VARCHAR(500),
+    Run_Id VARCHAR(250),
+    Data_Processamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ID_Venda, Data_Venda)
+) PARTITION BY RANGE (Data_Venda);
+
+-- Tabela de relatório consolidado (particionada por mês de Data_Venda)
+CREATE TABLE IF NOT EXISTS relatorio_vendas (
+    ID_Venda VARCHAR(10),
+    Nome_Produto VARCHAR(100),
+    Categoria VARCHAR(50),
+    Quantidade_Vendida INTEGER,
+    Receita_Total DECIMAL(10,2),
+    Margem_Lucro DECIMAL(10,2),
+    Canal_Venda VARCHAR(20),
+    Mes_Venda VARCHAR(7),
+    Data_Venda DATE NOT NULL,
+    Run_Id VARCHAR(250),
+    Data_Processamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ID_Venda, Data_Venda)
+) PARTITION BY RANGE (Data_Venda);
+
+-- BÔNUS: Tabela de produtos com baixa performance
+CREATE TABLE IF NOT EXISTS produtos_baixa_performance (
+    ID_Produto VARCHAR(10),
+    Nome_Produto VARCHAR(100),
+    Categoria VARCHAR(50),
+    Preco_Custo DECIMAL(10,2),
+    Status VARCHAR(20),
+    Num_Vendas INTEGER,
+    Total_Vendido INTEGER,
+    Data_Analise TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+DDL_INDICES = """
+CREATE INDEX IF NOT EXISTS ix_produtos_processados_categoria ON produtos_processados (Categoria);
+CREATE INDEX IF NOT EXISTS ix_vendas_processadas_produto ON vendas_processadas (ID_Produto);
+CREATE INDEX IF NOT EXISTS ix_vendas_processadas_canal ON vendas_processadas (Canal_Venda);
+CREATE INDEX IF NOT EXISTS ix_vendas_processadas_mes ON vendas_processadas (Mes_Venda);
+CREATE INDEX IF NOT EXISTS ix_relatorio_vendas_categoria ON relatorio_vendas (Categoria);
+CREATE INDEX IF NOT EXISTS ix_relatorio_vendas_canal ON relatorio_vendas (Canal_Venda);
+CREATE INDEX IF NOT EXISTS ix_relatorio_vendas_mes ON relatorio_vendas (Mes_Venda);
+CREATE INDEX IF NOT EXISTS ix_produtos_processados_run_id ON produtos_processados (Run_Id);
+CREATE INDEX IF NOT EXISTS ix_vendas_processadas_run_id ON vendas_processadas (Run_Id);
+CREATE INDEX IF NOT EXISTS ix_relatorio_vendas_run_id ON relatorio_vendas (Run_Id);
+"""
+
+# Coluna da execução que gravou cada registro (validação da carga por execução)
+DDL_RUN_ID = """
+ALTER TABLE produtos_processados ADD COLUMN IF NOT EXISTS Run_Id VARCHAR(250);
+ALTER TABLE vendas_processadas ADD COLUMN IF NOT EXISTS Run_Id VARCHAR(250);
+ALTER TABLE relatorio_vendas ADD COLUMN IF NOT EXISTS Run_Id VARCHAR(250);
+"""
+
+# Arquivo de origem de cada venda (extração de múltiplos arquivos)
+DDL_ARQUIVO_ORIGEM = """
+ALTER TABLE vendas_processadas ADD COLUMN IF NOT EXISTS Arquivo_Origem VARCHAR(500);
+"""
+
+# Migração de tabelas antigas: relatorio_vendas é reconstruído a partir das
+# tabelas base, pois as versões antigas não tinham Data_Venda
+SQL_MIGRAR = {
+    'vendas_processadas': """
+        INSERT INTO vendas_processadas (
+            ID_Venda, ID_Produto, Quantidade_Vendida, Preco_Venda, Data_Venda,
+            Canal_Venda, Receita_Total, Margem_Lucro, Mes_Venda, Data_Processamento
+        )
+        SELECT DISTINCT ON (ID_Venda, Data_Venda)
+            ID_Venda, ID_Produto, Quantidade_Vendida, Preco_Venda, Data_Venda,
+            Canal_Venda, Receita_Total, Margem_Lucro, Mes_Venda, Data_Processamento
+        FROM vendas_processadas_legado
+        WHERE Data_Venda IS NOT NULL
+        ORDER BY ID_Venda, Data_Venda, Data_Processamento DESC
+    """,
+    'relatorio_vendas': """
+        INSERT INTO relatorio_vendas (
+            ID_Venda, Nome_Produto, Categoria, Quantidade_Vendida, Receita_Total,
+            Margem_Lucro, Canal_Venda, Mes_Venda, Data_Venda
+        )
+        SELECT
+            v.ID_Venda, p.Nome_Produto, p.Categoria, v.Quantidade_Vendida, v.Receita_Total,
+            v.Margem_Lucro, v.Canal_Venda, v.Mes_Venda, v.Data_Venda
+        FROM vendas_processadas v
+        LEFT JOIN produtos_processados p ON p.ID_Produto = v.ID_Produto
+    """,
+}
+
+
+def _relkind(cursor, tabela):
+    """Tipo da tabela no catálogo: 'r' comum, 'p' particionada, None se não existe"""
+    cursor.execute(
+        "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = %s AND n.nspname = current_schema()",
+        (tabela,),
+    )
+    registro = cursor.fetchone()
+    return registro[0] if registro else None
+
+
+def _tem_chave_primaria(cursor, tabela):
+    cursor.execute(
+        "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+        (tabela,),
+    )
+    return cursor.fetchone() is not None
+
+
+def _nome_particao(tabela, mes):
+    return f"{tabela}_p{mes.strftime('%Y%m')}"
+
+
+def partition_months(datas):
+    """Retorna os meses (Period) presentes em uma série de datas"""
+    return sorted(pd.to_datetime(datas).dropna().dt.to_period('M').unique())
+
+
+def ensure_partitions(cursor, tabela, meses):
+    """
+    Cria as partições mensais que ainda não existem
+    - cursor: cursor psycopg2 da transação corrente
+    - meses: Periods mensais (ver partition_months)
+    """
+    nomes = {_nome_particao(tabela, mes): mes for mes in meses}
+    if not nomes:
+        return []
+
+    cursor.execute(
+        "SELECT relname FROM pg_class WHERE relname = ANY(%s) AND relispartition",
+        (list(nomes),),
+    )
+    existentes = {registro[0] for registro in cursor.fetchall()}
+
+    criadas = []
+    for nome, mes in nomes.items():
+        if nome in existentes:
+            continue
+        inicio = mes.start_time.date()
+        fim = (mes + 1).start_time.date()
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {nome} PARTITION OF {tabela} "
+            f"FOR VALUES FROM ('{inicio}') TO ('{fim}')"
+        )
+        criadas.append(nome)
+
+    if criadas:
+        logging.info(f"✓ Partições criadas em {tabela}: {', '.join(criadas)}")
+    return criadas
+
+
+def create_partitions(postgres_hook, meses):
+    """
+    Cria as partições mensais da execução em uma transação curta e própria
+    - Chamada uma vez, antes das cargas (e do fan-out dos shards): o
+      CREATE TABLE ... PARTITION OF bloqueia a tabela pai, então dentro da
+      transação de cada carga serializaria os shards
+    - meses: Periods mensais (ver partition_months)
+    """
+    meses = sorted(set(meses))
+    if not meses:
+        return []
+
+    conn = postgres_hook.get_conn()
+    try:
+        with conn.cursor() as cursor:
+            criadas = [nome for tabela in TABELAS_PARTICIONADAS for nome in ensure_partitions(cursor, tabela, meses)]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return criadas
+
+
+def ensure_schema(postgres_hook):
+    """
+    Cria (ou migra) todas as tabelas, chaves e índices do pipeline
+    - Tabelas antigas não particionadas são renomeadas para *_legado,
+      recriadas particionadas e têm os dados copiados
+    - produtos_processados antiga recebe chave primária em ID_Produto
+    - Tabelas sem Run_Id (e vendas_processadas sem Arquivo_Origem) recebem a coluna
+    """
+    conn = postgres_hook.get_conn()
+    try:
+        with conn.cursor() as cursor:
+            legados = []
+            for tabela in TABELAS_PARTICIONADAS:
+                if _relkind(cursor, tabela) == 'r':
+                    logging.info(f"Migrando {tabela} para tabela particionada por mês")
+                    cursor.execute(f"ALTER TABLE {tabela} RENAME TO {tabela}_legado")
+                    legados.append(tabela)
+
+            cursor.execute(DDL_TABELAS + DDL_WATERMARKS + DDL_FINGERPRINTS + DDL_AGREGADOS + DDL_RUN_ID
+                           + DDL_QUALIDADE + DDL_CONVERSOES + DDL_ARQUIVO_ORIGEM + DDL_ARQUIVOS + DDL_SKETCHES)
+
+            if not _tem_chave_primaria(cursor, 'produtos_processados'):
+                logging.info("Adicionando chave primária em produtos_processados")
+                cursor.execute("ALTER TABLE produtos_processados ADD PRIMARY KEY (ID_Produto)")
+
+            for tabela in legados:
+                origem = 'vendas_processadas_legado' if tabela == 'vendas_processadas' else 'vendas_processadas'
+                cursor.execute(f"SELECT DISTINCT date_trunc('month', Data_Venda)::date FROM {origem} "
+                               f"WHERE Data_Venda IS NOT NULL")
+                meses = partition_months(pd.Series([registro[0] for registro in cursor.fetchall()]))
+                ensure_partitions(cursor, tabela, meses)
+                cursor.execute(SQL_MIGRAR[tabela])
+                logging.info(f"✓ {cursor.rowcount} registros migrados para {tabela}")
+                cursor.execute(f"DROP TABLE {tabela}_legado")
+
+            cursor.execute(DDL_INDICES)
+
+            # Análise de baixa performance é refeita a cada execução
+            cursor.execute("TRUNCATE TABLE produtos_baixa_performance")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    logging.info("✓ Schema verificado: tabelas, chaves, índices e partições")
@@ -0,0 +1,116 @@
+"""
+Registro central de schemas (dtypes) dos datasets
+
+Sem dtypes explícitos, pd.read_csv deixa colunas de texto repetitivas
+(Categoria, Canal_Venda, Regiao...) como strings Python e todo valor
+monetário como float64 inferido. Cada dataset declara aqui o tipo lógico de
+suas colunas:
+- texto: string (IDs únicos, nomes)
+- categoria: pd.Categorical (códigos inteiros + dicionário de valores); joins
+  e groupbys operam sobre os códigos
+- inteiro: Int32 (inteiro de 32 bits com nulos)
+- moeda_float: float64 arredondado para a escala da coluna no banco
+  (DECIMAL(10,2)). Não é um decimal exato: valores como 0.1 não têm
+  representação binária exata, mas float64 guarda 15 dígitos significativos,
+  o que devolve o valor de 2 casas sem perda ao gravar em DECIMAL (nunca é
+  reduzido para float32). Somas exatas ficam para o banco (colunas DECIMAL)
+- data: datetime64
+
+Uso:
+- Leitura: read_csv(caminho, dtype=read_dtypes('vendas')) converte apenas
+  texto e categorias, que nunca falham; valores numéricos inválidos ficam
+  para as regras de qualidade (ver data_quality.py)
+- Após a validação e após cada transformação: apply_schema(df, 'vendas')
+- Os arquivos intermediários (Parquet/Arrow) preservam categorias e tipos
+  entre as tasks
+"""
+
+import logging
+
+import pandas as pd
+
+ESCALA_DECIMAL = 2
+
+TIPOS_LEITURA = {'texto': str, 'categoria': 'category'}
+
+SCHEMAS = {
+    'produtos': {
+        'ID_Produto': 'texto',
+        'Nome_Produto': 'texto',
+        'Categoria': 'categoria',
+        'Preco_Custo': 'moeda_float',
+        'Fornecedor': 'categoria',
+        'Status': 'categoria',
+    },
+    'vendas': {
+        'ID_Venda': 'texto',
+        'ID_Produto': 'categoria',
+        'Quantidade_Vendida': 'inteiro',
+        'Preco_Venda': 'moeda_float',
+        'Data_Venda': 'data',
+        'Canal_Venda': 'categoria',
+        # Presente apenas na extração de múltiplos arquivos (ver multi_source.py)
+        'Arquivo_Origem': 'categoria',
+    },
+    'dados_vendas': {
+        'ID_Produto': 'categoria',
+        'Valor': 'moeda_float',
+        'Quantidade': 'inteiro',
+        'Data': 'data',
+        'Regiao': 'categoria',
+    },
+}
+
+# Datasets derivados: schema de origem + colunas calculadas na transformação
+SCHEMAS['vendas_transformadas'] = {
+    **SCHEMAS['vendas'],
+    'Receita_Total': 'moeda_float',
+    'Margem_Lucro': 'moeda_float',
+    'Mes_Venda': 'categoria',
+}
+SCHEMAS['dados_transformados'] = {**SCHEMAS['dados_vendas'], 'TotalVenda': 'moeda_float'}
+
+
+def _schema(dataset):
+    if dataset not in SCHEMAS:
+        raise ValueError(f"Dataset sem schema registrado: {dataset}")
+    return SCHEMAS[dataset]
+
+
+def read_dtypes(dataset):
+    """dtypes para pd.read_csv: apenas texto e categorias (conversões que não falham)"""
+    return {coluna: TIPOS_LEITURA[tipo] for coluna, tipo in _schema(dataset).items() if tipo in TIPOS_LEITURA}
+
+
+def _converter(serie, tipo):
+    if tipo == 'categoria':
+        return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype('category')
+    if tipo == 'inteiro':
+        return pd.to_numeric(serie, errors='coerce').astype('Int32')
+    if tipo == 'moeda_float':
+        return pd.to_numeric(serie, errors='coerce').astype('float64').round(ESCALA_DECIMAL)
+    if tipo == 'data':
+        return pd.to_datetime(serie)
+    return serie
+
+
+def apply_schema(df, dataset):
+    """Converte as colunas presentes no DataFrame para os tipos do dataset"""
+    schema = _schema(dataset)
+    return df.assign(**{coluna: _converter(df[coluna], tipo) for coluna, tipo in schema.items()
+                        if coluna in df.columns})
+
+
+def empty_frame(dataset):
+    """DataFrame sem registros com todas as colunas e tipos do dataset"""
+    schema = _schema(dataset)
+    vazio = pd.DataFrame({coluna: pd.Series([], dtype=TIPOS_LEITURA.get(tipo, object))
+                          for coluna, tipo in schema.items()})
+    return apply_schema(vazio, dataset)
+
+
+def log_memory(df, nome):
+    """Registra a memória ocupada pelo DataFrame (incluindo strings)"""
+    megabytes = df.memory_usage(deep=True).sum() / 2**20
+    logging.info(f"✓ {nome}: {len(df)} registros, {megabytes:.1f} MB em memória")
+    return megabytes
@@ -0,0 +1,181 @@
+"""
+Particionamento de vendas em shards para execução paralela
+
+No modo particionado, extract_vendas divide as vendas em shards (por mês de
+Data_Venda ou por Canal_Venda), cada shard é gravado em um arquivo
+intermediário próprio e transform_data/load_data rodam como tasks mapeadas
+dinamicamente (uma por shard), distribuídas entre os workers. A etapa de
+redução (reduce) monta relatorio_vendas no banco a partir dos shards
+carregados.
+
+Parâmetro particionar_por da DAG:
+- None: sem particionamento (um único shard)
+- 'data': um shard por mês de Data_Venda (coincide com as partições da tabela)
+- 'canal': um shard por Canal_Venda
+
+Os shards trafegam entre tasks por arquivo: com um executor distribuído
+(Celery, Kubernetes...) o particionamento exige PIPELINE_INTERMEDIATE_DIR em
+um volume compartilhado entre os workers (o padrão /tmp é local de cada
+worker). Executores locais (LocalExecutor, SequentialExecutor) dispensam.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from intermediate_storage import FrameWriter
+
+PARTICIONAMENTOS = (None, 'data', 'canal')
+
+# Executores em que todas as tasks rodam na mesma máquina (mesmo /tmp)
+EXECUTORES_LOCAIS = ('LocalExecutor', 'SequentialExecutor')
+
+# Shard gravado quando a extração não tem vendas: as tasks mapeadas e a
+# redução (marca d'água, fingerprints) executam mesmo sem dados novos
+SHARD_VAZIO = 'vazio'
+
+SQL_RELATORIO_MESES = """
+INSERT INTO relatorio_vendas (
+    ID_Venda, Nome_Produto, Categoria, Quantidade_Vendida, Receita_Total,
+    Margem_Lucro, Canal_Venda, Mes_Venda, Data_Venda, Run_Id
+)
+SELECT
+    v.ID_Venda, p.Nome_Produto, p.Categoria, v.Quantidade_Vendida, v.Receita_Total,
+    v.Margem_Lucro, v.Canal_Venda, v.Mes_Venda, v.Data_Venda, %(run_id)s
+FROM vendas_processadas v
+LEFT JOIN produtos_processados p ON p.ID_Produto = v.ID_Produto
+WHERE v.Mes_Venda = ANY(%(meses)s)
+ON CONFLICT (ID_Venda, Data_Venda) DO UPDATE SET
+    Nome_Produto = EXCLUDED.Nome_Produto,
+    Categoria = EXCLUDED.Categoria,
+    Quantidade_Vendida = EXCLUDED.Quantidade_Vendida,
+    Receita_Total = EXCLUDED.Receita_Total,
+    Margem_Lucro = EXCLUDED.Margem_Lucro,
+    Canal_Venda = EXCLUDED.Canal_Venda,
+    Mes_Venda = EXCLUDED.Mes_Venda,
+    Run_Id = EXCLUDED.Run_Id
+"""
+
+
+def _executores():
+    """Executores configurados no Airflow (core.executor aceita uma lista separada por vírgulas)"""
+    try:
+        from airflow.configuration import conf
+        executor = conf.get('core', 'executor')
+    except ImportError:
+        executor = os.environ.get('AIRFLOW__CORE__EXECUTOR', 'LocalExecutor')
+    return [nome.strip().rsplit('.', 1)[-1] for nome in executor.split(',') if nome.strip()]
+
+
+def resolve_sharding(context):
+    """
+    Lê o critério de particionamento da execução da DAG
+    - Falha já na primeira task se o executor for distribuído e os arquivos
+      intermediários não estiverem em um diretório compartilhado
+    """
+    params = context.get('params') or {}
+    particionar_por = params.get('particionar_por') or None
+    if particionar_por not in PARTICIONAMENTOS:
+        raise ValueError(f"particionar_por inválido: {particionar_por} (esperado um de {PARTICIONAMENTOS})")
+    if particionar_por is not None and 'PIPELINE_INTERMEDIATE_DIR' not in os.environ:
+        distribuidos = [nome for nome in _executores() if nome not in EXECUTORES_LOCAIS]
+        if distribuidos:
+            raise ValueError(
+                f"particionar_por={particionar_por} com {', '.join(distribuidos)} exige "
+                "PIPELINE_INTERMEDIATE_DIR em um volume compartilhado entre os workers"
+            )
+    return particionar_por
+
+
+def _slug(valor):
+    """Normaliza um valor para uso em nome de arquivo (ex.: 'Loja Física' -> 'loja_fisica')"""
+    texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_') or 'vazio'
+
+
+def shard_labels(df, particionar_por):
+    """Retorna, para cada venda, o nome do shard a que ela pertence"""
+    if particionar_por == 'data':
+        return pd.to_datetime(df['Data_Venda']).dt.strftime('%Y_%m').fillna('sem_data')
+    if particionar_por == 'canal':
+        # Slug calculado uma vez por canal distinto (categorias), não por venda
+        canais = df['Canal_Venda'].astype('category')
+        slugs = np.array([_slug(canal) for canal in canais.cat.categories] + ['sem_canal'], dtype=object)
+        return pd.Series(slugs[canais.cat.codes.to_numpy()], index=df.index)
+    raise ValueError(f"particionar_por inválido: {particionar_por}")
+
+
+def shard_dataset(nome, shard):
+    """Nome do dataset intermediário de um shard (o próprio nome se não particionado)"""
+    return nome if shard is None else f"{nome}__{shard}"
+
+
+class ShardWriter:
+    """
+    Grava vendas em um arquivo intermediário por shard, de forma incremental
+    - Sem particionamento, grava tudo em um único dataset
+    - Sem nenhuma venda, grava o shard SHARD_VAZIO (sem registros, com as
+      colunas dos chunks recebidos)
+    - close() retorna os shards gravados, no formato usado pelo expand()
+    """
+
+    def __init__(self, nome, particionar_por=None):
+        self.nome = nome
+        self.particionar_por = particionar_por
+        self.shards = None
+        self._writers = {}
+        self._modelo = None
+
+    def _writer(self, shard):
+        if shard not in self._writers:
+            self._writers[shard] = FrameWriter(shard_dataset(self.nome, shard), modelo=self._modelo)
+        return self._writers[shard]
+
+    def write(self, df):
+        if self._modelo is None:
+            self._modelo = df.iloc[0:0]
+
+        if self.particionar_por is None:
+            self._writer(None).write(df)
+            return
+
+        for shard, grupo in df.groupby(shard_labels(df, self.particionar_por), sort=False):
+            self._writer(shard).write(grupo)
+
+    def close(self):
+        """Fecha os arquivos dos shards (uma única vez) e retorna a lista de shards"""
+        if self.shards is not None:
+            return self.shards
+
+        if self.particionar_por is not None and not self._writers:
+            logging.info(f"Nenhuma venda para particionar: shard {SHARD_VAZIO} sem registros")
+            self._writer(SHARD_VAZIO)
+        for writer in self._writers.values():
+            writer.close()
+
+        if self.particionar_por is None:
+            self.shards = [{'shard': None}]
+        else:
+            shards = sorted(self._writers)
+            logging.info(f"✓ {len(shards)} shard(s) por {self.particionar_por}: {', '.join(shards)}")
+            self.shards = [{'shard': shard} for shard in shards]
+        return self.shards
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def build_relatorio_sql(loader, meses):
+    """Etapa de redução: monta relatorio_vendas no banco para os meses carregados pelos shards"""
+    meses = sorted({mes for mes in meses if mes})
+    if not meses:
+        return 0
+
+    return loader.insert_select('relatorio_vendas', SQL_RELATORIO_MESES, {'meses': meses, 'run_id': loader.run_id})
@@ -0,0 +1,467 @@
+"""
+Resumos diários combináveis (sketches) de vendas
+
+vendas_agregadas (ver aggregates.py) guarda contagens, somas e mínimos/máximos,
+que se combinam em qualquer agrupamento, mas não medianas nem percentis: eles
+exigiriam reler todas as vendas do período. A tabela vendas_sketches guarda,
+por dia de venda, resumos compactos que também se combinam:
+- contagens, somas e mínimo/máximo de Margem_Lucro e Receita_Total (ticket)
+- QuantileSketch de Margem_Lucro e do ticket: quantis com erro relativo de
+  ERRO_RELATIVO, em algumas centenas de contadores por dia
+- HeavyHitters dos produtos (ID_Produto) por quantidade vendida: os TOP_K
+  mais vendidos, com subestimativa de no máximo (quantidade total) / (TOP_K + 1)
+
+Os resumos são gravados na transação da carga, apenas para os dias de venda
+presentes na carga (DELETE/INSERT por Data_Venda):
+- DaySketches acumula os resumos a partir dos chunks que a carga já tem em
+  memória; resumos de shards diferentes se combinam em reduce_shards
+- Quando os chunks não trazem todas as vendas dos dias (modo ELT, ou vários
+  arquivos de origem fora do modo full), refresh_sketches relê do banco
+  apenas esses dias, LOTE_DIAS por consulta
+
+generate_report combina os dias de cada mês (e de todo o período) para
+mediana e p95 de margem e ticket e para o ranking de produtos, sem varrer
+vendas_processadas; os nomes dos produtos do ranking vêm de
+produtos_processados na hora do relatório.
+"""
+
+import json
+import logging
+import math
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Erro relativo dos quantis (1%) e número de produtos mantidos por resumo
+ERRO_RELATIVO = 0.01
+TOP_K = 50
+
+# Valores absolutos menores que isso contam como zero no QuantileSketch
+VALOR_MINIMO = 1e-9
+
+# Dias de venda relidos por consulta em refresh_sketches
+LOTE_DIAS = 31
+
+EPOCA = date(1970, 1, 1)
+
+DDL_SKETCHES = """
+CREATE TABLE IF NOT EXISTS vendas_sketches (
+    Data_Venda DATE PRIMARY KEY,
+    Num_Vendas INTEGER,
+    Total_Quantidade BIGINT,
+    Total_Receita DECIMAL(14,2),
+    Num_Receitas INTEGER,
+    Soma_Margem DECIMAL(14,2),
+    Num_Margens INTEGER,
+    Margem_Minima DECIMAL(10,2),
+    Margem_Maxima DECIMAL(10,2),
+    Sketch_Margem JSONB,
+    Sketch_Ticket JSONB,
+    Top_Produtos JSONB,
+    Data_Atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+COLUNAS_SKETCHES = [
+    'Data_Venda', 'Num_Vendas', 'Total_Quantidade', 'Total_Receita', 'Num_Receitas',
+    'Soma_Margem', 'Num_Margens', 'Margem_Minima', 'Margem_Maxima',
+    'Sketch_Margem', 'Sketch_Ticket', 'Top_Produtos',
+]
+
+# Vendas de um conjunto de dias
+SQL_VENDAS_DIAS = """
+SELECT Data_Venda, ID_Produto, Quantidade_Vendida, Receita_Total, Margem_Lucro
+FROM vendas_processadas
+WHERE Data_Venda = ANY(%s)
+"""
+
+SQL_INSERIR_SKETCHES = (
+    f"INSERT INTO vendas_sketches ({', '.join(COLUNAS_SKETCHES)}) "
+    f"VALUES ({', '.join(['%s'] * len(COLUNAS_SKETCHES))})"
+)
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis com erro relativo garantido (buckets logarítmicos)
+    - Cada valor cai no bucket ceil(log_gamma(|x|)), com gamma = (1 + erro) / (1 - erro)
+    - merge() soma os contadores: o resultado é o mesmo de um sketch único
+    """
+
+    def __init__(self, erro_relativo=ERRO_RELATIVO):
+        self.erro_relativo = erro_relativo
+        self.gamma = (1 + erro_relativo) / (1 - erro_relativo)
+        self.positivos = Counter()
+        self.negativos = Counter()
+        self.zeros = 0
+        self.total = 0
+
+    @classmethod
+    def by_group(cls, chaves, valores, erro_relativo=ERRO_RELATIVO):
+        """
+        Um sketch por chave (ex.: dia de venda), com os buckets de todos os
+        valores calculados de uma vez; nulos são ignorados
+        """
+        gamma = (1 + erro_relativo) / (1 - erro_relativo)
+        codigos, unicas = pd.factorize(np.asarray(chaves))
+        unicas = np.asarray(unicas)
+        sketches = {chave: cls(erro_relativo) for chave in unicas}
+        valores = pd.to_numeric(pd.Series(valores), errors='coerce').astype(float).to_numpy()
+        validos = ~np.isnan(valores) & (codigos >= 0)
+        valores, codigos = valores[validos], codigos[validos]
+        if not len(valores):
+            return sketches
+
+        # Sinal (1, -1 ou 0 para zero) e bucket de cada valor; contagem por (chave, sinal, bucket) em um inteiro
+        sinais = np.where(valores >= VALOR_MINIMO, 1, np.where(valores <= -VALOR_MINIMO, -1, 0))
+        indices = np.ceil(np.log(np.maximum(np.abs(valores), VALOR_MINIMO)) / math.log(gamma)).astype(np.int64)
+        indices[sinais == 0] = 0
+        minimo = int(indices.min())
+        largura = int(indices.max()) - minimo + 1
+        combinados = (codigos.astype(np.int64) * 3 + sinais + 1) * largura + (indices - minimo)
+        grupos, contagens = np.unique(combinados, return_counts=True)
+        chaves_grupo, resto = np.divmod(grupos, 3 * largura)
+        sinais_grupo, indices_grupo = np.divmod(resto, largura)
+        sinais_grupo -= 1
+        indices_grupo += minimo
+
+        cortes = np.flatnonzero(np.diff(chaves_grupo)) + 1
+        for chave, sinais_chave, indices_chave, quantidades in zip(
+                np.split(chaves_grupo, cortes), np.split(sinais_grupo, cortes),
+                np.split(indices_grupo, cortes), np.split(contagens, cortes)):
+            sketch = sketches[unicas[chave[0]]]
+            for sinal, loja in ((1, sketch.positivos), (-1, sketch.negativos)):
+                mascara = sinais_chave == sinal
+                loja.update(dict(zip(indices_chave[mascara].tolist(), quantidades[mascara].tolist())))
+            sketch.zeros = int(quantidades[sinais_chave == 0].sum())
+            sketch.total = int(quantidades.sum())
+        return sketches
+
+    def merge(self, outro):
+        self.positivos.update(outro.positivos)
+        self.negativos.update(outro.negativos)
+        self.zeros += outro.zeros
+        self.total += outro.total
+        return self
+
+    def _valor(self, indice):
+        return 2 * self.gamma ** indice / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Quantil q (0 a 1); None se o sketch estiver vazio"""
+        if self.total == 0:
+            return None
+        posicao = q * (self.total - 1)
+        acumulado = 0
+        for indice in sorted(self.negativos, reverse=True):
+            acumulado += self.negativos[indice]
+            if acumulado > posicao:
+                return -self._valor(indice)
+        acumulado += self.zeros
+        if acumulado > posicao:
+            return 0.0
+        for indice in sorted(self.positivos):
+            acumulado += self.positivos[indice]
+            if acumulado > posicao:
+                return self._valor(indice)
+        return self._valor(max(self.positivos))
+
+    def to_dict(self):
+        return {
+            'erro': self.erro_relativo,
+            'total': self.total,
+            'zeros': self.zeros,
+            'positivos': sorted([int(i), int(n)] for i, n in self.positivos.items()),
+            'negativos': sorted([int(i), int(n)] for i, n in self.negativos.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, dados):
+        sketch = cls(dados['erro'])
+        sketch.total = dados['total']
+        sketch.zeros = dados['zeros']
+        sketch.positivos = Counter({i: n for i, n in dados['positivos']})
+        sketch.negativos = Counter({i: n for i, n in dados['negativos']})
+        return sketch
+
+
+class HeavyHitters:
+    """
+    Itens mais frequentes (ponderados) com no máximo k contadores (Misra-Gries)
+    - Ao passar de k itens, o peso do (k+1)-ésimo é subtraído de todos e os
+      itens zerados saem; cada peso é subestimado em no máximo total / (k + 1)
+    - merge() soma os contadores (de um ou vários resumos) e reduz de novo para k
+    """
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.contadores = Counter()
+        self.total = 0
+
+    def _reduzir(self):
+        if len(self.contadores) <= self.k:
+            return
+        corte = sorted(self.contadores.values(), reverse=True)[self.k]
+        self.contadores = Counter({item: peso - corte for item, peso in self.contadores.items() if peso > corte})
+
+    @classmethod
+    def by_group(cls, chaves, itens, pesos, k=TOP_K):
+        """Um resumo por chave (ex.: dia de venda), com os pesos somados por chave e item de uma vez"""
+        codigos, unicas = pd.factorize(np.asarray(chaves))
+        unicas = np.asarray(unicas)
+        itens, nomes = pd.factorize(np.asarray(itens, dtype=object))
+        # Itens nulos contam como 'nan', como no texto do item
+        nomes = [str(nome) for nome in nomes] + ['nan']
+        itens[itens < 0] = len(nomes) - 1
+        pesos = pd.to_numeric(pd.Series(pesos), errors='coerce').fillna(0).to_numpy(dtype=float)
+        validos = codigos >= 0
+        combinados = codigos[validos].astype(np.int64) * len(nomes) + itens[validos]
+        grupos, inverso = np.unique(combinados, return_inverse=True)
+        somas = np.bincount(inverso, weights=pesos[validos], minlength=len(grupos))
+
+        resumos = {}
+        chaves_grupo = grupos // len(nomes)
+        cortes = np.flatnonzero(np.diff(chaves_grupo)) + 1
+        for grupo, pesos_chave in zip(np.split(grupos, cortes), np.split(somas, cortes)):
+            hitters = cls(k)
+            hitters.contadores = Counter(dict(zip([nomes[item] for item in (grupo % len(nomes)).tolist()],
+                                                  pesos_chave.tolist())))
+            hitters.total = float(pesos_chave.sum())
+            hitters._reduzir()
+            resumos[unicas[grupo[0] // len(nomes)]] = hitters
+        return resumos
+
+    def merge(self, *outros):
+        # Uma única redução ao final: subestima menos que reduzir a cada resumo
+        for outro in outros:
+            self.contadores.update(outro.contadores)
+            self.total += outro.total
+        self._reduzir()
+        return self
+
+    def top(self, n):
+        """Os n itens de maior peso estimado: lista de (item, peso)"""
+        return self.contadores.most_common(n)
+
+    def to_dict(self):
+        return {'k': self.k, 'total': self.total, 'itens': dict(self.contadores)}
+
+    @classmethod
+    def from_dict(cls, dados):
+        hitters = cls(dados['k'])
+        hitters.total = dados['total']
+        hitters.contadores = Counter(dados['itens'])
+        return hitters
+
+
+def _json(valor):
+    """Colunas JSON chegam como dict (JSONB no PostgreSQL) ou como texto (SQLite)"""
+    return json.loads(valor) if isinstance(valor, str) else valor
+
+
+def _numero(valor):
+    """Mínimo/máximo de um resumo gravado (nulo quando o dia não tem margens)"""
+    return np.nan if valor is None or pd.isna(valor) else float(valor)
+
+
+class DaySketches:
+    """
+    Resumos diários acumulados chunk a chunk: as vendas de um dia podem vir em
+    vários chunks (ou shards), e os resumos se combinam
+    - add(): vendas de um chunk (colunas de vendas_processadas, em minúsculas ou não)
+    - add_frame(): resumos já calculados (ex.: de outro shard), com COLUNAS_SKETCHES
+    - frame(): DataFrame com COLUNAS_SKETCHES, sketches serializados em JSON
+    """
+
+    def __init__(self):
+        self.dias = {}
+
+    def _dia(self, dia):
+        if dia not in self.dias:
+            self.dias[dia] = {
+                'Num_Vendas': 0, 'Total_Quantidade': 0, 'Total_Receita': 0.0, 'Num_Receitas': 0,
+                'Soma_Margem': 0.0, 'Num_Margens': 0, 'Margem_Minima': np.nan, 'Margem_Maxima': np.nan,
+                'Sketch_Margem': QuantileSketch(), 'Sketch_Ticket': QuantileSketch(), 'Top_Produtos': HeavyHitters(),
+            }
+        return self.dias[dia]
+
+    def _somar(self, dia, num_vendas, quantidade, receita, num_receitas, margem, num_margens, minima, maxima):
+        resumo = self._dia(dia)
+        resumo['Num_Vendas'] += int(num_vendas)
+        resumo['Total_Quantidade'] += int(quantidade)
+        resumo['Total_Receita'] += float(receita)
+        resumo['Num_Receitas'] += int(num_receitas)
+        resumo['Soma_Margem'] += float(margem)
+        resumo['Num_Margens'] += int(num_margens)
+        resumo['Margem_Minima'] = np.fmin(resumo['Margem_Minima'], float(minima))
+        resumo['Margem_Maxima'] = np.fmax(resumo['Margem_Maxima'], float(maxima))
+        return resumo
+
+    def add(self, df_vendas):
+        df_vendas = df_vendas.rename(columns=str.lower)
+        datas = pd.to_datetime(df_vendas['data_venda'])
+        df_vendas = df_vendas[datas.notna().to_numpy()]
+        if df_vendas.empty:
+            return self
+        # Dias como inteiros (dias desde 1970-01-01): agrupamento mais rápido que com objetos date
+        dias = datas.dropna().to_numpy().astype('datetime64[D]').astype(np.int64)
+        vendas = pd.DataFrame({
+            'dia': dias,
+            'quantidade': pd.to_numeric(df_vendas['quantidade_vendida'], errors='coerce').to_numpy(),
+            'receita': pd.to_numeric(df_vendas['receita_total'], errors='coerce').astype(float).to_numpy(),
+            'margem': pd.to_numeric(df_vendas['margem_lucro'], errors='coerce').astype(float).to_numpy(),
+        })
+        resumo = vendas.groupby('dia').agg(
+            num_vendas=('dia', 'size'),
+            quantidade=('quantidade', 'sum'),
+            receita=('receita', 'sum'),
+            num_receitas=('receita', 'count'),
+            margem=('margem', 'sum'),
+            num_margens=('margem', 'count'),
+            minima=('margem', 'min'),
+            maxima=('margem', 'max'),
+        )
+
+        # Sketches de todos os dias do chunk calculados de uma vez
+        margens = QuantileSketch.by_group(dias, vendas['margem'])
+        tickets = QuantileSketch.by_group(dias, vendas['receita'])
+        produtos = HeavyHitters.by_group(dias, df_vendas['id_produto'], vendas['quantidade'])
+        for dia, *valores in resumo.itertuples(name=None):
+            acumulado = self._somar(EPOCA + timedelta(days=dia), *valores)
+            acumulado['Sketch_Margem'].merge(margens[dia])
+            acumulado['Sketch_Ticket'].merge(tickets[dia])
+            if dia in produtos:
+                acumulado['Top_Produtos'].merge(produtos[dia])
+        return self
+
+    def add_frame(self, df_dias):
+        for linha in df_dias.rename(columns=str.lower).itertuples(index=False):
+            acumulado = self._somar(
+                pd.Timestamp(linha.data_venda).date(), linha.num_vendas, linha.total_quantidade,
+                linha.total_receita, linha.num_receitas, linha.soma_margem, linha.num_margens,
+                _numero(linha.margem_minima), _numero(linha.margem_maxima),
+            )
+            acumulado['Sketch_Margem'].merge(QuantileSketch.from_dict(_json(linha.sketch_margem)))
+            acumulado['Sketch_Ticket'].merge(QuantileSketch.from_dict(_json(linha.sketch_ticket)))
+            acumulado['Top_Produtos'].merge(HeavyHitters.from_dict(_json(linha.top_produtos)))
+        return self
+
+    def frame(self):
+        if not self.dias:
+            return pd.DataFrame(columns=COLUNAS_SKETCHES)
+        linhas = []
+        for dia in sorted(self.dias):
+            resumo = self.dias[dia]
+            linhas.append({
+                **resumo,
+                'Data_Venda': dia,
+                'Sketch_Margem': json.dumps(resumo['Sketch_Margem'].to_dict()),
+                'Sketch_Ticket': json.dumps(resumo['Sketch_Ticket'].to_dict()),
+                'Top_Produtos': json.dumps(resumo['Top_Produtos'].to_dict()),
+            })
+        df_dias = pd.DataFrame(linhas, columns=COLUNAS_SKETCHES)
+        df_dias['Data_Venda'] = pd.to_datetime(df_dias['Data_Venda'])
+        return df_dias.round({'Total_Receita': 2, 'Soma_Margem': 2, 'Margem_Minima': 2, 'Margem_Maxima': 2})
+
+
+def write_sketches(loader, sketches, completo=False):
+    """
+    Grava os resumos acumulados na transação do loader, substituindo apenas os dias presentes
+    - completo: esvazia vendas_sketches antes (modo full)
+    """
+    df_dias = sketches.frame()
+    with loader.cursor() as cursor:
+        if completo:
+            cursor.execute("DELETE FROM vendas_sketches")
+        elif sketches.dias:
+            cursor.execute("DELETE FROM vendas_sketches WHERE Data_Venda = ANY(%s)", (sorted(sketches.dias),))
+        if not df_dias.empty:
+            cursor.executemany(
+                SQL_INSERIR_SKETCHES,
+                list(df_dias.astype(object).where(df_dias.notna(), None).itertuples(index=False, name=None)),
+            )
+    logging.info(f"✓ vendas_sketches: {len(df_dias)} dia(s) recalculados")
+    return len(df_dias)
+
+
+def refresh_sketches(loader, dias, completo=False):
+    """
+    Recalcula os resumos dos dias informados relendo as vendas do banco (na transação do loader)
+    - Para cargas em que os chunks não trazem todas as vendas desses dias
+    """
+    dias = sorted({pd.Timestamp(dia).date() for dia in dias if dia is not None and pd.notna(dia)})
+    sketches = DaySketches()
+    with loader.cursor() as cursor:
+        for inicio in range(0, len(dias), LOTE_DIAS):
+            cursor.execute(SQL_VENDAS_DIAS, (dias[inicio:inicio + LOTE_DIAS],))
+            colunas = [descricao[0] for descricao in cursor.description]
+            sketches.add(pd.DataFrame.from_records(cursor.fetchall(), columns=colunas))
+    return write_sketches(loader, sketches, completo)
+
+
+def merge_sketches(df_dias, percentis=(0.5, 0.95)):
+    """
+    Combina os resumos diários por mês e no período inteiro
+    Retorna um DataFrame com uma linha por mês e uma linha 'Total': vendas,
+    receita, ticket (médio e percentis) e margem (média, mínima, máxima e percentis).
+    """
+    df_dias = df_dias.rename(columns=str.lower)
+    grupos = {'Total': df_dias}
+    if not df_dias.empty:
+        meses = df_dias['data_venda'].astype(str).str[:7]
+        grupos = {**{mes: dias for mes, dias in df_dias.groupby(meses, sort=True)}, 'Total': df_dias}
+
+    linhas = []
+    for periodo, dias in grupos.items():
+        margem = QuantileSketch()
+        ticket = QuantileSketch()
+        for valor in dias['sketch_margem']:
+            margem.merge(QuantileSketch.from_dict(_json(valor)))
+        for valor in dias['sketch_ticket']:
+            ticket.merge(QuantileSketch.from_dict(_json(valor)))
+        num_receitas = pd.to_numeric(dias['num_receitas']).sum()
+        num_margens = pd.to_numeric(dias['num_margens']).sum()
+        linha = {
+            'periodo': periodo,
+            'num_vendas': int(pd.to_numeric(dias['num_vendas']).sum()),
+            'total_receita': round(float(pd.to_numeric(dias['total_receita']).sum()), 2),
+            'ticket_medio': round(float(pd.to_numeric(dias['total_receita']).sum()) / num_receitas, 2)
+                            if num_receitas else None,
+            'margem_media': round(float(pd.to_numeric(dias['soma_margem']).sum()) / num_margens, 2)
+                            if num_margens else None,
+            'margem_minima': pd.to_numeric(dias['margem_minima']).min(),
+            'margem_maxima': pd.to_numeric(dias['margem_maxima']).max(),
+        }
+        for q in percentis:
+            sufixo = 'mediana' if q == 0.5 else f"p{round(q * 100)}"
+            for nome, sketch in (('ticket', ticket), ('margem', margem)):
+                valor = sketch.quantile(q)
+                linha[f"{nome}_{sufixo}"] = None if valor is None else round(valor, 2)
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+
+def period_summary(df_distribuicao, periodo='Total'):
+    """Linha de um período de merge_sketches() como dict (nulos como None, para o XCom)"""
+    linha = df_distribuicao[df_distribuicao['periodo'] == periodo].iloc[0]
+    return {coluna: None if pd.isna(valor) else (valor if isinstance(valor, str) else float(valor))
+            for coluna, valor in linha.items()}
+
+
+def top_products(df_dias, df_produtos=None, n=10):
+    """
+    Os n produtos mais vendidos (quantidade estimada) combinando os resumos diários
+    - df_produtos: ID_Produto e Nome_Produto atuais (sem nome, o item aparece como está no resumo)
+    """
+    hitters = HeavyHitters().merge(*[HeavyHitters.from_dict(_json(valor))
+                                     for valor in df_dias.rename(columns=str.lower)['top_produtos']])
+    nomes = {}
+    if df_produtos is not None:
+        df_produtos = df_produtos.rename(columns=str.lower)
+        nomes = dict(zip(df_produtos['id_produto'].astype(str), df_produtos['nome_produto']))
+    return pd.DataFrame(
+        [(item, nomes.get(item, item), quantidade) for item, quantidade in hitters.top(n)],
+        columns=['id_produto', 'nome_produto', 'quantidade_estimada'],
+    )
@@ -0,0 +1,106 @@
+"""
+Modo streaming para vendas
+
+Processa arquivos de vendas maiores que a memória do worker em chunks de
+tamanho fixo. Cada chunk passa pela mesma transformação do modo completo
+(preenchimento de Preco_Venda, Receita_Total, Margem_Lucro e Mes_Venda)
+usando a dimensão de produtos em memória (ver dimension_cache.py), e é gravado de forma
+incremental no arquivo intermediário. O pico de memória é limitado pelo
+tamanho do chunk, configurável por execução da DAG.
+"""
+
+import logging
+import os
+
+import pandas as pd
+
+from imputation import REGRAS_VENDAS, impute
+from instrumentation import record_read
+from schema_registry import apply_schema
+
+CHUNK_SIZE_PADRAO = 100_000
+
+
+def resolve_streaming_params(context, chunk_size_padrao=CHUNK_SIZE_PADRAO):
+    """
+    Lê os parâmetros de streaming da execução da DAG
+    - modo_streaming: ativa o processamento em chunks
+    - chunk_size: número de registros por chunk
+    """
+    params = context.get('params') or {}
+    modo_streaming = bool(params.get('modo_streaming', False))
+    chunk_size = int(params.get('chunk_size') or chunk_size_padrao)
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size inválido: {chunk_size}")
+    return modo_streaming, chunk_size
+
+
+def read_csv(caminho, **read_csv_kwargs):
+    """Lê um arquivo CSV de origem inteiro, contabilizando a leitura"""
+    df = pd.read_csv(caminho, **read_csv_kwargs)
+    record_read(len(df), os.path.getsize(caminho))
+    return df
+
+
+def iter_csv_chunks(caminho, chunk_size, **read_csv_kwargs):
+    """Gera chunks de até chunk_size registros de um arquivo CSV"""
+    record_read(0, os.path.getsize(caminho))
+    with pd.read_csv(caminho, chunksize=chunk_size, **read_csv_kwargs) as leitor:
+        for chunk in leitor:
+            record_read(len(chunk))
+            yield chunk
+
+
+def transform_vendas_chunk(df_vendas, dimensao, regras=REGRAS_VENDAS):
+    """
+    Aplica as transformações de vendas a um chunk
+    - Preenche nulos conforme as regras de imputação (Preco_Venda = Preco_Custo * 1.3)
+    - Calcula Receita_Total e Margem_Lucro
+    - Cria o campo Mes_Venda a partir de Data_Venda
+    Retorna o chunk transformado e o número de valores preenchidos.
+    """
+    # Preco_Custo temporário, obtido da dimensão de produtos
+    df_vendas['Preco_Custo'] = dimensao.lookup(df_vendas['ID_Produto'], 'Preco_Custo')
+    df_vendas, preenchidos = impute(df_vendas, regras, verbose=False)
+
+    df_vendas['Receita_Total'] = df_vendas['Quantidade_Vendida'] * df_vendas['Preco_Venda']
+    df_vendas['Margem_Lucro'] = df_vendas['Preco_Venda'] - df_vendas['Preco_Custo']
+
+    df_vendas['Data_Venda'] = pd.to_datetime(df_vendas['Data_Venda'])
+    # Mes_Venda categórico: strftime apenas nos meses distintos
+    meses = pd.Categorical(df_vendas['Data_Venda'].to_numpy().astype('datetime64[M]'))
+    df_vendas['Mes_Venda'] = meses.rename_categories(meses.categories.strftime('%Y-%m'))
+
+    # Tipos do registro (categorias, Int32, decimais na escala do banco) preservados na saída
+    df_vendas = apply_schema(df_vendas.drop(columns=['Preco_Custo']), 'vendas_transformadas')
+    return df_vendas, sum(preenchidos.values())
+
+
+def stream_transform_vendas(chunks, dimensao, writer, regras=REGRAS_VENDAS):
+    """
+    Transforma um gerador de chunks de vendas gravando cada um no writer
+    - Mantém apenas um chunk em memória por vez
+    - Acumula as métricas do resumo da transformação
+    """
+    resumo = {
+        'vendas_processadas': 0,
+        'precos_preenchidos': 0,
+        'receita_total': 0.0,
+        'soma_margem': 0.0,
+        'margens_validas': 0,
+        'chunks': 0,
+    }
+
+    for chunk in chunks:
+        chunk, preenchidos = transform_vendas_chunk(chunk, dimensao, regras)
+        writer.write(chunk)
+
+        resumo['vendas_processadas'] += len(chunk)
+        resumo['precos_preenchidos'] += preenchidos
+        resumo['receita_total'] += float(chunk['Receita_Total'].sum())
+        resumo['soma_margem'] += float(chunk['Margem_Lucro'].sum())
+        resumo['margens_validas'] += int(chunk['Margem_Lucro'].notna().sum())
+        resumo['chunks'] += 1
+        logging.info(f"✓ Chunk {resumo['chunks']} transformado: {len(chunk)} vendas")
+
+    return resumo
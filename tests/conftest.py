@@ -0,0 +1,91 @@
+"""
+Configuração dos testes
+
+Os módulos de plugins/ são importados como no Airflow (plugins/ no
+sys.path); os datasets intermediários vão para um diretório temporário por
+teste. Os testes de carga e schema usam um PostgreSQL local (pgserver) e são
+pulados quando o pacote não está instalado.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plugins'))
+
+import intermediate_storage  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def diretorio_intermediario(tmp_path, monkeypatch):
+    """Diretório intermediário padrão isolado por teste"""
+    monkeypatch.setattr(intermediate_storage, 'DIRETORIO_PADRAO', str(tmp_path))
+    return tmp_path
+
+
+class HookTeste:
+    """Subconjunto do PostgresHook usado pelo pipeline, sobre uma URI do psycopg2"""
+
+    def __init__(self, uri):
+        self.uri = uri
+
+    def get_conn(self):
+        import psycopg2
+
+        return psycopg2.connect(self.uri)
+
+    def get_sqlalchemy_engine(self, engine_kwargs=None):
+        import sqlalchemy
+
+        return sqlalchemy.create_engine(self.uri, **(engine_kwargs or {}))
+
+    def run(self, sql, parameters=None):
+        conn = self.get_conn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, parameters)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_records(self, sql, parameters=None):
+        conn = self.get_conn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, parameters)
+                return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def get_first(self, sql, parameters=None):
+        registros = self.get_records(sql, parameters)
+        return registros[0] if registros else None
+
+    def get_pandas_df(self, sql, parameters=None):
+        conn = self.get_conn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, parameters)
+                return pd.DataFrame(cursor.fetchall(), columns=[coluna[0] for coluna in cursor.description])
+        finally:
+            conn.close()
+
+
+@pytest.fixture(scope='session')
+def servidor_postgres(tmp_path_factory):
+    """PostgreSQL local (pgserver) para os testes de carga e schema; pulados sem o pacote"""
+    pgserver = pytest.importorskip('pgserver')
+    pytest.importorskip('psycopg2')
+    servidor = pgserver.get_server(str(tmp_path_factory.mktemp('pgdata')), cleanup_mode='stop')
+    yield servidor.get_uri()
+    servidor.cleanup()
+
+
+@pytest.fixture
+def postgres_hook(servidor_postgres):
+    """Hook com o schema public vazio"""
+    hook = HookTeste(servidor_postgres)
+    hook.run("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    return hook
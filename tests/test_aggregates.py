@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from bulk_loader import BulkLoader
+from aggregates import refresh_aggregates
+from schema_manager import create_partitions, ensure_schema, partition_months
+
+import pandas as pd
+
+VENDAS = """
+INSERT INTO produtos_processados (ID_Produto, Nome_Produto, Categoria) VALUES
+    ('P1', 'Notebook', 'Eletrônicos'), ('P2', 'Mouse', 'Acessórios');
+INSERT INTO vendas_processadas (ID_Venda, ID_Produto, Quantidade_Vendida, Data_Venda, Canal_Venda,
+                                Receita_Total, Margem_Lucro, Mes_Venda) VALUES
+    ('V1', 'P1', 1, '2024-01-15', 'Online', 3200, 700, '2024-01'),
+    ('V2', 'P2', 2, '2024-01-16', 'Online', 110, 9.5, '2024-01'),
+    ('V3', 'P2', 1, '2024-01-20', 'Online', NULL, 9.5, '2024-01'),
+    ('V4', 'P2', 3, '2024-02-01', 'Loja', 165, 10.5, '2024-02');
+"""
+
+
+def _agregados(postgres_hook):
+    return postgres_hook.get_records(
+        "SELECT Mes_Venda, ID_Produto, Nome_Produto, Num_Vendas, Total_Quantidade, Total_Receita, Num_Receitas "
+        "FROM vendas_agregadas ORDER BY Mes_Venda, ID_Produto"
+    )
+
+
+def _preparar(postgres_hook):
+    ensure_schema(postgres_hook)
+    create_partitions(postgres_hook, partition_months(pd.Series(['2024-01-01', '2024-02-01'])))
+    postgres_hook.run(VENDAS)
+    with BulkLoader(postgres_hook) as loader:
+        refresh_aggregates(loader)
+
+
+def test_refresh_aggregates_completo(postgres_hook):
+    _preparar(postgres_hook)
+
+    assert _agregados(postgres_hook) == [
+        ('2024-01', 'P1', 'Notebook', 1, 1, Decimal('3200.00'), 1),
+        ('2024-01', 'P2', 'Mouse', 2, 3, Decimal('110.00'), 1),
+        ('2024-02', 'P2', 'Mouse', 1, 3, Decimal('165.00'), 1),
+    ]
+
+
+def test_refresh_aggregates_recalcula_apenas_os_meses_afetados(postgres_hook):
+    _preparar(postgres_hook)
+    postgres_hook.run(
+        "UPDATE vendas_processadas SET Quantidade_Vendida = 10 WHERE Mes_Venda IN ('2024-01', '2024-02');"
+        "UPDATE produtos_processados SET Nome_Produto = 'Mouse sem fio' WHERE ID_Produto = 'P2'"
+    )
+
+    with BulkLoader(postgres_hook) as loader:
+        refresh_aggregates(loader, ['2024-02'])
+
+    # Janeiro mantém as somas antigas, mas recebe o nome atual do produto
+    assert _agregados(postgres_hook) == [
+        ('2024-01', 'P1', 'Notebook', 1, 1, Decimal('3200.00'), 1),
+        ('2024-01', 'P2', 'Mouse sem fio', 2, 3, Decimal('110.00'), 1),
+        ('2024-02', 'P2', 'Mouse sem fio', 1, 10, Decimal('165.00'), 1),
+    ]
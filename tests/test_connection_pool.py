@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+pytest.importorskip('airflow.providers.postgres.hooks.postgres')
+
+import connection_pool  # noqa: E402
+from connection_pool import get_engine, get_hook, run_queries  # noqa: E402
+
+
+@pytest.fixture
+def conn_id(postgres_hook, monkeypatch):
+    """Conexão do Airflow definida por variável de ambiente, com engines novos por teste"""
+    uri = urlsplit(postgres_hook.uri)
+    monkeypatch.setenv('AIRFLOW_CONN_PIPELINE_TESTE', json.dumps({
+        'conn_type': 'postgres',
+        'host': parse_qs(uri.query).get('host', [uri.hostname])[0],
+        'port': uri.port,
+        'login': uri.username,
+        'password': uri.password,
+        'schema': uri.path.lstrip('/'),
+    }))
+    monkeypatch.setattr(connection_pool, '_engines', {})
+    yield 'pipeline_teste'
+    for engine in connection_pool._engines.values():
+        engine.dispose()
+
+
+def _pid_backend(hook):
+    conexao = hook.get_conn()
+    try:
+        with conexao.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            return cursor.fetchone()[0]
+    finally:
+        conexao.close()
+
+
+def test_engine_unico_por_conn_id(conn_id):
+    assert get_engine(conn_id) is get_engine(conn_id)
+    assert get_hook(conn_id).get_sqlalchemy_engine() is get_engine(conn_id)
+
+
+def test_close_devolve_a_conexao_ao_pool(conn_id):
+    hook = get_hook(conn_id)
+
+    assert _pid_backend(hook) == _pid_backend(get_hook(conn_id))
+    assert get_engine(conn_id).pool.checkedout() == 0
+
+
+def test_conexao_devolvida_sem_autocommit(conn_id):
+    hook = get_hook(conn_id)
+    conexao = hook.get_conn()
+    conexao.autocommit = True
+    conexao.close()
+
+    conexao = hook.get_conn()
+    try:
+        assert conexao.autocommit is False
+    finally:
+        conexao.close()
+
+
+def test_get_pandas_df(conn_id):
+    df = get_hook(conn_id).get_pandas_df("SELECT %(valor)s::int AS valor", parameters={'valor': 7})
+
+    assert df['valor'].tolist() == [7]
+
+
+def test_processo_filho_descarta_engines_herdados(conn_id):
+    get_engine(conn_id)
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if not connection_pool._engines else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.WEXITSTATUS(status) == 0
+    assert _pid_backend(get_hook(conn_id))
+
+
+def test_run_queries_em_paralelo(conn_id):
+    consultas = {nome: f"SELECT '{nome}' AS nome, pg_sleep(0.3)" for nome in ('categoria', 'canal', 'resumo')}
+
+    inicio = time.perf_counter()
+    resultados, latencias = run_queries(get_hook(conn_id), consultas, max_workers=3)
+    total = time.perf_counter() - inicio
+
+    assert {nome: df['nome'].tolist() for nome, df in resultados.items()} == {nome: [nome] for nome in consultas}
+    assert all(latencia >= 0.3 for latencia in latencias.values())
+    # Tempo total próximo ao da consulta mais lenta, não à soma das latências
+    assert total < sum(latencias.values())
+
+
+def test_run_queries_propaga_erro(conn_id):
+    with pytest.raises(Exception):
+        run_queries(get_hook(conn_id), {'ok': "SELECT 1", 'erro': "SELECT * FROM tabela_inexistente"})
@@ -0,0 +1,126 @@
+import pandas as pd
+import pytest
+
+from data_quality import COLUNA_MOTIVO, LIMITE_INTEIRO, DataQuality
+from intermediate_storage import frame_exists, load_frame
+
+REGRAS = [
+    {'tipo': 'schema', 'colunas': {'Quantidade_Vendida': 'inteiro', 'Preco_Venda': 'numero',
+                                   'Data_Venda': 'data'}, 'acao': 'quarentena'},
+    {'tipo': 'obrigatorio', 'colunas': ['ID_Venda'], 'acao': 'quarentena'},
+    {'tipo': 'unico', 'colunas': ['ID_Venda']},
+    {'tipo': 'intervalo', 'coluna': 'Preco_Venda', 'minimo': 0, 'acao': 'quarentena'},
+    {'tipo': 'referencia', 'coluna': 'ID_Produto', 'referencia': 'produtos', 'acao': 'quarentena'},
+    {'tipo': 'nulos', 'coluna': 'Preco_Venda', 'taxa_maxima': 0.5},
+]
+
+
+def _vendas(linhas):
+    return pd.DataFrame(linhas, columns=['ID_Venda', 'ID_Produto', 'Quantidade_Vendida', 'Preco_Venda', 'Data_Venda'])
+
+
+def _falhas(qualidade):
+    return dict(zip(qualidade.results()['Regra'], qualidade.results()['Falhas']))
+
+
+def test_check_separa_reprovados_com_motivo():
+    df = _vendas([
+        ['V1', 'P1', '2', '10.5', '2024-01-10'],
+        ['V2', 'P1', 'dois', '10.0', '2024-01-10'],
+        [None, 'P1', '1', '5.0', '2024-01-11'],
+        ['V4', 'P9', '1', '5.0', '2024-01-11'],
+        ['V5', 'P1', '1', '-1', '2024-01-12'],
+        ['V6', 'P1', '1', None, '2024-02-30'],
+    ])
+
+    with DataQuality('vendas', REGRAS, referencias={'produtos': ['P1']}) as qualidade:
+        aprovados = qualidade.check(df)
+
+    assert aprovados['ID_Venda'].tolist() == ['V1']
+    assert aprovados['Quantidade_Vendida'].tolist() == [2]
+    assert aprovados['Preco_Venda'].tolist() == [10.5]
+    assert qualidade.quarentena == 5
+
+    quarentena = load_frame('quarentena_vendas')
+    assert dict(zip(quarentena['ID_Venda'].fillna('<nulo>'), quarentena[COLUNA_MOTIVO])) == {
+        'V2': 'schema:Quantidade_Vendida+Preco_Venda+Data_Venda',
+        '<nulo>': 'obrigatorio:ID_Venda',
+        'V4': 'referencia:ID_Produto',
+        'V5': 'intervalo:Preco_Venda',
+        'V6': 'schema:Quantidade_Vendida+Preco_Venda+Data_Venda',
+    }
+    # Valores como vieram da origem
+    assert quarentena.loc[quarentena['ID_Venda'] == 'V2', 'Quantidade_Vendida'].tolist() == ['dois']
+
+
+def test_results_conta_falhas_por_regra():
+    df = _vendas([
+        ['V1', 'P1', '1', '1.0', '2024-01-01'],
+        ['V2', 'P2', '1', None, '2024-01-01'],
+        ['V3', 'P1', '1', None, '2024-01-01'],
+    ])
+
+    with DataQuality('vendas', REGRAS, referencias={'produtos': ['P1']}) as qualidade:
+        qualidade.check(df)
+    resultados = qualidade.results().set_index('Regra')
+
+    assert resultados.loc['referencia:ID_Produto', 'Falhas'] == 1
+    assert resultados.loc['referencia:ID_Produto', 'Status'] == 'falha'
+    assert resultados.loc['nulos:Preco_Venda', 'Falhas'] == 2
+    assert resultados.loc['nulos:Preco_Venda', 'Taxa'] == pytest.approx(0.6667)
+    assert resultados.loc['nulos:Preco_Venda', 'Status'] == 'falha'
+    assert resultados.loc['obrigatorio:ID_Venda', 'Status'] == 'ok'
+    assert (resultados['Registros'] == 3).all()
+    assert qualidade.null_counts() == {'Preco_Venda': 2}
+
+
+def test_unico_entre_chunks():
+    regras = [{'tipo': 'unico', 'colunas': ['ID_Venda']}]
+    chunks = [pd.DataFrame({'ID_Venda': ['V1', 'V2', 'V1']}), pd.DataFrame({'ID_Venda': ['V3', 'V2', 'V2']})]
+
+    with DataQuality('vendas', regras) as qualidade:
+        aprovados = [qualidade.check(chunk) for chunk in chunks]
+
+    # Apenas alerta: nenhum registro sai do chunk
+    assert [len(chunk) for chunk in aprovados] == [3, 3]
+    assert _falhas(qualidade) == {'unico:ID_Venda': 3}
+
+
+def test_inteiro_fora_do_int32():
+    regras = [{'tipo': 'schema', 'colunas': {'Quantidade_Vendida': 'inteiro'}, 'acao': 'quarentena'}]
+    df = pd.DataFrame({'Quantidade_Vendida': ['1', str(LIMITE_INTEIRO), str(LIMITE_INTEIRO + 1), '2.5']})
+
+    with DataQuality('vendas', regras) as qualidade:
+        aprovados = qualidade.check(df)
+
+    assert aprovados['Quantidade_Vendida'].tolist() == [1, LIMITE_INTEIRO]
+    assert qualidade.quarentena == 2
+
+
+def test_report_levanta_erro_em_regra_de_erro():
+    regras = [{'tipo': 'obrigatorio', 'colunas': ['ID_Venda'], 'acao': 'erro'}]
+
+    with DataQuality('vendas', regras) as qualidade:
+        qualidade.check(pd.DataFrame({'ID_Venda': ['V1', None]}))
+
+    with pytest.raises(ValueError, match='obrigatorio:ID_Venda'):
+        qualidade.report()
+
+
+def test_close_remove_quarentena_anterior_sem_reprovados():
+    regras = [{'tipo': 'obrigatorio', 'colunas': ['ID_Venda'], 'acao': 'quarentena'}]
+
+    with DataQuality('vendas', regras) as qualidade:
+        qualidade.check(pd.DataFrame({'ID_Venda': [None]}))
+    assert frame_exists('quarentena_vendas')
+
+    with DataQuality('vendas', regras) as qualidade:
+        qualidade.check(pd.DataFrame({'ID_Venda': ['V1']}))
+    assert not frame_exists('quarentena_vendas')
+
+
+def test_regras_invalidas():
+    with pytest.raises(ValueError):
+        DataQuality('vendas', [{'tipo': 'obrigatorio', 'colunas': ['ID_Venda'], 'acao': 'ignorar'}])
+    with pytest.raises(ValueError):
+        DataQuality('vendas', [{'tipo': 'referencia', 'coluna': 'ID_Produto', 'referencia': 'produtos'}])
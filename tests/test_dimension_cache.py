@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from dimension_cache import ProductDimension, dimension_key
+from intermediate_storage import frame_exists
+
+
+def _produtos():
+    return pd.DataFrame({
+        'ID_Produto': ['P1', 'P2', 'P3', 'P1'],
+        'Nome_Produto': ['Notebook', 'Mouse', 'Teclado', 'Notebook duplicado'],
+        'Categoria': pd.Categorical(['Eletrônicos', 'Acessórios', 'Acessórios', 'Eletrônicos']),
+        'Preco_Custo': [3000.0, 50.0, 80.0, 1.0],
+    })
+
+
+def test_lookup_com_ids_ausentes():
+    dimensao = ProductDimension(_produtos())
+    ids = pd.Series(['P2', 'P9', 'P1', None])
+
+    custos = dimensao.lookup(ids, 'Preco_Custo')
+    nomes = dimensao.lookup(ids, 'Nome_Produto')
+    categorias = dimensao.lookup(ids, 'Categoria')
+
+    assert len(dimensao) == 3
+    np.testing.assert_array_equal(custos, [50.0, np.nan, 3000.0, np.nan])
+    assert list(nomes) == ['Mouse', None, 'Notebook', None]
+    assert isinstance(categorias, pd.Categorical)
+    assert list(categorias.astype(object)) == ['Acessórios', np.nan, 'Eletrônicos', np.nan]
+
+
+def test_lookup_com_ids_categoricos():
+    dimensao = ProductDimension(_produtos())
+    ids = pd.Series(['P3', 'P9', 'P3', 'P2'], dtype='category')
+
+    assert list(dimensao.positions(ids)) == [2, -1, 2, 1]
+    np.testing.assert_array_equal(dimensao.lookup(ids, 'Preco_Custo'), [80.0, np.nan, 80.0, 50.0])
+
+
+def test_take_mantem_o_indice():
+    ids = pd.Series(['P1', 'P3'], index=[10, 20])
+
+    df = ProductDimension(_produtos()).take(ids, ['Nome_Produto', 'Preco_Custo'])
+
+    assert df.index.tolist() == [10, 20]
+    assert df['Nome_Produto'].tolist() == ['Notebook', 'Teclado']
+
+
+def test_dimension_key_muda_com_origem_ou_regras():
+    chave = dimension_key('abc', {'Preco_Custo': 'media_categoria'})
+
+    assert dimension_key('abc', {'Preco_Custo': 'media_categoria'}) == chave
+    assert dimension_key('abd', {'Preco_Custo': 'media_categoria'}) != chave
+    assert dimension_key('abc', {'Preco_Custo': 'mediana'}) != chave
+
+
+def test_save_load_remove_versoes_anteriores():
+    assert ProductDimension.load('chave1') is None
+    ProductDimension(_produtos()).save('chave1')
+
+    ProductDimension(_produtos()).save('chave2')
+    dimensao = ProductDimension.load('chave2')
+
+    assert not frame_exists('dimensao_produtos_chave1')
+    assert dimensao.lookup(pd.Series(['P2']), 'Nome_Produto').tolist() == ['Mouse']
@@ -0,0 +1,76 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from bulk_loader import BulkLoader
+from elt import (
+    STAGING_PRODUTOS,
+    STAGING_VENDAS,
+    resolve_execution_mode,
+    stage_csv,
+    staged_months,
+    transform_produtos_sql,
+    transform_vendas_sql,
+)
+from schema_manager import create_partitions, ensure_schema
+
+PRODUTOS = """ID_Produto,Nome_Produto,Categoria,Preco_Custo,Fornecedor,Status
+P001,Notebook,Eletrônicos,2500.00,Dell,Ativo
+P002,Mouse,Acessórios,40.00,,Ativo
+P003,Teclado,Acessórios,,Razer,Inativo
+P004,Monitor 24",Eletrônicos,800.00,Samsung,Ativo
+"""
+
+VENDAS = """ID_Venda,ID_Produto,Quantidade_Vendida,Preco_Venda,Data_Venda,Canal_Venda
+V001,P001,2,3200.00,2024-01-15,Online
+V002,P003,1,,2024-02-03,Loja Física
+V003,P002,dois,55.00,2024-02-04,Online
+V004,P002,1,55.00,data inválida,Online
+V005,P004,1,950.00,2023-12-31,Online
+"""
+
+
+def test_resolve_execution_mode():
+    assert resolve_execution_mode({}) == 'etl'
+    assert resolve_execution_mode({'params': {'modo_execucao': 'elt'}}) == 'elt'
+    with pytest.raises(ValueError):
+        resolve_execution_mode({'params': {'modo_execucao': 'sql'}})
+
+
+def test_transformacao_em_sql(postgres_hook, tmp_path):
+    (tmp_path / 'produtos.csv').write_text(PRODUTOS, encoding='utf-8')
+    (tmp_path / 'vendas.csv').write_text(VENDAS, encoding='utf-8')
+    ensure_schema(postgres_hook)
+    janela = {'modo': 'incremental', 'inicio': date(2024, 1, 1), 'fim': None}
+
+    with BulkLoader(postgres_hook) as loader:
+        assert stage_csv(loader, STAGING_PRODUTOS, str(tmp_path / 'produtos.csv')) == 4
+        assert stage_csv(loader, STAGING_VENDAS, [str(tmp_path / 'vendas.csv')]) == 5
+    create_partitions(postgres_hook, staged_months(postgres_hook, janela))
+
+    with BulkLoader(postgres_hook, run_id='manual__1') as loader:
+        assert transform_produtos_sql(loader) == 4
+        registros, meses, dias, marca = transform_vendas_sql(loader, janela)
+
+    # Preco_Custo pela média da categoria e Fornecedor padrão
+    assert postgres_hook.get_records(
+        "SELECT ID_Produto, Nome_Produto, Preco_Custo, Fornecedor FROM produtos_processados "
+        "WHERE ID_Produto IN ('P002', 'P003', 'P004') ORDER BY ID_Produto"
+    ) == [
+        ('P002', 'Mouse', Decimal('40.00'), 'Não Informado'),
+        ('P003', 'Teclado', Decimal('40.00'), 'Razer'),
+        ('P004', 'Monitor 24"', Decimal('800.00'), 'Samsung'),
+    ]
+    # Apenas vendas na janela e com data válida; valores inválidos viram nulo em vez de abortar a carga
+    assert (registros, meses, dias, marca) == (
+        3, ['2024-01', '2024-02'], [date(2024, 1, 15), date(2024, 2, 3), date(2024, 2, 4)], date(2024, 2, 4)
+    )
+    assert postgres_hook.get_records(
+        "SELECT ID_Venda, Quantidade_Vendida, Preco_Venda, Receita_Total, Margem_Lucro, Mes_Venda, Run_Id "
+        "FROM vendas_processadas ORDER BY ID_Venda"
+    ) == [
+        ('V001', 2, Decimal('3200.00'), Decimal('6400.00'), Decimal('700.00'), '2024-01', 'manual__1'),
+        ('V002', 1, Decimal('52.00'), Decimal('52.00'), Decimal('12.00'), '2024-02', 'manual__1'),
+        ('V003', None, Decimal('55.00'), None, Decimal('15.00'), '2024-02', 'manual__1'),
+    ]
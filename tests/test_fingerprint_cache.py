@@ -0,0 +1,93 @@
+import hashlib
+import os
+
+import pytest
+
+from bulk_loader import BulkLoader
+from fingerprint_cache import (
+    DDL_FINGERPRINTS,
+    check_source,
+    content_hash,
+    file_fingerprint,
+    invalidate_fingerprints,
+    resolve_cache_enabled,
+    save_fingerprint,
+)
+
+PIPELINE = 'pipeline_teste'
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    caminho = tmp_path / 'vendas.csv'
+    caminho.write_text('ID_Venda,Quantidade\nV1,2\nV2,3\n')
+    return str(caminho)
+
+
+def test_content_hash_em_blocos(arquivo):
+    with open(arquivo, 'rb') as entrada:
+        esperado = hashlib.sha256(entrada.read()).hexdigest()
+
+    assert content_hash(arquivo, bloco=4) == esperado
+
+
+def test_file_fingerprint_reaproveita_hash_com_tamanho_e_mtime_iguais(arquivo):
+    anterior = file_fingerprint(arquivo)
+
+    # Caminho rápido: o hash gravado é reaproveitado sem reler o arquivo
+    assert file_fingerprint(arquivo, {**anterior, 'hash': 'gravado'})['hash'] == 'gravado'
+
+    os.utime(arquivo, ns=(anterior['mtime_ns'] + 10**9, anterior['mtime_ns'] + 10**9))
+    assert file_fingerprint(arquivo, {**anterior, 'hash': 'gravado'})['hash'] == anterior['hash']
+
+
+def test_resolve_cache_enabled():
+    assert resolve_cache_enabled({})
+    assert not resolve_cache_enabled({'params': {'modo_carga': 'full'}})
+    assert not resolve_cache_enabled({'params': {'forcar_reprocessamento': True}})
+
+
+def _gravar(postgres_hook, fingerprint, resultado):
+    with BulkLoader(postgres_hook) as loader:
+        save_fingerprint(loader, PIPELINE, {**fingerprint, 'resultado': resultado})
+
+
+def test_check_source_detecta_arquivo_inalterado(postgres_hook, arquivo):
+    postgres_hook.run(DDL_FINGERPRINTS)
+    inalterado, fingerprint, _ = check_source({}, postgres_hook, PIPELINE, arquivo, {'particionar_por': None})
+    assert not inalterado
+    _gravar(postgres_hook, fingerprint, {'registros': 2})
+
+    inalterado, _, resultado = check_source({}, postgres_hook, PIPELINE, arquivo, {'particionar_por': None})
+
+    assert inalterado
+    assert resultado == {'registros': 2}
+    # Parâmetros de extração diferentes invalidam o cache
+    assert not check_source({}, postgres_hook, PIPELINE, arquivo, {'particionar_por': 'data'})[0]
+    assert not check_source({'params': {'forcar_reprocessamento': True}}, postgres_hook, PIPELINE, arquivo)[0]
+
+
+def test_check_source_hash_diferente(postgres_hook, arquivo):
+    postgres_hook.run(DDL_FINGERPRINTS)
+    _gravar(postgres_hook, check_source({}, postgres_hook, PIPELINE, arquivo)[1], {})
+    estado = os.stat(arquivo)
+
+    # Mesmo tamanho e conteúdo diferente, com mtime alterado
+    with open(arquivo, 'w') as saida:
+        saida.write('ID_Venda,Quantidade\nV1,2\nV2,4\n')
+    os.utime(arquivo, ns=(estado.st_mtime_ns + 10**9, estado.st_mtime_ns + 10**9))
+
+    inalterado, fingerprint, resultado = check_source({}, postgres_hook, PIPELINE, arquivo)
+
+    assert not inalterado
+    assert resultado is None
+    assert fingerprint['hash'] == content_hash(arquivo)
+
+
+def test_invalidate_fingerprints(postgres_hook, arquivo):
+    postgres_hook.run(DDL_FINGERPRINTS)
+    _gravar(postgres_hook, check_source({}, postgres_hook, PIPELINE, arquivo)[1], {})
+
+    invalidate_fingerprints(postgres_hook, PIPELINE)
+
+    assert not check_source({}, postgres_hook, PIPELINE, arquivo)[0]
@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+
+import instrumentation
+from fused import FusedRun, FusedTaskInstance, resolve_fused
+from instrumentation import instrument
+from intermediate_storage import frame_exists, intermediate_path, load_frame, save_frame
+
+
+class TI:
+    dag_id = 'pipeline_produtos_vendas'
+    run_id = 'manual__1'
+
+
+def test_resolve_fused():
+    assert not resolve_fused({})
+    assert resolve_fused({'params': {'execucao_fundida': True}})
+
+
+def test_xcom_em_memoria_por_task_id():
+    ti = FusedTaskInstance(TI())
+    ti.task_id = 'extract_vendas'
+    ti.xcom_push('shards', [{'shard': 'online'}])
+    ti.task_id = 'load_data'
+    for indice, valor in enumerate([10, 20]):
+        ti.map_index = indice
+        ti.xcom_push('return_value', valor)
+
+    assert (ti.dag_id, ti.run_id) == ('pipeline_produtos_vendas', 'manual__1')
+    assert ti.xcom_pull(task_ids='extract_vendas', key='shards') == [{'shard': 'online'}]
+    # Etapa mapeada: lista com o valor de cada instância, como no Airflow
+    assert ti.xcom_pull(task_ids='load_data') == [10, 20]
+    assert ti.xcom_pull(task_ids='transform_data') is None
+
+
+def extract(**context):
+    save_frame(pd.DataFrame({'ID_Venda': ['V1', 'V2'], 'Canal': ['Online', 'Loja']}), 'vendas_extraidas')
+    context['ti'].xcom_push(key='shards', value=[{'shard': 'online'}, {'shard': 'loja'}])
+    return 2
+
+
+@instrument('transform')
+def transform(shard=None, **context):
+    df = load_frame('vendas_extraidas')
+    return {'shard': shard, 'registros': int((df['Canal'].str.lower() == shard).sum())}
+
+
+def test_fused_run_encadeia_etapas_em_memoria(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'ARQUIVO_METRICAS', '')
+
+    with FusedRun({'ti': TI(), 'run_id': 'manual__1'}, ['vendas_extraidas']) as execucao:
+        assert execucao.run('extract_vendas', extract) == 2
+        shards = execucao.xcom_pull('extract_vendas', key='shards')
+        resultado = execucao.run('transform_data', transform, mapeamentos=shards)
+        metricas = execucao.metrics()
+        assert frame_exists('vendas_extraidas')
+
+    assert resultado == [{'shard': 'online', 'registros': 1}, {'shard': 'loja', 'registros': 1}]
+    assert execucao.xcom_pull('transform_data') == resultado
+    assert [metrica['task_id'] for metrica in metricas['transform_data']] == ['transform_data'] * 2
+    assert [metrica['map_index'] for metrica in metricas['transform_data']] == [0, 1]
+    assert metricas['extract_vendas'] is None
+    # Nenhum arquivo intermediário gravado, e os dados em memória são liberados ao sair
+    assert not os.path.exists(intermediate_path('vendas_extraidas'))
+    assert not frame_exists('vendas_extraidas')
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from imputation import impute, impute_sql
+
+
+def test_media_grupo():
+    df = pd.DataFrame({
+        'Categoria': ['A', 'A', 'A', 'B', 'B'],
+        'Preco_Custo': [10.0, 20.0, None, 5.0, None],
+    })
+
+    df, preenchidos = impute(df, [{'coluna': 'Preco_Custo', 'estrategia': 'media_grupo', 'grupo': 'Categoria'}])
+
+    assert df['Preco_Custo'].tolist() == [10.0, 20.0, 15.0, 5.0, 5.0]
+    assert preenchidos == {'Preco_Custo': 2}
+
+
+def test_mediana_grupo_converte_texto():
+    df = pd.DataFrame({'Grupo': ['X', 'X', 'X', 'X'], 'Valor': ['1', '2', '10', None]})
+
+    df, _ = impute(df, [{'coluna': 'Valor', 'estrategia': 'mediana_grupo', 'grupo': 'Grupo'}])
+
+    assert df['Valor'].tolist() == [1.0, 2.0, 10.0, 2.0]
+
+
+def test_constante_em_coluna_categorica():
+    df = pd.DataFrame({'Fornecedor': pd.Categorical(['Logitech', None, 'Dell'])})
+
+    df, preenchidos = impute(df, [{'coluna': 'Fornecedor', 'estrategia': 'constante', 'valor': 'Não Informado'}])
+
+    assert isinstance(df['Fornecedor'].dtype, pd.CategoricalDtype)
+    assert df['Fornecedor'].tolist() == ['Logitech', 'Não Informado', 'Dell']
+    assert preenchidos == {'Fornecedor': 1}
+
+
+def test_derivada_e_sem_nulos():
+    df = pd.DataFrame({'Preco_Custo': [100.0, 50.0], 'Preco_Venda': [None, 80.0]})
+    regras = [
+        {'coluna': 'Preco_Venda', 'estrategia': 'derivada', 'origem': 'Preco_Custo', 'fator': 1.3},
+        {'coluna': 'Preco_Custo', 'estrategia': 'constante', 'valor': 0},
+    ]
+
+    df, preenchidos = impute(df, regras)
+
+    assert df['Preco_Venda'].tolist() == pytest.approx([130.0, 80.0])
+    assert preenchidos == {'Preco_Venda': 1, 'Preco_Custo': 0}
+
+
+def test_estrategia_invalida():
+    df = pd.DataFrame({'Valor': [None]})
+
+    with pytest.raises(ValueError):
+        impute(df, [{'coluna': 'Valor', 'estrategia': 'moda'}])
+
+
+def test_impute_sql():
+    regras = [
+        {'coluna': 'Preco_Custo', 'estrategia': 'media_grupo', 'grupo': 'Categoria'},
+        {'coluna': 'Fornecedor', 'estrategia': 'constante', 'valor': "D'Ávila 10%"},
+    ]
+
+    expressoes = impute_sql(regras, ['ID_Produto', 'Preco_Custo', 'Fornecedor'])
+
+    assert expressoes == {
+        'ID_Produto': 'ID_Produto',
+        'Preco_Custo': 'COALESCE(Preco_Custo, AVG(Preco_Custo) OVER (PARTITION BY Categoria))',
+        'Fornecedor': "COALESCE(Fornecedor, 'D''Ávila 10%%')",
+    }
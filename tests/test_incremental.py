@@ -0,0 +1,42 @@
+from datetime import date
+
+import pandas as pd
+
+from incremental import compute_watermark, filter_window, merge_watermark
+
+
+def test_compute_watermark_maior_data():
+    df = pd.DataFrame({'Data_Venda': ['2024-01-10', '2024-03-05', None, '2024-02-01']})
+
+    assert compute_watermark(df, 'Data_Venda') == date(2024, 3, 5)
+
+
+def test_compute_watermark_sem_datas():
+    assert compute_watermark(pd.DataFrame({'Data_Venda': [None, None]}), 'Data_Venda') is None
+    assert compute_watermark(pd.DataFrame({'Data_Venda': pd.Series([], dtype=object)}), 'Data_Venda') is None
+
+
+def test_merge_watermark():
+    assert merge_watermark(None, None) is None
+    assert merge_watermark(None, date(2024, 1, 1)) == date(2024, 1, 1)
+    assert merge_watermark(date(2024, 1, 1), None) == date(2024, 1, 1)
+    assert merge_watermark(date(2024, 5, 1), date(2024, 1, 1)) == date(2024, 5, 1)
+
+
+def test_merge_watermark_entre_chunks_igual_ao_lote_inteiro():
+    df = pd.DataFrame({'Data_Venda': ['2024-01-03', '2024-04-20', '2024-02-11', '2024-04-19']})
+
+    marca = None
+    for inicio in range(0, len(df), 2):
+        marca = merge_watermark(marca, compute_watermark(df.iloc[inicio:inicio + 2], 'Data_Venda'))
+
+    assert marca == compute_watermark(df, 'Data_Venda')
+
+
+def test_filter_window_limites_inclusivos():
+    df = pd.DataFrame({'Data_Venda': ['2024-01-01', '2024-01-15', '2024-02-01', '2024-02-02']})
+
+    janela = {'inicio': date(2024, 1, 15), 'fim': date(2024, 2, 1)}
+
+    assert filter_window(df, 'Data_Venda', janela)['Data_Venda'].tolist() == ['2024-01-15', '2024-02-01']
+    assert filter_window(df, 'Data_Venda', {'inicio': None, 'fim': None}) is df
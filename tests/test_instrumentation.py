@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import instrumentation
+from instrumentation import instrument, record_read, record_write
+
+
+class TI:
+    task_id = 'transform_data'
+    run_id = 'manual__1'
+    map_index = 2
+
+    def __init__(self):
+        self.xcom = {}
+
+    def xcom_push(self, key, value):
+        self.xcom[key] = value
+
+
+@pytest.fixture
+def arquivo_metricas(tmp_path, monkeypatch):
+    arquivo = tmp_path / 'metricas.jsonl'
+    monkeypatch.setattr(instrumentation, 'ARQUIVO_METRICAS', str(arquivo))
+    return arquivo
+
+
+def test_instrument_registra_metricas_da_task(arquivo_metricas):
+    @instrument('transform')
+    def transform_data(**context):
+        record_read(10, 1000)
+        record_write(4, 200)
+        record_write(1, 50)
+        return 'ok'
+
+    ti = TI()
+
+    assert transform_data(ti=ti) == 'ok'
+
+    metricas = ti.xcom['metricas']
+    assert (metricas['task_id'], metricas['run_id'], metricas['map_index']) == ('transform_data', 'manual__1', 2)
+    assert (metricas['fase'], metricas['status']) == ('transform', 'sucesso')
+    assert (metricas['registros_lidos'], metricas['bytes_lidos']) == (10, 1000)
+    assert (metricas['registros_gravados'], metricas['bytes_gravados']) == (5, 250)
+    assert metricas['pico_rss_mb'] > 0
+    assert transform_data.__name__ == 'transform_data'
+    assert json.loads(arquivo_metricas.read_text()) == json.loads(json.dumps(metricas, default=str))
+
+
+def test_instrument_propaga_erro_com_status_falha(arquivo_metricas):
+    @instrument('load')
+    def load_data(**context):
+        record_write(3)
+        raise RuntimeError('falha na carga')
+
+    ti = TI()
+
+    with pytest.raises(RuntimeError):
+        load_data(ti=ti)
+
+    assert ti.xcom['metricas']['status'] == 'falha'
+    assert ti.xcom['metricas']['registros_gravados'] == 3
+
+
+def test_record_fora_de_task_instrumentada_e_ignorado(arquivo_metricas):
+    record_read(5, 10)
+
+    @instrument('extract')
+    def extract(**context):
+        return None
+
+    ti = TI()
+    extract(ti=ti)
+
+    assert ti.xcom['metricas']['registros_lidos'] == 0
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from intermediate_storage import FrameWriter, in_memory, iter_frame, load_frame, save_frame
+
+
+def _chunks():
+    return [
+        pd.DataFrame({'ID_Venda': ['V1', 'V2'], 'Quantidade': [1, 2],
+                      'Canal': pd.Categorical(['Online', 'Online'])}),
+        pd.DataFrame({'ID_Venda': ['V3', 'V4', 'V5'], 'Quantidade': [3, 4, 5],
+                      'Canal': pd.Categorical(['Loja', 'Online', 'Telefone'])}),
+    ]
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'arrow', 'csv'])
+def test_frame_writer_iter_frame_ida_e_volta(formato):
+    with FrameWriter('vendas', formato=formato) as writer:
+        for chunk in _chunks():
+            writer.write(chunk)
+
+    assert writer.registros == 5
+    assert writer.chunks == 2
+    lidos = pd.concat(iter_frame('vendas', 2, formato=formato), ignore_index=True)
+    assert lidos['ID_Venda'].astype(str).tolist() == ['V1', 'V2', 'V3', 'V4', 'V5']
+    assert lidos['Quantidade'].tolist() == [1, 2, 3, 4, 5]
+    assert lidos['Canal'].astype(str).tolist() == ['Online', 'Online', 'Loja', 'Online', 'Telefone']
+
+
+def test_iter_frame_respeita_chunk_size():
+    save_frame(pd.DataFrame({'valor': range(10)}), 'numeros', formato='parquet')
+
+    tamanhos = [len(chunk) for chunk in iter_frame('numeros', 4, formato='parquet')]
+
+    assert tamanhos == [4, 4, 2]
+
+
+def test_frame_writer_sem_chunks_grava_modelo_vazio():
+    modelo = pd.DataFrame({'ID_Venda': pd.Series([], dtype='string'), 'Quantidade': pd.Series([], dtype='Int32')})
+
+    with FrameWriter('vazio', formato='parquet', modelo=modelo):
+        pass
+
+    df = load_frame('vazio', formato='parquet')
+    assert df.empty
+    assert list(df.columns) == ['ID_Venda', 'Quantidade']
+    assert str(df['Quantidade'].dtype) == 'Int32'
+
+
+def test_frame_writer_aplica_schema():
+    with FrameWriter('com_schema', formato='parquet', schema={'Quantidade': 'Int32'}) as writer:
+        writer.write(pd.DataFrame({'Quantidade': [1.0, None]}))
+
+    df = load_frame('com_schema', formato='parquet')
+    assert str(df['Quantidade'].dtype) == 'Int32'
+    assert df['Quantidade'].isna().tolist() == [False, True]
+
+
+def test_in_memory_nao_grava_arquivo(diretorio_intermediario):
+    with in_memory('vendas'):
+        with FrameWriter('vendas') as writer:
+            for chunk in _chunks():
+                writer.write(chunk)
+        lidos = pd.concat(iter_frame('vendas', 3), ignore_index=True)
+
+    assert len(lidos) == 5
+    assert not any(diretorio_intermediario.iterdir())
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'arrow'])
+def test_save_load_frame_preserva_tipos(formato):
+    df = pd.DataFrame({
+        'ID_Venda': ['V1', 'V2'],
+        'Quantidade': pd.array([1, None], dtype='Int32'),
+        'Data_Venda': pd.to_datetime(['2024-01-15', '2024-01-16']),
+    })
+    save_frame(df, 'vendas', formato=formato)
+
+    lido = load_frame('vendas', formato=formato)
+    assert str(lido['Quantidade'].dtype) == 'Int32'
+    assert lido['Data_Venda'].dtype.kind == 'M'
+    assert lido['Quantidade'].isna().tolist() == [False, True]
+    assert load_frame('vendas', formato=formato, columns=['ID_Venda']).columns.tolist() == ['ID_Venda']
+
+
+def test_load_frame_inexistente():
+    with pytest.raises(FileNotFoundError):
+        load_frame('inexistente', formato='parquet')
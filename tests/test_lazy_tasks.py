@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from lazy_tasks import lazy_task, load_task
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DAGS = ['6324089/pipeline_produtos_vendas.py', 'dags/etl_vendas_pipeline.py']
+
+
+@pytest.fixture
+def modulo_tasks(tmp_path, monkeypatch):
+    (tmp_path / 'tasks_teste.py').write_text(
+        "def extract_vendas(shard=None, **context):\n"
+        "    return {'shard': shard, 'run_id': context.get('run_id')}\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield 'tasks_teste'
+    sys.modules.pop('tasks_teste', None)
+
+
+def test_lazy_task_importa_o_modulo_apenas_na_execucao(modulo_tasks):
+    task = lazy_task(modulo_tasks, 'extract_vendas')
+    assert modulo_tasks not in sys.modules
+
+    assert task(shard='online', run_id='manual__1') == {'shard': 'online', 'run_id': 'manual__1'}
+    assert modulo_tasks in sys.modules
+
+
+def test_lazy_task_preserva_nome_e_modulo(modulo_tasks):
+    task = lazy_task(modulo_tasks, 'extract_vendas')
+
+    assert (task.__name__, task.__qualname__, task.__module__) == ('extract_vendas', 'extract_vendas', modulo_tasks)
+    assert load_task(modulo_tasks, 'extract_vendas').__name__ == 'extract_vendas'
+
+
+@pytest.mark.parametrize('dag', DAGS)
+def test_parse_da_dag_nao_importa_o_pipeline(dag):
+    pytest.importorskip('airflow')
+    codigo = (
+        "import runpy, sys\n"
+        f"sys.path.insert(0, {os.path.join(RAIZ, 'plugins')!r})\n"
+        f"runpy.run_path({os.path.join(RAIZ, dag)!r})\n"
+        "carregados = [m for m in ('pandas', 'produtos_vendas_tasks', 'etl_vendas_tasks') if m in sys.modules]\n"
+        "assert not carregados, carregados\n"
+    )
+
+    subprocess.run([sys.executable, '-c', codigo], check=True, capture_output=True, timeout=300)
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from bulk_loader import BulkLoader
+from load_validation import CHECKSUMS, merge_written, release_run, resolve_checksums, validate_run
+from schema_manager import ensure_schema
+
+
+def _produtos(*ids, preco=10.0):
+    return pd.DataFrame({'ID_Produto': list(ids), 'Nome_Produto': 'Produto', 'Preco_Custo': preco})
+
+
+def _carregar(postgres_hook, run_id, *lotes):
+    ensure_schema(postgres_hook)
+    with BulkLoader(postgres_hook, run_id=run_id, checksums=CHECKSUMS) as loader:
+        for lote in lotes:
+            loader.upsert('produtos_processados', lote, ['ID_Produto'])
+    return loader.gravados
+
+
+def test_resolve_checksums():
+    assert resolve_checksums({}) == CHECKSUMS
+    assert resolve_checksums({'params': {'validar_checksums': False}}) == {}
+
+
+def test_merge_written():
+    gravados = merge_written(
+        {'vendas': {'registros': 2, 'checksums': {'Receita_Total': 10.0}}},
+        None,
+        {'vendas': {'registros': 1, 'checksums': {'Receita_Total': 2.5}}},
+    )
+
+    assert gravados == {'vendas': {'registros': 3, 'checksums': {'Receita_Total': 12.5}}}
+
+
+def test_validate_run_confere_contagens_e_checksums(postgres_hook):
+    gravados = _carregar(postgres_hook, 'manual__1', _produtos('P1', 'P2'))
+
+    assert gravados == {'produtos_processados': {'registros': 2, 'checksums': {'Preco_Custo': 20.0}}}
+    assert validate_run(postgres_hook, 'manual__1', gravados) == {'produtos_processados': 2}
+
+
+def test_chaves_regravadas_pelo_mesmo_loader_contam_uma_vez(postgres_hook):
+    gravados = _carregar(postgres_hook, 'manual__1', _produtos('P1', 'P2'), _produtos('P2', 'P3', preco=15.0))
+
+    assert gravados['produtos_processados'] == {'registros': 3, 'checksums': {'Preco_Custo': 40.0}}
+    assert validate_run(postgres_hook, 'manual__1', gravados) == {'produtos_processados': 3}
+
+
+def test_validate_run_divergencia_de_contagem(postgres_hook):
+    gravados = _carregar(postgres_hook, 'manual__1', _produtos('P1', 'P2'))
+    gravados['produtos_processados']['registros'] = 3
+
+    with pytest.raises(ValueError, match='divergente'):
+        validate_run(postgres_hook, 'manual__1', gravados)
+
+
+def test_validate_run_divergencia_de_checksum(postgres_hook):
+    gravados = _carregar(postgres_hook, 'manual__1', _produtos('P1', 'P2'))
+    gravados['produtos_processados']['checksums']['Preco_Custo'] = 21.0
+
+    with pytest.raises(ValueError, match='divergente'):
+        validate_run(postgres_hook, 'manual__1', gravados)
+
+
+def test_validate_run_sem_run_id_ou_sem_gravados(postgres_hook):
+    assert validate_run(postgres_hook, 'manual__1', {}) == {}
+    assert validate_run(postgres_hook, None, {'produtos_processados': {'registros': 4, 'checksums': {}}}) == {
+        'produtos_processados': 4,
+    }
+
+
+def test_release_run(postgres_hook):
+    gravados = _carregar(postgres_hook, 'manual__1', _produtos('P1', 'P2'))
+
+    release_run(postgres_hook, 'manual__1')
+
+    assert postgres_hook.get_first("SELECT COUNT(*) FROM produtos_processados WHERE Run_Id IS NULL") == (2,)
+    with pytest.raises(ValueError):
+        validate_run(postgres_hook, 'manual__1', gravados)
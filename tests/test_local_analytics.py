@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pytest
+
+from local_analytics import LocalAnalyticsHook, build_local, resolve_report_backend
+
+
+def _dados():
+    produtos = pd.DataFrame({
+        'ID_Produto': ['P1', 'P2'],
+        'Nome_Produto': ['Notebook', 'Mouse'],
+        'Categoria': pd.Categorical(['Eletrônicos', 'Acessórios']),
+        'Preco_Custo': [2500.0, 45.5],
+    })
+    vendas = pd.DataFrame({
+        'ID_Venda': ['V1', 'V2', 'V3'],
+        'Data_Venda': pd.to_datetime(['2024-01-15', '2024-01-16', '2024-02-01']),
+        'ID_Produto': ['P1', 'P2', 'P2'],
+        'Quantidade_Vendida': [1, 2, 3],
+        'Canal_Venda': pd.Categorical(['Online', 'Online', 'Loja']),
+        'Receita_Total': [3200.0, 110.0, None],
+        'Margem_Lucro': [700.0, 9.5, 9.5],
+        'Mes_Venda': ['2024-01', '2024-01', '2024-02'],
+    })
+    return produtos, [vendas.iloc[:2], vendas.iloc[2:]]
+
+
+@pytest.fixture
+def banco(tmp_path):
+    return str(tmp_path / 'relatorios.db')
+
+
+def test_resolve_report_backend():
+    assert resolve_report_backend({}) == 'postgres'
+    assert resolve_report_backend({'params': {'backend_relatorios': 'sqlite'}}) == 'sqlite'
+    # O modo ELT não gera arquivos transformados
+    assert resolve_report_backend({'params': {'backend_relatorios': 'sqlite', 'modo_execucao': 'elt'}}) == 'postgres'
+    with pytest.raises(ValueError):
+        resolve_report_backend({'params': {'backend_relatorios': 'duckdb'}})
+
+
+def test_build_local_monta_uma_vez_por_run_id(banco):
+    leituras = []
+
+    def ler_dados():
+        leituras.append(1)
+        return _dados()
+
+    assert build_local('manual__1', ler_dados, banco) == banco
+    build_local('manual__1', ler_dados, banco)
+    assert len(leituras) == 1
+
+    build_local('manual__2', ler_dados, banco)
+    assert len(leituras) == 2
+    assert not [arquivo for arquivo in os.listdir(os.path.dirname(banco)) if arquivo.endswith('.tmp')]
+
+
+def test_hook_consulta_camada_agregada(banco):
+    build_local('manual__1', _dados, banco)
+
+    df = LocalAnalyticsHook(banco).get_pandas_df(
+        "SELECT Categoria, SUM(Num_Vendas) AS Num_Vendas, SUM(Total_Receita) AS Total_Receita, "
+        "SUM(Num_Receitas) AS Num_Receitas FROM vendas_agregadas GROUP BY Categoria ORDER BY Categoria"
+    )
+
+    assert df.columns.tolist() == ['categoria', 'num_vendas', 'total_receita', 'num_receitas']
+    assert df.values.tolist() == [['Acessórios', 2, 110.0, 1], ['Eletrônicos', 1, 3200.0, 1]]
+
+
+def test_falha_na_montagem_mantem_o_banco_anterior(banco):
+    build_local('manual__1', _dados, banco)
+
+    def ler_dados():
+        raise RuntimeError('arquivo transformado ausente')
+
+    with pytest.raises(RuntimeError):
+        build_local('manual__2', ler_dados, banco)
+
+    assert LocalAnalyticsHook(banco).get_pandas_df("SELECT Run_Id FROM execucao_local")['run_id'].tolist() == [
+        'manual__1',
+    ]
+
+
+def test_replace_table(banco):
+    build_local('manual__1', _dados, banco)
+    hook = LocalAnalyticsHook(banco)
+
+    hook.replace_table('produtos_baixa_performance', pd.DataFrame({'ID_Produto': ['P2'], 'Num_Vendas': [0]}))
+    hook.replace_table('produtos_baixa_performance', pd.DataFrame({'ID_Produto': ['P1'], 'Num_Vendas': [1]}))
+
+    assert hook.get_pandas_df("SELECT * FROM produtos_baixa_performance").values.tolist() == [['P1', 1]]
+
+
+def test_banco_nao_montado(banco):
+    with pytest.raises(FileNotFoundError):
+        LocalAnalyticsHook(banco).get_pandas_df("SELECT 1")
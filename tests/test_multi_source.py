@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+import pytest
+
+from bulk_loader import BulkLoader
+from fingerprint_cache import content_hash
+from multi_source import DDL_ARQUIVOS, mark_ingested, new_files, pending_files, read_files, resolve_source_pattern
+
+PIPELINE = 'pipeline_teste'
+
+
+@pytest.fixture
+def lojas(tmp_path):
+    for loja, vendas in (('norte', ['V1', 'V2', 'V3']), ('sul', ['V4'])):
+        linhas = ''.join(f"{venda},{loja}\n" for venda in vendas)
+        (tmp_path / f"vendas_{loja}.csv").write_text('ID_Venda,Loja\n' + linhas)
+    return str(tmp_path / 'vendas_*.csv')
+
+
+def test_resolve_source_pattern():
+    assert resolve_source_pattern({}) is None
+    assert resolve_source_pattern({'params': {'arquivos_vendas': '/dados/*.csv'}}) == '/dados/*.csv'
+
+
+def test_read_files_marca_origem_e_calcula_hash(lojas):
+    arquivos, _ = pending_files({'params': {'modo_carga': 'full'}}, None, PIPELINE, lojas)
+
+    df = pd.concat(read_files(arquivos, processos=2, chunk_size=2), ignore_index=True)
+
+    assert df['ID_Venda'].tolist() == ['V1', 'V2', 'V3', 'V4']
+    assert df['Arquivo_Origem'].astype(str).map(os.path.basename).tolist() == ['vendas_norte.csv'] * 3 + ['vendas_sul.csv']
+    assert [arquivo['registros'] for arquivo in arquivos] == [3, 1]
+    assert all(arquivo['hash'] == content_hash(arquivo['origem']) for arquivo in arquivos)
+
+
+def test_pending_files_ignora_arquivos_ingeridos(postgres_hook, lojas):
+    postgres_hook.run(DDL_ARQUIVOS)
+    arquivos, hashes = pending_files({}, postgres_hook, PIPELINE, lojas)
+    assert (len(arquivos), hashes) == (2, {})
+    with BulkLoader(postgres_hook, run_id='manual__1') as loader:
+        mark_ingested(loader, PIPELINE, new_files(arquivos))
+
+    # Tamanho e mtime iguais: nem lidos
+    assert pending_files({}, postgres_hook, PIPELINE, lojas)[0] == []
+
+    # mtime alterado com conteúdo igual: relido, mas descartado pelo hash
+    norte = arquivos[0]['origem']
+    os.utime(norte, ns=(arquivos[0]['mtime_ns'] + 10**9, arquivos[0]['mtime_ns'] + 10**9))
+    pendentes, hashes = pending_files({}, postgres_hook, PIPELINE, lojas)
+    assert [arquivo['origem'] for arquivo in pendentes] == [norte]
+    assert list(read_files(pendentes, hashes)) == []
+    assert new_files(pendentes, hashes) == []
+
+    # Full reprocessa tudo
+    assert len(pending_files({'params': {'modo_carga': 'full'}}, postgres_hook, PIPELINE, lojas)[0]) == 2
+
+
+def test_mark_ingested_atualiza_registro(postgres_hook, lojas):
+    postgres_hook.run(DDL_ARQUIVOS)
+    arquivos, _ = pending_files({}, postgres_hook, PIPELINE, lojas)
+    for run_id in ('manual__1', 'manual__2'):
+        with BulkLoader(postgres_hook, run_id=run_id) as loader:
+            mark_ingested(loader, PIPELINE, new_files(arquivos))
+
+    assert postgres_hook.get_records(
+        "SELECT Run_Id, COUNT(*) FROM pipeline_arquivos_ingeridos GROUP BY Run_Id"
+    ) == [('manual__2', 2)]
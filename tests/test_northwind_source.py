@@ -0,0 +1,62 @@
+import pytest
+
+from northwind_source import SQL_LIMITES, key_ranges, resolve_source
+
+JANELA = {'inicio': None, 'fim': None}
+
+
+class HookLimites:
+    """Hook falso: get_first devolve os limites de order_id informados"""
+
+    def __init__(self, primeiro, ultimo):
+        self.limites = (primeiro, ultimo)
+        self.chamadas = []
+
+    def get_first(self, sql, parameters=None):
+        self.chamadas.append((sql, parameters))
+        return self.limites
+
+
+def _cobertura(faixas):
+    return [valor for inicio, fim in faixas for valor in range(inicio, fim + 1)]
+
+
+def test_key_ranges_faixas_contiguas():
+    faixas = key_ranges(HookLimites(10248, 11077), JANELA, leitores=4)
+
+    assert len(faixas) == 4
+    assert _cobertura(faixas) == list(range(10248, 11078))
+
+
+def test_key_ranges_menos_ids_que_leitores():
+    assert key_ranges(HookLimites(5, 7), JANELA, leitores=8) == [(5, 5), (6, 6), (7, 7)]
+    assert key_ranges(HookLimites(5, 5), JANELA, leitores=4) == [(5, 5)]
+
+
+def test_key_ranges_sem_pedidos():
+    assert key_ranges(HookLimites(None, None), JANELA) == []
+
+
+def test_key_ranges_aplica_janela():
+    hook = HookLimites(1, 10)
+
+    key_ranges(hook, {'inicio': '2024-01-01', 'fim': None}, leitores=2)
+
+    assert hook.chamadas == [(SQL_LIMITES, {'inicio': '2024-01-01', 'fim': None})]
+
+
+@pytest.mark.parametrize('leitores', [1, 2, 3, 7])
+def test_key_ranges_cobre_o_intervalo(leitores):
+    faixas = key_ranges(HookLimites(1, 100), JANELA, leitores=leitores)
+
+    assert len(faixas) == leitores
+    assert _cobertura(faixas) == list(range(1, 101))
+
+
+def test_resolve_source():
+    assert resolve_source({}) == 'csv'
+    assert resolve_source({'params': {'fonte_dados': 'northwind'}}) == 'northwind'
+    with pytest.raises(ValueError):
+        resolve_source({'params': {'fonte_dados': 'mysql'}})
+    with pytest.raises(ValueError):
+        resolve_source({'params': {'fonte_dados': 'northwind', 'arquivos_vendas': '/dados/*.csv'}})
@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+import pytest
+
+from report_snapshots import latest_snapshot, list_versions, load_snapshot, save_snapshot, snapshot_version
+
+
+def _categoria(receita):
+    return pd.DataFrame({'categoria': ['Eletrônicos', 'Acessórios'], 'total_receita': [receita, 10.0]})
+
+
+def test_snapshot_version():
+    assert snapshot_version({'ds': '2024-01-15'}) == '2024-01-15'
+    assert len(snapshot_version({})) == 10
+
+
+def test_latest_snapshot_le_a_versao_mais_recente(tmp_path):
+    save_snapshot({'categoria': _categoria(100.0), 'canal': pd.DataFrame({'canal': ['Online']})},
+                  '2024-01-15', str(tmp_path))
+    save_snapshot({'categoria': _categoria(200.0)}, '2024-01-16', str(tmp_path))
+
+    assert list_versions('categoria', str(tmp_path)) == ['2024-01-15', '2024-01-16']
+    assert list_versions('canal', str(tmp_path)) == ['2024-01-15']
+    assert latest_snapshot('categoria', str(tmp_path))['total_receita'].tolist() == [200.0, 10.0]
+    assert latest_snapshot('canal', str(tmp_path))['canal'].tolist() == ['Online']
+    assert load_snapshot('categoria', '2024-01-15', str(tmp_path), columns=['total_receita']).columns.tolist() == [
+        'total_receita',
+    ]
+
+
+def test_reexecucao_da_mesma_data_invalida_o_cache(tmp_path):
+    diretorio = save_snapshot({'categoria': _categoria(100.0)}, '2024-01-15', str(tmp_path))
+    lido = latest_snapshot('categoria', str(tmp_path))
+    lido.loc[0, 'total_receita'] = -1.0
+
+    # A cópia devolvida não altera o cache
+    assert latest_snapshot('categoria', str(tmp_path))['total_receita'].tolist() == [100.0, 10.0]
+
+    save_snapshot({'categoria': _categoria(300.0)}, '2024-01-15', str(tmp_path))
+    caminho = os.path.join(diretorio, 'categoria.parquet')
+    estado = os.stat(caminho)
+    os.utime(caminho, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))
+
+    assert latest_snapshot('categoria', str(tmp_path))['total_receita'].tolist() == [300.0, 10.0]
+
+
+def test_snapshot_inexistente(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        latest_snapshot('categoria', str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        load_snapshot('categoria', '2024-01-15', str(tmp_path))
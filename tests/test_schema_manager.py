@@ -0,0 +1,103 @@
+from datetime import date
+
+import pandas as pd
+
+from schema_manager import create_partitions, ensure_schema, partition_months
+
+# Tabelas como o create_tables original as criava (sem chaves nem partições)
+DDL_LEGADO = """
+CREATE TABLE produtos_processados (
+    ID_Produto VARCHAR(10),
+    Nome_Produto VARCHAR(100),
+    Categoria VARCHAR(50),
+    Preco_Custo DECIMAL(10,2),
+    Fornecedor VARCHAR(100),
+    Status VARCHAR(20),
+    Data_Processamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE vendas_processadas (
+    ID_Venda VARCHAR(10),
+    ID_Produto VARCHAR(10),
+    Quantidade_Vendida INTEGER,
+    Preco_Venda DECIMAL(10,2),
+    Data_Venda DATE,
+    Canal_Venda VARCHAR(20),
+    Receita_Total DECIMAL(10,2),
+    Margem_Lucro DECIMAL(10,2),
+    Mes_Venda VARCHAR(7),
+    Data_Processamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE relatorio_vendas (
+    ID_Venda VARCHAR(10),
+    Nome_Produto VARCHAR(100),
+    Categoria VARCHAR(50),
+    Quantidade_Vendida INTEGER,
+    Receita_Total DECIMAL(10,2),
+    Margem_Lucro DECIMAL(10,2),
+    Canal_Venda VARCHAR(20),
+    Mes_Venda VARCHAR(7),
+    Data_Processamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO produtos_processados (ID_Produto, Nome_Produto, Categoria) VALUES
+    ('P001', 'Notebook', 'Eletrônicos'), ('P002', 'Mouse', 'Acessórios');
+INSERT INTO vendas_processadas (ID_Venda, ID_Produto, Quantidade_Vendida, Data_Venda, Receita_Total, Mes_Venda) VALUES
+    ('V001', 'P001', 1, '2024-01-15', 3500, '2024-01'),
+    ('V002', 'P002', 2, '2024-02-03', 180, '2024-02'),
+    ('V003', 'P002', 1, NULL, 90, NULL);
+INSERT INTO relatorio_vendas (ID_Venda, Nome_Produto) VALUES ('V001', 'Notebook');
+"""
+
+
+def _relkind(postgres_hook, tabela):
+    return postgres_hook.get_first("SELECT relkind FROM pg_class WHERE relname = %s", (tabela,))[0]
+
+
+def test_partition_months():
+    meses = partition_months(pd.Series(['2024-02-10', None, '2024-01-31', '2024-02-01']))
+
+    assert meses == [pd.Period('2024-01', 'M'), pd.Period('2024-02', 'M')]
+
+
+def test_ensure_schema_migra_tabelas_antigas(postgres_hook):
+    postgres_hook.run(DDL_LEGADO)
+
+    ensure_schema(postgres_hook)
+
+    assert _relkind(postgres_hook, 'vendas_processadas') == 'p'
+    assert _relkind(postgres_hook, 'relatorio_vendas') == 'p'
+    assert postgres_hook.get_first(
+        "SELECT COUNT(*) FROM pg_constraint WHERE conrelid = 'produtos_processados'::regclass AND contype = 'p'"
+    ) == (1,)
+    assert postgres_hook.get_first("SELECT to_regclass('vendas_processadas_legado')") == (None,)
+
+    # Vendas sem Data_Venda não cabem em uma partição e são descartadas
+    assert postgres_hook.get_records("SELECT ID_Venda, Data_Venda FROM vendas_processadas ORDER BY ID_Venda") == [
+        ('V001', date(2024, 1, 15)), ('V002', date(2024, 2, 3)),
+    ]
+    # relatorio_vendas é reconstruído a partir das tabelas base
+    assert postgres_hook.get_records(
+        "SELECT ID_Venda, Nome_Produto, Data_Venda FROM relatorio_vendas ORDER BY ID_Venda"
+    ) == [('V001', 'Notebook', date(2024, 1, 15)), ('V002', 'Mouse', date(2024, 2, 3))]
+    assert postgres_hook.get_first("SELECT to_regclass('vendas_processadas_p202402')") == ('vendas_processadas_p202402',)
+
+
+def test_ensure_schema_idempotente(postgres_hook):
+    ensure_schema(postgres_hook)
+    postgres_hook.run(
+        "INSERT INTO produtos_processados (ID_Produto, Nome_Produto) VALUES ('P001', 'Notebook')"
+    )
+
+    ensure_schema(postgres_hook)
+
+    assert postgres_hook.get_first("SELECT COUNT(*) FROM produtos_processados") == (1,)
+
+
+def test_create_partitions_cria_apenas_as_que_faltam(postgres_hook):
+    ensure_schema(postgres_hook)
+    meses = partition_months(pd.Series(['2024-03-01', '2024-04-10']))
+
+    assert create_partitions(postgres_hook, meses) == [
+        'vendas_processadas_p202403', 'vendas_processadas_p202404',
+        'relatorio_vendas_p202403', 'relatorio_vendas_p202404',
+    ]
+    assert create_partitions(postgres_hook, meses) == []
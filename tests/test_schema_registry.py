@@ -0,0 +1,45 @@
+import io
+
+import pandas as pd
+import pytest
+
+from schema_registry import apply_schema, empty_frame, read_dtypes
+
+CSV = """ID_Venda,ID_Produto,Quantidade_Vendida,Preco_Venda,Data_Venda,Canal_Venda
+V001,P001,2,3200.004,2024-01-15,Online
+V002,P002,,55.1,2024-01-16,Loja Física
+V003,P001,1,abc,2024-01-16,Online
+"""
+
+
+def test_read_dtypes_apenas_texto_e_categorias():
+    assert read_dtypes('vendas') == {
+        'ID_Venda': str, 'ID_Produto': 'category', 'Canal_Venda': 'category', 'Arquivo_Origem': 'category',
+    }
+
+
+def test_apply_schema():
+    df = apply_schema(pd.read_csv(io.StringIO(CSV), dtype=read_dtypes('vendas')), 'vendas')
+
+    assert isinstance(df['Canal_Venda'].dtype, pd.CategoricalDtype)
+    assert str(df['Quantidade_Vendida'].dtype) == 'Int32'
+    assert df['Quantidade_Vendida'].isna().tolist() == [False, True, False]
+    # moeda_float: float64 arredondado para 2 casas; texto inválido vira nulo
+    assert df['Preco_Venda'].dtype == 'float64'
+    assert df['Preco_Venda'].tolist()[:2] == [3200.0, 55.1]
+    assert pd.isna(df['Preco_Venda'].iloc[2])
+    assert df['Data_Venda'].dtype.kind == 'M'
+
+
+def test_empty_frame():
+    vazio = empty_frame('vendas_transformadas')
+
+    assert vazio.empty
+    assert 'Receita_Total' in vazio.columns
+    assert vazio['Receita_Total'].dtype == 'float64'
+    assert isinstance(vazio['Mes_Venda'].dtype, pd.CategoricalDtype)
+
+
+def test_dataset_sem_schema():
+    with pytest.raises(ValueError):
+        apply_schema(pd.DataFrame(), 'clientes')
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from intermediate_storage import load_frame
+from sharding import SHARD_VAZIO, ShardWriter, resolve_sharding, shard_dataset, shard_labels
+
+
+def test_shard_labels_por_data():
+    df = pd.DataFrame({'Data_Venda': ['2024-01-15', '2024-02-01', None, '2024-01-31']})
+
+    assert shard_labels(df, 'data').tolist() == ['2024_01', '2024_02', 'sem_data', '2024_01']
+
+
+def test_shard_labels_por_canal():
+    df = pd.DataFrame({'Canal_Venda': ['Loja Física', 'Online', None, 'Loja Física']}, index=[10, 11, 12, 13])
+
+    labels = shard_labels(df, 'canal')
+
+    assert labels.tolist() == ['loja_fisica', 'online', 'sem_canal', 'loja_fisica']
+    assert labels.index.tolist() == [10, 11, 12, 13]
+
+
+def test_shard_labels_criterio_invalido():
+    with pytest.raises(ValueError):
+        shard_labels(pd.DataFrame({'Canal_Venda': ['Online']}), 'loja')
+
+
+def test_shard_dataset():
+    assert shard_dataset('vendas', None) == 'vendas'
+    assert shard_dataset('vendas', '2024_01') == 'vendas__2024_01'
+
+
+def test_resolve_sharding():
+    assert resolve_sharding({'params': {'particionar_por': 'canal'}}) == 'canal'
+    assert resolve_sharding({}) is None
+    with pytest.raises(ValueError):
+        resolve_sharding({'params': {'particionar_por': 'produto'}})
+
+
+def test_resolve_sharding_executor_distribuido(monkeypatch):
+    monkeypatch.setenv('AIRFLOW__CORE__EXECUTOR', 'CeleryExecutor')
+    monkeypatch.delenv('PIPELINE_INTERMEDIATE_DIR', raising=False)
+
+    assert resolve_sharding({}) is None
+    with pytest.raises(ValueError, match='PIPELINE_INTERMEDIATE_DIR'):
+        resolve_sharding({'params': {'particionar_por': 'data'}})
+
+    monkeypatch.setenv('PIPELINE_INTERMEDIATE_DIR', '/mnt/compartilhado')
+    assert resolve_sharding({'params': {'particionar_por': 'data'}}) == 'data'
+
+
+def test_shard_writer_um_dataset_por_shard():
+    chunks = [
+        pd.DataFrame({'ID_Venda': ['V1', 'V2'], 'Canal_Venda': ['Online', 'Loja']}),
+        pd.DataFrame({'ID_Venda': ['V3'], 'Canal_Venda': ['Online']}),
+    ]
+
+    with ShardWriter('vendas', 'canal') as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+        shards = writer.close()
+
+    assert shards == [{'shard': 'loja'}, {'shard': 'online'}]
+    assert writer.close() == shards
+    assert load_frame(shard_dataset('vendas', 'online'))['ID_Venda'].tolist() == ['V1', 'V3']
+    assert load_frame(shard_dataset('vendas', 'loja'))['ID_Venda'].tolist() == ['V2']
+
+
+def test_shard_writer_sem_vendas_grava_shard_vazio():
+    with ShardWriter('vendas', 'data') as writer:
+        writer.write(pd.DataFrame({'ID_Venda': pd.Series([], dtype=str), 'Data_Venda': pd.Series([], dtype='datetime64[ns]')}))
+        shards = writer.close()
+
+    assert shards == [{'shard': SHARD_VAZIO}]
+    vazio = load_frame(shard_dataset('vendas', SHARD_VAZIO))
+    assert vazio.empty
+    assert list(vazio.columns) == ['ID_Venda', 'Data_Venda']
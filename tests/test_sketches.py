@@ -0,0 +1,176 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import (ERRO_RELATIVO, DaySketches, HeavyHitters, QuantileSketch, merge_sketches,
+                      top_products)
+
+
+def _sketch(valores):
+    return QuantileSketch.by_group(np.zeros(len(valores), dtype=int), valores)[0]
+
+
+def _vendas(n=5000, semente=7):
+    gerador = np.random.default_rng(semente)
+    dias = pd.Timestamp('2024-01-01') + pd.to_timedelta(gerador.integers(0, 45, n), unit='D')
+    margens = gerador.normal(30, 40, n).round(2)
+    margens[gerador.random(n) < 0.02] = np.nan
+    return pd.DataFrame({
+        'Data_Venda': dias.strftime('%Y-%m-%d'),
+        'ID_Produto': [f"P{valor}" for valor in gerador.zipf(1.6, n) % 20],
+        'Quantidade_Vendida': gerador.integers(1, 6, n),
+        'Receita_Total': gerador.lognormal(4, 1, n).round(2),
+        'Margem_Lucro': margens,
+    })
+
+
+def _normalizado(df_dias):
+    """Resumos com os JSON decodificados (a ordem das chaves depende da ordem dos chunks)"""
+    return df_dias.assign(**{coluna: df_dias[coluna].map(json.loads)
+                             for coluna in ('Sketch_Margem', 'Sketch_Ticket', 'Top_Produtos')})
+
+
+def test_quantis_dentro_do_erro_relativo():
+    valores = np.concatenate([np.random.default_rng(1).lognormal(3, 1.5, 20000),
+                              -np.random.default_rng(2).lognormal(1, 1, 2000), np.zeros(100)])
+    sketch = _sketch(valores)
+    ordenados = np.sort(valores)
+
+    assert sketch.total == len(valores)
+    assert sketch.zeros == 100
+    for q in (0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0):
+        exato = ordenados[int(q * (len(valores) - 1))]
+        assert abs(sketch.quantile(q) - exato) <= ERRO_RELATIVO * abs(exato) + 1e-12
+
+
+def test_quantile_sketch_vazio_e_nulos():
+    assert QuantileSketch().quantile(0.5) is None
+    sketch = _sketch(pd.Series([1.0, None, np.nan, 3.0]))
+    assert sketch.total == 2
+
+
+def test_merge_igual_ao_sketch_unico():
+    valores = np.random.default_rng(3).normal(50, 80, 9000)
+    partes = [_sketch(parte) for parte in np.array_split(valores, 4)]
+
+    combinado = partes[0]
+    for parte in partes[1:]:
+        combinado.merge(parte)
+
+    assert combinado.to_dict() == _sketch(valores).to_dict()
+
+
+def test_by_group_igual_a_sketches_separados():
+    chaves = np.array([1, 2, 1, 3, 2, 1])
+    valores = np.array([10.0, -5.0, 0.0, 7.5, 12.0, 10.0])
+
+    sketches = QuantileSketch.by_group(chaves, valores)
+
+    for chave in (1, 2, 3):
+        assert sketches[chave].to_dict() == _sketch(valores[chaves == chave]).to_dict()
+
+
+def test_quantile_sketch_serializacao():
+    sketch = _sketch(np.random.default_rng(4).normal(0, 10, 500))
+
+    assert QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))).to_dict() == sketch.to_dict()
+
+
+def test_heavy_hitters_limite_de_subestimativa():
+    gerador = np.random.default_rng(5)
+    itens = [f"P{valor}" for valor in gerador.zipf(1.3, 20000) % 500]
+    pesos = gerador.integers(1, 10, len(itens))
+    exatos = pd.Series(pesos).groupby(itens).sum()
+    k = 20
+
+    # Resumos por lote combinados, como os resumos diários no relatório
+    lotes = [HeavyHitters.by_group(np.zeros(2000, dtype=int), itens[inicio:inicio + 2000],
+                                   pesos[inicio:inicio + 2000], k=k)[0]
+             for inicio in range(0, len(itens), 2000)]
+    hitters = HeavyHitters(k).merge(*lotes)
+
+    assert hitters.total == exatos.sum()
+    assert len(hitters.contadores) <= k
+    limite = hitters.total / (k + 1)
+    for item, peso in exatos.items():
+        estimado = hitters.contadores.get(item, 0)
+        assert peso - limite <= estimado <= peso
+    for item, _ in exatos.nlargest(3).items():
+        assert item in dict(hitters.top(k))
+
+
+def test_heavy_hitters_sem_reducao_e_exato():
+    resumos = HeavyHitters.by_group(['d1', 'd1', 'd2', 'd1'], ['A', 'B', 'A', None], [3, 1, 2, 4])
+
+    assert dict(resumos['d1'].contadores) == {'A': 3.0, 'B': 1.0, 'nan': 4.0}
+    assert resumos['d1'].top(1) == [('nan', 4.0)]
+    assert HeavyHitters().merge(resumos['d1'], resumos['d2']).top(1) == [('A', 5.0)]
+
+
+def test_day_sketches_em_chunks_igual_a_uma_passada():
+    vendas = _vendas()
+    inteiro = DaySketches().add(vendas).frame()
+
+    em_chunks = DaySketches()
+    for inicio in range(0, len(vendas), 700):
+        em_chunks.add(vendas.iloc[inicio:inicio + 700])
+
+    pd.testing.assert_frame_equal(_normalizado(em_chunks.frame()), _normalizado(inteiro))
+
+
+def test_day_sketches_add_frame_combina_shards():
+    vendas = _vendas()
+    inteiro = DaySketches().add(vendas).frame()
+    shards = [DaySketches().add(vendas.iloc[inicio::3]).frame() for inicio in range(3)]
+
+    combinado = DaySketches()
+    for shard in shards:
+        combinado.add_frame(shard)
+
+    pd.testing.assert_frame_equal(_normalizado(combinado.frame()), _normalizado(inteiro))
+
+
+def test_day_sketches_contagens():
+    vendas = _vendas(n=1000)
+    df_dias = DaySketches().add(vendas.rename(columns=str.lower)).frame()
+    datas = pd.to_datetime(vendas['Data_Venda'])
+
+    assert df_dias['Num_Vendas'].sum() == len(vendas)
+    assert df_dias['Total_Quantidade'].sum() == vendas['Quantidade_Vendida'].sum()
+    assert df_dias['Num_Margens'].sum() == vendas['Margem_Lucro'].notna().sum()
+    primeiro = df_dias.iloc[0]
+    do_dia = vendas[datas == primeiro['Data_Venda']]
+    assert primeiro['Total_Receita'] == pytest.approx(do_dia['Receita_Total'].sum(), abs=0.01)
+    assert primeiro['Margem_Minima'] == pytest.approx(do_dia['Margem_Lucro'].min())
+
+
+def test_merge_sketches_total():
+    vendas = _vendas()
+    distribuicao = merge_sketches(DaySketches().add(vendas).frame())
+    total = distribuicao[distribuicao['periodo'] == 'Total'].iloc[0]
+
+    assert distribuicao['periodo'].tolist() == ['2024-01', '2024-02', 'Total']
+    assert total['num_vendas'] == len(vendas)
+    assert total['total_receita'] == pytest.approx(vendas['Receita_Total'].sum(), abs=0.01)
+    mediana = vendas['Margem_Lucro'].dropna().sort_values().iloc[(vendas['Margem_Lucro'].notna().sum() - 1) // 2]
+    assert total['margem_mediana'] == pytest.approx(mediana, rel=ERRO_RELATIVO, abs=0.01)
+
+
+def test_top_products_resolve_nomes():
+    vendas = pd.DataFrame({
+        'Data_Venda': ['2024-01-01', '2024-01-01', '2024-01-02'],
+        'ID_Produto': ['P1', 'P2', 'P1'],
+        'Quantidade_Vendida': [2, 5, 4],
+        'Receita_Total': [10.0, 20.0, 30.0],
+        'Margem_Lucro': [1.0, 2.0, 3.0],
+    })
+    produtos = pd.DataFrame({'ID_Produto': [1], 'Nome_Produto': ['Mouse Logitech']})
+
+    ranking = top_products(DaySketches().add(vendas).frame(), produtos, n=5)
+
+    assert ranking.values.tolist() == [['P1', 'P1', 6.0], ['P2', 'P2', 5.0]]
+    produtos['ID_Produto'] = ['P1']
+    ranking = top_products(DaySketches().add(vendas).frame(), produtos, n=1)
+    assert ranking.values.tolist() == [['P1', 'Mouse Logitech', 6.0]]